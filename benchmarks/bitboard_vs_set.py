@@ -0,0 +1,51 @@
+"""Compare the bitboard and the set based representation of the board.
+Run from the project root directory using
+    python benchmarks/bitboard_vs_set.py
+command; the board is taken from a game of the bot against a seeded random opponent (see latency.py)."""
+
+from timeit import timeit
+import sys
+
+sys.path.append('pyskvorky')
+
+import bot  # pylint: disable=wrong-import-position
+from bitboard import Bitboard  # pylint: disable=wrong-import-position
+from geometry import envelope  # pylint: disable=wrong-import-position
+from helper import winning_set, Player  # pylint: disable=wrong-import-position
+from latency import play_game  # pylint: disable=wrong-import-position
+
+MOVES = 100  # number of bot's moves played to get the board
+NUMBER = 20  # number of repetitions of each measurement
+
+
+def per_candidate(func, candidates):
+    """Return the average time in microseconds of calling func for each of the candidates."""
+
+    return timeit(lambda: [func(move) for move in candidates], number=NUMBER) / NUMBER / len(candidates) * 1e6
+
+
+def main():
+    """Print the time per call of line counting, win detection and bot's score() for both representations."""
+
+    engine = bot.Engine()
+    play_game(engine, MOVES)
+    candidates = list(engine.next_move_candidates)
+    boards = {"set": (set(engine.claimed), set(engine.lost)),
+              "bitboard": (Bitboard(engine.claimed), Bitboard(engine.lost))}
+    fields = len(engine.claimed) + len(engine.lost)
+    print(f"{fields} fields, {len(candidates)} candidates; times in microseconds per call")
+    print(f"{'':>10}{'counts':>10}{'win':>10}{'score':>10}")
+    for name, (claimed, lost) in boards.items():
+        player = Player("X", None, None, claimed)
+        if name == "set":
+            counts = per_candidate(lambda move: [len(line & claimed) for line in envelope(move, bot.K)], candidates)
+        else:
+            counts = per_candidate(lambda move: claimed.envelope_bits(move, bot.K), candidates)
+        win = per_candidate(lambda move: winning_set(move, player), candidates)
+        engine.claimed, engine.lost = claimed, lost
+        score = per_candidate(engine.score, candidates)
+        print(f"{name:>10}{counts:>10.1f}{win:>10.1f}{score:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
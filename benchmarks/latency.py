@@ -0,0 +1,114 @@
+"""Measure bot's per-move latency early and late in a long game.
+Run from the project root directory using
+    python benchmarks/latency.py
+command; the bot plays against a seeded random opponent placing its markers next to the bot's moves.
+The heuristic is measured with the forced win search turned off, the random opponent would lose too soon;
+the forced win search is measured in a separate game and reported by its counters. At the sampled moves, score()
+of each candidate and beam() of all candidates are timed on their own on the board after the bot's move, as play()
+scores only the candidates selected by the beam; games of several seeds are played with and without the beam
+(BEAM=None) to check the beam cuts the candidates scored per move, counted by telemetry, at least MIN_REDUCTION times;
+the counts don't depend on the timer or on numpy, the average play() times are reported alongside."""
+
+from random import Random
+from time import perf_counter
+import sys
+
+sys.path.append('pyskvorky')
+
+import bot  # pylint: disable=wrong-import-position
+import geometry  # pylint: disable=wrong-import-position
+from telemetry import Telemetry  # pylint: disable=wrong-import-position
+
+MOVES = 200  # number of bot's moves to play
+SAMPLES = (10, 50, 100, 200)  # report latency at these moves
+RETRIES = 25  # random opponent's attempts to find a free position before its neighborhood widens
+SEEDS = (0, 1, 2)  # seeds of the opponent's games played with and without the beam
+MIN_REDUCTION = 5  # the beam has to score at least this many times fewer candidates per move than BEAM=None
+
+
+def play_game(engine, moves=MOVES, seed=0, samples=()):
+    """Play a game against a random opponent; return a list of (play time, number of candidates) for each bot's move
+    and a dict of (average score() time, beam() time) after the sampled moves by their numbers."""
+
+    rnd = Random(seed)
+    timings, probes = [], {}
+    move = None
+    for n in range(1, moves + 1):
+        candidates = len(engine.next_move_candidates)
+        start = perf_counter()
+        countermove = engine.play(move)
+        timings.append((perf_counter() - start, candidates))
+        if n in samples:
+            probes[n] = probe(engine)
+        # place the opponent's marker at a random free position near the bot's countermove;
+        # the opponent never completes a winning line so that the game can go on for any number of moves;
+        # the neighborhood widens if it's (nearly) full, otherwise the opponent could look for a free position forever
+        attempts = 0
+        while move is None or move in engine.claimed or move in engine.lost or wins(move, engine.lost):
+            radius = 2 + attempts // RETRIES
+            move = countermove[0] + rnd.randint(-radius, radius), countermove[1] + rnd.randint(-radius, radius)
+            attempts += 1
+    return timings, probes
+
+
+def probe(engine):
+    """Return the average time of score() of a candidate and the time of beam() of all candidates in seconds."""
+
+    candidates = engine.next_move_candidates
+    start = perf_counter()
+    for move in candidates:
+        engine.score(move)
+    middle = perf_counter()
+    engine.beam(candidates)
+    return (middle - start) / max(1, len(candidates)), perf_counter() - middle
+
+
+def compare_beam(beam, seeds=SEEDS):
+    """Play a game for each seed with the given BEAM; return the average number of candidates scored per move
+    and the average play() time in seconds."""
+
+    scored, elapsed, moves = 0, 0.0, 0
+    for seed in seeds:
+        engine = bot.Engine()
+        engine.THREATS, engine.BEAM = False, beam
+        telemetry = Telemetry()
+        telemetry.attach(engine)
+        timings, _ = play_game(engine, seed=seed)
+        scored += sum(metrics["scored"] for metrics in telemetry.moves)
+        elapsed += sum(time for time, _ in timings)
+        moves += len(timings)
+    return scored / moves, elapsed / moves
+
+
+def wins(move, fields):
+    """Check whether the move would complete a winning line of fields."""
+
+    return any(len(line - fields) == 1 for line in geometry.envelope(move))
+
+
+def main():
+    """Print play() latency, the average score() latency per candidate and beam() latency at selected moves,
+    the average candidates scored and play() latency with and without the beam and the forced win search's counters."""
+
+    engine = bot.Engine()
+    engine.THREATS = False
+    timings, probes = play_game(engine, samples=SAMPLES)
+    print(f"{'move':>6}{'play() ms':>12}{'candidates':>12}{'score() us':>12}{'beam() ms':>12}")
+    for n in SAMPLES:
+        elapsed, candidates = timings[n - 1]
+        score_time, beam_time = probes[n]
+        print(f"{n:>6}{elapsed * 1e3:>12.2f}{candidates:>12}{score_time * 1e6:>12.1f}{beam_time * 1e3:>12.2f}")
+    beam, beam_time = compare_beam(bot.BEAM)
+    full, full_time = compare_beam(None)
+    print(f"scored per move: {beam:.1f} with BEAM={bot.BEAM}, {full:.1f} with BEAM=None, {full / beam:.1f}x fewer, "
+          f"{'ok' if full >= MIN_REDUCTION * beam else f'less than {MIN_REDUCTION}x FEWER'}")
+    print(f"average play(): {beam_time * 1e3:.2f} ms with BEAM={bot.BEAM}, {full_time * 1e3:.2f} ms with BEAM=None")
+    engine = bot.Engine()
+    timings, _ = play_game(engine, MOVES // 4)
+    stats = engine.threats.stats()
+    print(f"threat solver: {stats['total_nodes']} nodes, {stats['nodes_per_second']:.0f} nodes/s, "
+          f"max play() {max(elapsed for elapsed, _ in timings) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
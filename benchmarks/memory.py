@@ -0,0 +1,47 @@
+"""Measure memory used by a game of the bot when many games are hosted by a single process.
+Run from the project root directory using
+    python benchmarks/memory.py
+command; each game is played by its own Engine against a seeded random opponent, all games move by move in turns."""
+
+from random import Random
+import sys
+import tracemalloc
+
+sys.path.append('pyskvorky')
+
+import bot  # pylint: disable=wrong-import-position
+import geometry  # pylint: disable=wrong-import-position
+from latency import wins  # pylint: disable=wrong-import-position
+
+GAMES = 100  # number of games hosted at the same time
+MOVES = (10, 25, 50)  # report memory per game after these numbers of bot's moves
+
+
+def main():
+    """Print traced memory per game after selected moves."""
+    # the caches of the geometry module are shared by all games; they're cleared before each measurement so that
+    # only the lines actually referenced by the games are counted
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    engines = [bot.Engine() for _ in range(GAMES)]
+    random_generators = [Random(seed) for seed in range(GAMES)]
+    moves = [None] * GAMES
+    print(f"{GAMES} games at the same time")
+    print(f"{'moves':>6}{'KiB per game':>14}")
+    for n in range(1, max(MOVES) + 1):
+        for i, (engine, rnd) in enumerate(zip(engines, random_generators)):
+            countermove = engine.play(moves[i])
+            move = moves[i]
+            while move is None or move in engine.claimed or move in engine.lost or wins(move, engine.lost):
+                move = countermove[0] + rnd.randint(-2, 2), countermove[1] + rnd.randint(-2, 2)
+            moves[i] = move
+        if n in MOVES:
+            for cache in geometry.envelope, geometry.envelope_ids, geometry.envelope_windows, geometry.line_positions:
+                cache.cache_clear()
+            traced = tracemalloc.get_traced_memory()[0]
+            print(f"{n:>6}{(traced - baseline) / GAMES / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Benchmark suite of the engine's hot paths and of whole headless games, compared against a saved baseline.
+Run from the project root directory using
+    python benchmarks/suite.py --save
+command once to save the baseline and then
+    python benchmarks/suite.py
+after each change of the engine; the results are written to a JSON file and each of them is compared to the baseline,
+the command exits with status 1 if any result got worse by more than the tolerance.
+The hot paths are timed on synthetic boards of 10, 100 and 1000 stones placed at random in a square around (0, 0),
+so that no player has four in a line; the games are played by the bot against rob (see tournament.py)."""
+
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+from timeit import Timer
+import gc
+import json
+import platform
+import sys
+
+sys.path.append('pyskvorky')
+
+import bot  # pylint: disable=wrong-import-position
+from bitboard import Bitboard  # pylint: disable=wrong-import-position
+from geometry import envelope  # pylint: disable=wrong-import-position
+from helper import visible_playfield, winning_set, Player  # pylint: disable=wrong-import-position
+from tournament import play_game, random_opening  # pylint: disable=wrong-import-position
+
+try:
+    import resource  # not available in Windows, the peak memory is not measured there
+except ImportError:
+    resource = None
+
+STONES = (10, 100, 1000)  # sizes of the synthetic boards
+DENSITY = 0.3  # ratio of stones to the area of the square they are placed in
+REPEAT = 5  # number of repetitions of each measurement, the best one is reported
+MIN_TIME = 0.05  # min time in seconds of a single repetition of a measurement of a hot path
+GAMES = 4  # number of bot-vs-rob games, the players swap their markers after each game
+MAX_MOVES = 100  # max number of moves of a game
+OUTPUT, BASELINE = "benchmark.json", "benchmark_baseline.json"  # default result files
+TOLERANCE = 0.25  # max relative change of a result not reported as a regression
+HIGHER_IS_BETTER = {"moves/s"}  # units of results which get better by growing, all others get better by shrinking
+
+
+def synthetic_board(stones, seed=0, density=DENSITY):
+    """Return a list of (move, own) pairs of a given number of stones placed at random, alternating both players and
+    ending by the opponent's stone; a stone is never placed where it would make four of the player's stones in a line,
+    so the game is not decided yet and there is no forced win by fours."""
+
+    rnd = Random(seed)
+    radius = int((stones / density) ** 0.5) // 2 + 1
+    fields, board = (set(), set()), []
+    while len(board) < stones:
+        move = rnd.randint(-radius, radius), rnd.randint(-radius, radius)
+        player = fields[(stones - len(board)) % 2]  # the last stone is placed by the opponent (player 1)
+        if move in fields[0] or move in fields[1] or any(len(line & player) > 2 for line in envelope(move)):
+            continue
+        player.add(move)
+        board.append((move, player is fields[0]))
+    return board
+
+
+def new_engine(board):
+    """Return a bot's engine with a given board placed on it; the opening book is not used."""
+
+    engine = bot.Engine()
+    engine.book = None
+    engine.setup(board)
+    return engine
+
+
+def per_call(func, args):
+    """Return the best time in microseconds of calling func for each of the args, averaged per call; the calls are
+    repeated so that a single repetition takes at least MIN_TIME."""
+
+    timer = Timer(lambda: [func(arg) for arg in args])
+    number = max(1, int(MIN_TIME / max(1e-9, timer.timeit(1))))
+    return min(timer.repeat(REPEAT, number)) / number / len(args) * 1e6
+
+
+def best_of(setup, func):
+    """Return the best time in microseconds of calling func with the result of setup, which is not timed;
+    the garbage collector is disabled while timing, as timeit does."""
+
+    timings = []
+    for _ in range(REPEAT):
+        arg = setup()
+        gc.disable()
+        try:
+            start = perf_counter()
+            func(arg)
+            timings.append(perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(timings) * 1e6
+
+
+def hot_paths(stones):
+    """Return results of the hot paths on a synthetic board of a given number of stones as a dictionary of result
+    names mapped to (value, unit) pairs."""
+
+    board = synthetic_board(stones)
+    moves = [move for move, _ in board]
+    engine = new_engine(board)
+    candidates = list(engine.next_move_candidates)
+    player = Player("X", None, None, Bitboard(move for move, own in board if own))
+    own_moves = [move for move, own in board if own]
+    results = {
+        "play": best_of(lambda: new_engine(board[:-1]), lambda engine_: engine_.play(moves[-1])),
+        "score": per_call(engine.score, candidates),
+        "update_board": best_of(lambda: None, lambda _: new_engine(board)) / stones,
+        "envelope": per_call(envelope, candidates),
+        "envelope uncached": per_call(envelope.__wrapped__, candidates),
+        "neighborhood": per_call(engine.neighborhood, moves),
+        "winning_set": per_call(lambda move: winning_set(move, player), own_moves),
+        "visible_playfield": per_call(visible_playfield, [moves]),
+    }
+    return {f"{name} [{stones} stones]": (value, "us") for name, value in results.items()}
+
+
+def games():
+    """Return results of headless bot-vs-rob games as a dictionary of result names mapped to (value, unit) pairs."""
+
+    moves, start = 0, perf_counter()
+    for game in range(GAMES):
+        x_player, o_player = ("rob", "bot") if game % 2 else ("bot", "rob")
+        moves += play_game(game, x_player, o_player, random_opening(Random(game), 2), MAX_MOVES)["length"]
+    results = {"games": (moves / (perf_counter() - start), "moves/s")}
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # in KiB, but in bytes in macOS
+        results["peak RSS"] = (peak / 1024 if sys.platform == "darwin" else peak) / 1024, "MiB"
+    return results
+
+
+def run():
+    """Run all benchmarks and return the results along with a description of the environment."""
+    # the games are played first so that the peak memory is not affected by the large synthetic boards
+
+    results = games()
+    for stones in STONES:
+        results.update(hot_paths(stones))
+    environment = {"python": platform.python_version(), "platform": platform.platform(),
+                   "numpy": bot.vectorized is not None}
+    return {"environment": environment, "results": {name: {"value": value, "unit": unit}
+                                                    for name, (value, unit) in results.items()}}
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Print the results next to the baseline and return the names of the results worse than the baseline by more
+    than the tolerance."""
+
+    if baseline["environment"] != results["environment"]:
+        print(f"Note: the baseline was measured in a different environment: {baseline['environment']}")
+    regressions = []
+    print(f"{'':<36}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, result in results["results"].items():
+        value, unit = result["value"], result["unit"]
+        if name not in baseline["results"]:
+            print(f"{name:<36}{'':>12}{value:>12.2f} {unit}")
+            continue
+        previous = baseline["results"][name]["value"]
+        change = value / previous - 1 if previous else 0.0
+        worse = -change if unit in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36}{previous:>12.2f}{value:>12.2f}{change:>+10.1%} {unit}{flag}")
+    return regressions
+
+
+def main():
+    """Run the suite, write the results and compare them to the baseline, or save them as the baseline."""
+
+    parser = ArgumentParser(description="Benchmark the engine's hot paths and whole games against a baseline.")
+    parser.add_argument("-o", "--output", default=OUTPUT, help=f"results file (default: {OUTPUT})")
+    parser.add_argument("-b", "--baseline", default=BASELINE, help=f"baseline file (default: {BASELINE})")
+    parser.add_argument("-s", "--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("-t", "--tolerance", type=float, default=TOLERANCE,
+                        help=f"max relative change not reported as a regression (default: {TOLERANCE})")
+    args = parser.parse_args()
+
+    results = run()
+    for file in (args.output, args.baseline) if args.save else (args.output,):
+        with open(file, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    if args.save:
+        print(f"Baseline saved to {args.baseline}")
+        baseline = results
+    else:
+        try:
+            with open(args.baseline, encoding="utf-8") as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            print(f"No baseline found in {args.baseline}; save one using the --save option.")
+            baseline = {"environment": results["environment"], "results": {}}
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
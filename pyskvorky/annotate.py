@@ -0,0 +1,112 @@
+"""Annotation of recorded games: each move is compared to the move preferred by an AI player's engine.
+Games recorded by the records module are annotated by a pool of worker processes, e.g. using
+    python pyskvorky/annotate.py games.pyskg -f annotations.jsonl
+command run from the project root directory; annotations of the games are written to a file, one JSON object per line,
+in the order of the games in the records, and a summary of the annotations is printed for each player."""
+
+from collections import Counter
+from importlib import import_module
+from itertools import islice
+from multiprocessing import Pool
+import json
+from cli import get_annotate_args
+from records import read_games
+
+BLUNDER = 100  # a move scoring this much less than the engine's preferred move is a blunder
+CHUNK = 8  # number of games sent to a worker process at once
+WINDOW = 64  # number of chunks in flight; the games are read from the records only as fast as they are annotated
+
+# the pipeline consists of streaming stages: read the games (records.read_games()), replay each game move by move
+# (replay()), annotate each move (annotate()) and write the annotations (run_annotation()); a game is replayed and
+# annotated by a single worker process as the engine needs the whole game up to the move; the games are sent to the
+# workers in chunks and their annotations come back in the order of the games
+# an annotation tells the move preferred by the engine in the position before the move (see bot.Engine.choose_move())
+# and the scores of both moves (see bot.Engine.score()) from the perspective of the player to move; the score delta
+# is the preferred move's score less the move's score and a move with the delta of BLUNDER or more is a blunder
+# Note: the preferred move may be the first move of a forced win, which may score less than another move
+
+
+def replay(game, module="bot"):
+    """Yield (engine, ply, move) for each move of a game, the engine being the one of the player to move with
+    the board before the move; each player gets an engine of a given AI player module."""
+    # both engines are updated by each move using update_board(), each from its player's perspective
+
+    engines = import_module(module).Engine(), import_module(module).Engine()
+    for ply, move in enumerate(game["moves"]):
+        engine, opponent = engines[ply % 2], engines[1 - ply % 2]
+        yield engine, ply, move
+        engine.update_board(move, engine.claimed, engine.lost)
+        opponent.update_board(move, opponent.lost, opponent.claimed)
+
+
+def annotate(positions, opening=0, blunder=BLUNDER):
+    """Yield an annotation of each move given by (engine, ply, move) positions (see replay()) after the opening,
+    i.e. the moves not chosen by the players."""
+
+    for engine, ply, move in positions:
+        if ply < opening:
+            continue
+        preferred = engine.choose_move() if engine.next_move_candidates else (0, 0)  # the first move of a game
+        score, best = engine.score(move), engine.score(preferred)
+        yield {"ply": ply, "move": move, "preferred": preferred, "score": score, "best": best, "delta": best - score,
+               "blunder": best - score >= blunder}
+
+
+def annotate_game(task):
+    """Worker process' entry point: annotate a game given by a (game, module, blunder) tuple."""
+
+    game, module, blunder = task
+    annotations = list(annotate(replay(game, module), game.get("opening", 0), blunder))
+    return {"X": game["X"], "O": game["O"], "winner": game["winner"], "opening": game.get("opening", 0),
+            "annotations": annotations}
+
+
+def annotated_games(games, module="bot", blunder=BLUNDER, jobs=None, chunk=CHUNK, window=WINDOW):
+    """Yield annotations of the games in the order of the games; jobs=1 annotates the games in the current process.
+    The games are read in windows of chunk * window games, so that only a window is kept in memory at a time."""
+    # Pool.imap() reads its whole iterable ahead of the workers, feeding it a window at a time bounds the memory
+
+    tasks = ((game, module, blunder) for game in games)
+    if jobs == 1:
+        yield from map(annotate_game, tasks)
+        return
+    with Pool(jobs) as pool:
+        while True:
+            batch = list(islice(tasks, chunk * window))
+            if not batch:
+                break
+            yield from pool.imap(annotate_game, batch, chunk)
+
+
+def run_annotation(files, file, module="bot", blunder=BLUNDER, jobs=None, chunk=CHUNK):
+    """Annotate all games of the records files, write the annotations to a file and return a summary of the moves,
+    blunders, moves equal to the preferred ones and the average score delta of each player module."""
+
+    moves, blunders, agreements, deltas = Counter(), Counter(), Counter(), Counter()
+    games = (game for name in files for game in read_games(name))
+    with open(file, "w", encoding="utf-8") as results:
+        for game in annotated_games(games, module, blunder, jobs, chunk):
+            results.write(json.dumps(game) + "\n")
+            for annotation in game["annotations"]:
+                player = game["XO"[annotation["ply"] % 2]]
+                moves[player] += 1
+                blunders[player] += annotation["blunder"]
+                agreements[player] += annotation["move"] == annotation["preferred"]
+                deltas[player] += annotation["delta"]
+
+    return {player: {"moves": moves[player], "blunders": blunders[player],
+                     "agreement": agreements[player] / moves[player], "average delta": deltas[player] / moves[player]}
+            for player in moves}
+
+
+def main():
+    """Annotate games given by the cli arguments and print the summary."""
+
+    args = get_annotate_args()
+    summary = run_annotation(args.records, args.file, args.player, args.blunder, args.jobs, args.chunk)
+    for player, stats in summary.items():
+        print(f"{player}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
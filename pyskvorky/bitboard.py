@@ -0,0 +1,118 @@
+"""Bitboard representation of a player's fields on the unlimited board."""
+
+K = 5  # number of consecutive positions marked with the same symbol required to win
+
+# the board is unlimited so it can't be mapped to a single fixed-size bitmask; instead, each row, column and diagonal
+# of the board is represented by its own integer bitmask; the bitmasks grow as the board expands in any direction
+# the directions are in the same order as in geometry.line_offsets() so that lines come in the envelope() order
+
+
+def locate(position):
+    """Return a (line key, position along the line) pair of a position for each of the 4 directions."""
+    # directions (1, 1), (1, 0), (0, 1) and (-1, 1); the key identifies the line (diagonal, column, row, antidiagonal)
+    # and moving one step in the direction increases the position along the line by one
+
+    row, col = position
+    return (row - col, col), (col, row), (row, col), (row + col, col)
+
+
+def position_at(direction, key, along):
+    """Inverse of locate(): return the position at a given position along the line in a given direction."""
+
+    if direction == 0:
+        return key + along, along
+    if direction == 1:
+        return along, key
+    if direction == 2:
+        return key, along
+    return key - along, along
+
+
+class Bitboard(set):
+    """A set of fields which also maintains a bitmask for each row, column and diagonal containing any of the fields.
+    Being a set it can be used anywhere a set of fields is expected; only add(), remove(), discard(), update() and
+    clear() keep the bitmasks in sync, other in-place set operations must not be used."""
+    # each line is stored as an (origin, mask) pair where bit 0 of the mask corresponds to the origin position along
+    # the line; when a field is added below the origin, the mask is shifted left and the origin moved accordingly
+
+    def __init__(self, fields=()):
+        super().__init__()
+        self.lines = [{}, {}, {}, {}]  # one dictionary of line keys to (origin, mask) pairs for each direction
+        self.update(fields)
+
+    def __copy__(self):
+        return Bitboard(self)
+
+    def add(self, position):
+        super().add(position)
+        for lines, (key, along) in zip(self.lines, locate(position)):
+            origin, mask = lines.get(key, (along, 0))
+            if along < origin:
+                mask, origin = mask << (origin - along), along
+            lines[key] = origin, mask | 1 << (along - origin)
+
+    def discard(self, position):
+        if position not in self:
+            return
+        super().discard(position)
+        for lines, (key, along) in zip(self.lines, locate(position)):
+            origin, mask = lines[key]
+            mask &= ~(1 << (along - origin))
+            if mask:
+                lines[key] = origin, mask
+            else:
+                del lines[key]
+
+    def remove(self, position):
+        if position not in self:
+            raise KeyError(position)
+        self.discard(position)
+
+    def update(self, *others):
+        for fields in others:
+            for position in fields:
+                self.add(position)
+
+    def clear(self):
+        super().clear()
+        self.lines = [{}, {}, {}, {}]
+
+    def windows(self, position, length=K):
+        """Return bits of the 2*length-1 fields centered at the position for each of the 4 directions;
+        bit 0 corresponds to the field length-1 steps back from the position in the given direction."""
+
+        windows = []
+        full = (1 << (2*length - 1)) - 1
+        for lines, (key, along) in zip(self.lines, locate(position)):
+            if key in lines:
+                origin, mask = lines[key]
+                shift = along - length + 1 - origin
+                windows.append((mask >> shift if shift >= 0 else mask << -shift) & full)
+            else:
+                windows.append(0)
+        return windows
+
+    def envelope_bits(self, position, length=K):
+        """Return the fields of each line in geometry.envelope(position) as a bitmask of length bits."""
+        # the i-th line of a direction in the envelope starts i steps back from the far end of the window
+
+        full = (1 << length) - 1
+        shifts = range(length)
+        return [(window >> i) & full for window in self.windows(position, length) for i in shifts]
+
+    def winning_set(self, position, length=K):
+        """Return all fields forming winning lines (length consecutive fields) which contain the position."""
+
+        winning_fields = set()
+        for direction, window in enumerate(self.windows(position, length)):
+            runs = window
+            for i in range(1, length):
+                runs &= window >> i  # bit s remains set only if the bits s to s+length-1 are all set
+            runs &= (1 << length) - 1  # keep only the runs containing the position
+            if runs:
+                key, along = locate(position)[direction]
+                start = along - length + 1
+                for s in range(length):
+                    if runs >> s & 1:
+                        winning_fields.update(position_at(direction, key, start + s + i) for i in range(length))
+        return frozenset(winning_fields)
@@ -0,0 +1,182 @@
+"""Opening book: a file mapping hashes of positions to the best known replies and their statistics.
+The book is built from self-play games or from a corpus of games recorded by the tournament module, e.g. using
+    python pyskvorky/book.py -n 1000 -c tournament.jsonl
+command run from the project root directory; AI players (see bot.Engine) look up the book by memory mapping the file,
+so that all processes reading the book share a single copy of it without loading it."""
+
+from collections import defaultdict
+from functools import lru_cache
+import json
+from math import sqrt
+import mmap
+import os
+import struct
+import tempfile
+from cli import get_book_args
+from tournament import run_tournament
+from transposition import zobrist_key
+
+FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")  # default book, next to the modules
+PLIES = 12  # number of moves of a game recorded in the book
+MIN_GAMES = 5  # number of games a reply has to be played in to be written to the book
+MIN_SCORE = 0.25  # lower bound of the win rate a reply has to exceed to be written to the book (see wilson_bound())
+Z = 1.96  # quantile of the normal distribution of the confidence level of the bound, i.e. 95%
+
+# the file consists of a header and fixed-size records sorted by the position hash so that a record can be found by
+# a binary search right in the memory mapped file; the hash is the Zobrist hash of the position from the perspective
+# of the player to move (see transposition.zobrist_key()), the same as bot.Engine.hash
+HEADER = struct.Struct("<8sII")  # magic, version, number of records
+RECORD = struct.Struct("<QiiII")  # position hash, reply's row and column, number of games and wins of the reply
+MAGIC, VERSION = b"PYSKBOOK", 1
+
+
+class OpeningBook:
+    """Read-only opening book memory mapped from a file; counts hits and misses of the lookups."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or len(self.map) != HEADER.size + self.count * RECORD.size:
+            self.map.close()
+            raise ValueError(f"Not a valid opening book file: {path}")
+        self.hits, self.misses = 0, 0
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        """Return the index-th (hash, row, col, games, wins) record of the book."""
+
+        return RECORD.unpack_from(self.map, HEADER.size + index * RECORD.size)
+
+    def get(self, key):
+        """Return the best known reply to a position given by its hash along with the number of games and wins
+        of the reply as a (move, games, wins) tuple or None if the position is not in the book."""
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.record(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            key_, row, col, games, wins = self.record(low)
+            if key_ == key:
+                self.hits += 1
+                return (row, col), games, wins
+        self.misses += 1
+        return None
+
+    def stats(self):
+        """Return the number of positions in the book and hits and misses of the lookups."""
+
+        return {"positions": self.count, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        """Unmap the file."""
+
+        self.map.close()
+
+
+@lru_cache(maxsize=None)
+def open_book(path):
+    """Return the opening book of a given file; each file is mapped only once per process and shared by its players."""
+
+    return OpeningBook(path)
+
+
+def collect(games, plies=PLIES, statistics=None):
+    """Collect statistics of replies from games given as (moves, winner, opening) tuples, the winner being an index
+    of the winning player (0 for X, the player who started the game) or None and opening the number of the first
+    moves which were not chosen by the players, e.g. random; return a dictionary of position hashes mapped to
+    dictionaries of replies mapped to [games, wins] lists."""
+    # the position is hashed from the perspective of both players, the one to move looks the position up
+
+    statistics = defaultdict(lambda: defaultdict(lambda: [0, 0])) if statistics is None else statistics
+    for moves, winner, opening in games:
+        keys = [0, 0]
+        for ply, move in enumerate(moves[:plies]):
+            player = ply % 2
+            if ply >= opening:
+                reply = statistics[keys[player]][tuple(move)]
+                reply[0] += 1
+                reply[1] += winner == player
+            keys[player] ^= zobrist_key(move, True)
+            keys[1 - player] ^= zobrist_key(move, False)
+    return statistics
+
+
+def wilson_bound(games, wins, z=Z):
+    """Return the lower bound of the Wilson score interval of the win rate of a reply, i.e. the win rate the reply
+    achieves with a given confidence; the fewer games, the lower the bound."""
+
+    if not games:
+        return 0.0
+    rate, spread = wins / games, z * z / games
+    return (rate + spread / 2 - z * sqrt(rate * (1 - rate) / games + spread / games / 4)) / (1 + spread)
+
+
+def write_book(path, statistics, min_games=MIN_GAMES, min_score=MIN_SCORE):
+    """Write the best reply of each position to a book file; the best reply has the highest lower bound of its win
+    rate (see wilson_bound()) and, with equal bounds, the most games. Only the replies played in at least min_games
+    games whose bound exceeds min_score are considered, a position without such a reply is left out; the engines
+    play the book's replies without any search. The file is written to a temporary file first and then renamed, so
+    that processes reading the previous version of the book keep reading a consistent file."""
+
+    records = []
+    for key, replies in statistics.items():
+        scored = [(wilson_bound(games, wins), games, move, wins) for move, (games, wins) in sorted(replies.items())
+                  if games >= min_games]
+        best = max(scored, key=lambda reply: reply[:2], default=None)
+        if best is not None and best[0] > min_score:
+            _, games, (row, col), wins = best
+            records.append((key, row, col, games, wins))
+    records.sort()
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        file.writelines(RECORD.pack(*record) for record in records)
+    os.replace(file.name, path)
+    open_book.cache_clear()
+    return len(records)
+
+
+def corpus_games(files):
+    """Yield (moves, winner, opening) tuples of the games recorded by the tournament module in given JSON lines
+    files (see collect())."""
+
+    for name in files:
+        with open(name, encoding="utf-8") as results:
+            for line in results:
+                result = json.loads(line)
+                yield [tuple(move) for move in result["moves"]], {"X": 0, "O": 1}.get(result["winner"]), \
+                    result.get("opening", 0)
+
+
+def build_book(path=FILE, files=(), games=0, player="bot", plies=PLIES, jobs=None, seed=0, min_games=MIN_GAMES):
+    """Build a book from the corpus files and from a given number of self-play games of a player with random
+    openings played by the tournament module; return the number of positions in the book."""
+
+    statistics = collect(corpus_games(files), plies)
+    if games:
+        with tempfile.TemporaryDirectory() as directory:
+            results = os.path.join(directory, "self-play.jsonl")
+            run_tournament(player, player, games, results, jobs, seed=seed)
+            collect(corpus_games([results]), plies, statistics)
+    return write_book(path, statistics, min_games)
+
+
+def main():
+    """Build a book given by the cli arguments and print its size."""
+
+    args = get_book_args()
+    path = args.file or FILE
+    positions = build_book(path, args.corpus, args.games, args.player, args.plies, args.jobs, args.seed,
+                           args.min_games)
+    print(f"{positions} positions written to {path}")
+
+
+if __name__ == "__main__":
+    main()
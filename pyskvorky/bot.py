@@ -1,42 +1,63 @@
 """This module implements an AI player for the Unlimited Tic-Tac-Toe game."""
 from collections import Counter
-from copy import copy
+from heapq import nlargest
+from math import inf
+from operator import itemgetter
+import os
+from geometry import (envelope_bits, envelope_ids, envelope_masks, envelope_windows, line_mask, pattern_key,
+                      pattern_size)
+from bitboard import Bitboard
+from book import open_book
+from threats import ThreatSolver
+from transposition import TranspositionTable, zobrist_key, DEPTH_PREFERRED, EXACT, LOWER, UPPER
+try:
+    import vectorized  # batch scoring of the candidates requires numpy which is an optional dependency
+except ImportError:
+    vectorized = None
 
 # Note: it is a part of the API contract that the AI player's main function is called 'play'
 
-# Implementation note: the following is the simplest implementation of a player I could think of.
-# A more robust approach would be to implement a player as a class which would facilitate the
-# creation of players with strategy modifications by subclassing them from the base player.
-# By using modules one has to copy the module in order to create a modified player because,
-# unfortunately, a module cannot be imported multiple times with separate namespaces. This:
+# Implementation note: the player is implemented as a class, Engine, holding the whole game state of one game.
+# Unlike a module, which cannot be imported multiple times with separate namespaces, e.g.:
 # import bot as player1
 # import bot as player2
-# would not work (both would operate over one shared namespace).
+# would not work (both would operate over one shared namespace), the class can be instantiated for each game;
+# this allows a process to host many games at the same time or a bot to play against itself.
 # https://stackoverflow.com/questions/37067414/python-import-multiple-times
+# Strategy modifications can be created by subclassing the Engine and overriding its constants or methods.
+# The module level play() function plays a single game using a module level instance of the Engine.
 
 # constants:
 K = 5  # number of consecutive positions marked with the same symbol required to win
 R = 1  # neighborhood radius; neighborhood represents all neighbors within R distance
-
-# globals representing the game state:
-claimed, lost = set(), set()  # a board consists of two collections representing claimed (owned) and lost positions
-next_move_candidates = set()  # all reasonable candidates for the next move
-open_lines = set()  # all potentially winning, non-empty lines partially taken exclusively by one player
-# a move is represented by simply a tuple of coordinates (row, column) with the initial move to a position (0, 0)
-# next_move_candidates and open_lines are being updated during the game to optimize the computation a bit
+BITBOARD = False  # represent the board using bitboards (see bitboard module) rather than plain sets
+DEPTH = 1  # search depth in moves (plies); depth 1 selects the move with the highest score without any search
+WIDTH = 8  # number of the best scoring moves searched deeper at each node of the search (see Engine.search())
+WIN = 10 ** 6  # value of a won game in the search; it exceeds any total value of patterns on a board
+TT_SIZE = 1 << 16  # max number of positions kept in the transposition table of the search
+TT_POLICY = DEPTH_PREFERRED  # replacement policy of the transposition table, see transposition module
+THREATS = True  # look for a forced win by fours and open threes before evaluating the moves (see threats module)
+THREAT_NODES, THREAT_TIME = 2000, 0.05  # node budget and time cap in seconds of the forced win search
+NUMPY = True  # score all candidates in a single batch if numpy is installed (see vectorized module)
+# opening book file (see book module) looked up before scoring; ignored if there's no such file; it's looked up in
+# the directory of the modules rather than in the current one, so it's the one written by the book builder by default
+BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+PONDER = 4  # number of the opponent's most likely replies answered in advance by ponder()
+BEAM = 8  # number of the top ranked candidates scored for a move besides the mandatory ones; None scores all of them
 
 # to evaluate the board use a heuristic table of weights to value selected game patterns
 # the tables can be generated using the Fibonacci sequence for simplicity and easy extendability for K > 5
 # it turns out it's better to use two distinct tables, one for evaluating the board from the player perspective and
 # one for evaluating the board from the opponent's perspective; it allows more flexibility to finetune the weights
 # Note: consider testing Tribonacci sequence and compare with a player using Fibonacci sequence
-value_table_opponent = [0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377]
+value_table_opponent = [0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377, 610]
 value_table_player = [0, 0, 0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 144, 233, 610]
 # to better understand the pattern_to_index function here are a few examples:
 # a winning pattern containing five symbols in a row maps to index 15 which translates to a value of 610 for the player
 # a pattern containing 4 symbols maps to either to index 13 or 14 (depending on how the 4 symbols are spread across the
 # winning line) which translates to a value of 144 or 233 for the player or to a value of 233 or 377 for the opponent;
 # a pattern containing 3 symbols maps to either of three indexes: 10, 11 or 12 depending on the shape of the pattern
+# Note: the opponent's winning pattern never occurs in a game but it does when the search simulates opponent's moves
 
 # similarly, evaluation tables for K = 6 can be generated in the same manner using the fibonacci sequence:
 # value_table_opponent = [0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377, 610, 987, 1597, 2584, 4181, 6765]
@@ -44,104 +65,499 @@ value_table_player = [0, 0, 0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 144, 233, 610]
 # replacing the tables and changing the constant K to 6 will allow to play the game.
 
 
-def play(opponents_move):
-    """AI player's main function; receives opponent's move (or None when the game begins) and returns a countermove.
-    It uses a heuristics to evaluate each reasonable next move and selects a move with the highest score.
-    The function's name 'play' is mandatory as part of the API contract."""
-
-    if opponents_move is None:
-        # this the first move, place your marker at (0, 0) and update game status accordingly
-        update_board((0, 0), claimed, lost)
-        return 0, 0
-    # update board status after opponent's move, select the best countermove and update game status
-    # next_move_candidates collect reasonable candidates for the next move evaluation and selection
-    # IMPROVE: randomize the selection of the countermove from a set of equivalent moves
-    # e.g. by adding a random negligible 'noise' to each move's score rather than replacing the max()
-    # function below with a random selection from a list of equivalent highest rated moves
-
-    update_board(opponents_move, lost, claimed)
-    countermove = max(next_move_candidates, key=score)
-    update_board(countermove, claimed, lost)
-
-    return countermove
-
-
-def update_board(players_move, players_set, opponents_set):
-    """Maintains the game status after each move and countermove."""
-    # conflicting_lines is a set of lines that containing a mix of both player's symbols,
-    # thus no longer potentially winning lines, thus lines that need be removed from open_lines
-
-    players_set.add(players_move)
-    next_move_candidates.update(neighborhood(players_move))
-    next_move_candidates.difference_update(players_set | opponents_set)
-    conflicting_lines = [line for line in envelope(players_move) if not set(line).isdisjoint(opponents_set)]
-    open_lines.update(envelope(players_move))
-    open_lines.difference_update(conflicting_lines)
-
-
-def score(move):
-    """Evaluates the board from both player's and opponent's perspective and returns the score."""
-    # copy the board and open_lines collection, evaluate the copies updated with the simulated move
-    # and return the score without affecting the previous game state (i.e. the board and open_lines)
-    # IMPROVE: evaluate recursively for each of opponent's next set of reasonable moves
-
-    def evaluate_board(fields_collection, value_table):
-        # find valuable patterns, evaluate each of them and answer the total value of all patterns
+class Engine:
+    """AI player for the Unlimited Tic-Tac-Toe game; an instance holds the state of a single game."""
+    # constants and value tables default to the module level ones; override them in a subclass to modify the strategy
+
+    K, R, BITBOARD, DEPTH, WIDTH, WIN, TT_SIZE, TT_POLICY = K, R, BITBOARD, DEPTH, WIDTH, WIN, TT_SIZE, TT_POLICY
+    THREATS, THREAT_NODES, THREAT_TIME, NUMPY, BOOK, PONDER = THREATS, THREAT_NODES, THREAT_TIME, NUMPY, BOOK, PONDER
+    BEAM = BEAM
+    value_table_opponent, value_table_player = value_table_opponent, value_table_player
+
+    def __init__(self):
+        # attributes representing the game state:
+        # a board consists of two collections representing claimed (owned) and lost positions
+        self.claimed, self.lost = (Bitboard(), Bitboard()) if self.BITBOARD else (set(), set())
+        self.next_move_candidates = set()  # all reasonable candidates for the next move
+        self.open_lines = set()  # all potentially winning, non-empty lines partially taken exclusively by one player
+        self.pattern_counts = Counter()  # histogram of patterns (2+ symbols of one player in an open line) and counts
+        # the lines are represented by their line ids and the patterns by their keys (see geometry module)
+        self.ranks = Counter()  # ranks of the empty positions in open lines by the lines through them (see beam())
+        self.mandatory = Counter()  # numbers of the lines making an empty position a mandatory move (see beam())
+        self.claimed_value, self.lost_value = 0, 0  # running totals of pattern values from both players' perspective
+        self.hash = 0  # Zobrist hash of the board, i.e. of both claimed and lost positions
+        self.transpositions = TranspositionTable(self.TT_SIZE, self.TT_POLICY)  # positions evaluated by search()
+        self.threats = ThreatSolver(self, self.THREAT_NODES, self.THREAT_TIME)  # forced win search over open_lines
+        self.book = open_book(self.BOOK) if self.BOOK and os.path.isfile(self.BOOK) else None  # shared by engines
+        self.book_hits = 0  # number of moves played from the opening book
+        self.cancelled = False  # set by cancel() from another thread to stop play() or ponder() early
+        self.replies, self.replies_hash = {}, None  # countermoves found by ponder() and the hash of their board
+        self.book_replies = set()  # replies whose countermoves found by ponder() are the opening book's
+        self.ponder_hits, self.ponder_misses = 0, 0  # opponent's moves found and not found among the replies
+        # a move is represented by simply a tuple of coordinates (row, column) with the initial move to (0, 0)
+        # next_move_candidates and open_lines are being updated during the game to optimize the computation a bit
+        # pattern_counts and the running totals are updated along with open_lines so that a move can be evaluated
+        # by looking only at the lines in its envelope rather than at all open lines; so are the ranks and
+        # the mandatory moves so that beam() doesn't need to scan open_lines
+        # the hash is updated by make_move() too so the search can recognize positions reached by other move orders;
+        # the transposition table is kept for the whole game as the positions searched for a move recur in the next
+
+    def play(self, opponents_move):
+        """AI player's main function; receives opponent's move (or None when the game begins) and returns a countermove.
+        It plays the opening book's reply or a forced win if there is one, otherwise it uses a heuristics to evaluate
+        each reasonable next move and selects a move with the highest score."""
+
+        self.cancelled = False
+        if opponents_move is None:
+            # this the first move, place your marker at (0, 0) and update game status accordingly
+            self.update_board((0, 0), self.claimed, self.lost)
+            return 0, 0
+        # update board status after opponent's move, select the best countermove and update game status
+        # next_move_candidates collect reasonable candidates for the next move evaluation and selection
+        # IMPROVE: randomize the selection of the countermove from a set of equivalent moves
+        # e.g. by adding a random negligible 'noise' to each move's score rather than replacing the max()
+        # function below with a random selection from a list of equivalent highest rated moves
+
+        countermove = self.pondered_move(opponents_move)
+        self.update_board(opponents_move, self.lost, self.claimed)
+        if countermove is None:
+            countermove = self.choose_move()
+        self.update_board(countermove, self.claimed, self.lost)
+
+        return countermove
+
+    def choose_move(self):
+        """Returns the countermove to the board without playing it: the opening book's reply, the first move of
+        a forced win or the move selected by the heuristic evaluation (or by the search if DEPTH > 1)."""
+
+        countermove = self.book_move()
+        if countermove is None and self.THREATS:
+            sequence = self.threats.solve()
+            countermove = sequence[0] if sequence else None
+        if countermove is None:
+            countermove = (self.search(self.DEPTH) if self.DEPTH > 1 else
+                           self.best_move(self.beam(self.next_move_candidates)))
+        return countermove
+
+    def cancel(self):
+        """Asks play() or ponder() running in another thread to return as soon as possible; it's an optional part
+        of the API used by the curses game. The forced win search gives up and the search returns the best move
+        of its last finished iteration, so the engine plays a legal move and its state stays consistent."""
+        # the flag is checked between the moves simulated by the searches, which take their moves back as usual;
+        # the values of a cancelled search are never stored in the transposition table
+        # the flag is cleared only when play() starts, so a cancel() is lost if it comes before that; a cancel()
+        # coming after play() returns stops the following ponder() even before it starts
+
+        self.cancelled = True
+
+    def ponder(self, replies=None):
+        """Finds the countermoves to the opponent's most likely replies to the board, i.e. the best scoring ones from
+        the opponent's perspective, so that play() answers them at once; it's an optional part of the API used by
+        the curses game to think while the opponent does. It stops early if cancelled; returns the replies found."""
+        # each reply is simulated the same way as by the search (see search_candidates()) and taken back; besides
+        # the countermoves, the searches leave their positions in the transposition table, which play() reuses
+        # even if the opponent's move isn't among the replies
+
+        self.replies, self.replies_hash, self.book_replies = {}, self.hash, set()
+        if self.cancelled:
+            return self.replies
+        replies = self.PONDER if replies is None else replies
+        book_hits, candidates = self.book_hits, self.next_move_candidates
+        for value, reply in self.ordered_moves(candidates, self.lost, self.claimed)[:replies]:
+            if value == self.WIN:
+                continue  # the game would be over
+            undo = self.make_move(reply, self.lost, self.claimed)
+            self.next_move_candidates = self.search_candidates(candidates, reply)
+            try:
+                countermove = self.choose_move()
+            finally:
+                self.next_move_candidates = candidates
+                self.unmake_move(undo)
+            if self.book_hits > book_hits:
+                self.book_hits = book_hits  # a book move is counted when played, see pondered_move()
+                self.book_replies.add(reply)
+            if self.cancelled:
+                break  # the countermove of a cancelled search isn't reliable
+            self.replies[reply] = countermove
+        return self.replies
+
+    def pondered_move(self, opponents_move):
+        """Returns the countermove to the opponent's move found by ponder() for the current board, or None;
+        the replies are dropped either way."""
+
+        if self.replies_hash != self.hash:
+            return None
+        countermove = self.replies.get(opponents_move)
+        if countermove is None:
+            self.ponder_misses += 1
+        else:
+            self.ponder_hits += 1
+            self.book_hits += opponents_move in self.book_replies
+        self.replies, self.replies_hash, self.book_replies = {}, None, set()
+        return countermove
+
+    def setup(self, board):
+        """Places a sequence of (move, own) pairs on the board before the game continues, e.g. a randomized opening;
+        own is True for the engine's own markers. It's an optional part of the API used by headless matches."""
+
+        for move, own in board:
+            if own:
+                self.update_board(move, self.claimed, self.lost)
+            else:
+                self.update_board(move, self.lost, self.claimed)
+
+    def update_board(self, players_move, players_set, opponents_set):
+        """Maintains the game status after each move and countermove."""
+        # the board and open_lines are maintained by make_move(); the game move is never taken back
+        # so the undo record is dropped and next_move_candidates is updated on top of it
+
+        self.make_move(players_move, players_set, opponents_set)
+        self.next_move_candidates.update(self.neighborhood(players_move))
+        self.next_move_candidates.difference_update(players_set | opponents_set)
+
+    def make_move(self, players_move, players_set, opponents_set, ranked=True):
+        """Applies a move to the board and open_lines in place and returns an undo record for unmake_move();
+        the last item of the undo record tells whether the move completed a winning line. The ranks and
+        the mandatory moves are updated only if ranked, a move taken back before beam() is called can skip them."""
+        # conflicting_lines are lines that contain a mix of both player's symbols after the move,
+        # thus no longer potentially winning lines, thus lines that need be removed from open_lines;
+        # only the lines actually added or removed are recorded so the move can be reverted exactly
+        # the move extends the player's pattern in every line without opponent's symbols and kills the opponent's
+        # pattern in every conflicting line; only patterns in the move's envelope change their counts and values
+
+        players_set.add(players_move)
+        previous_hash = self.hash
+        self.hash ^= zobrist_key(players_move, players_set is self.claimed)
+        added_lines, conflicting_lines = [], []
+        players_changes, opponents_changes = Counter(), Counter()
+        winning, length = False, self.K
+        # a line is in open_lines if it contains symbols of just one player; knowing both players' symbols in a line
+        # after the move, it's clear whether the line was in open_lines before the move; the move's bit in a line's
+        # bitmask is the only one set if the line contains just the player's move
+        for (line, players_mask, opponents_mask), move_bit in zip(
+                self.line_masks(players_move, players_set, opponents_set), envelope_bits(length)):
+            if opponents_mask:
+                if players_mask == move_bit:
+                    conflicting_lines.append(line)
+                    if opponents_mask & opponents_mask - 1:  # single symbol patterns have no value and are not tracked
+                        opponents_changes[pattern_key(line, opponents_mask)] -= 1
+            elif players_mask == move_bit:
+                added_lines.append(line)
+            else:
+                players_changes[pattern_key(line, players_mask)] += 1
+                players_count = players_mask.bit_count()
+                if players_count > 2:
+                    players_changes[pattern_key(line, players_mask ^ move_bit)] -= 1
+                winning = winning or players_count == length
+        self.open_lines.update(added_lines)
+        self.open_lines.difference_update(conflicting_lines)
+        rank_changes = None
+        if ranked:
+            rank_changes = self.rank_move(players_move, players_set, opponents_set)
+            self.update_ranks(rank_changes, 1)
+
+        undo = players_move, players_set, added_lines, conflicting_lines, players_changes, opponents_changes, \
+            rank_changes, self.claimed_value, self.lost_value, previous_hash, winning
+        players_delta = self.update_pattern_counts(players_changes, self.value_table(players_set))
+        opponents_delta = self.update_pattern_counts(opponents_changes, self.value_table(opponents_set))
+        if players_set is self.claimed:
+            self.claimed_value += players_delta
+            self.lost_value += opponents_delta
+        else:
+            self.claimed_value += opponents_delta
+            self.lost_value += players_delta
+        return undo
+
+    def line_masks(self, position, players_set, opponents_set):
+        """Returns the line id of each line of the position's envelope along with the bitmasks of both players'
+        symbols in it."""
+        # bitboards provide the bitmasks of a whole envelope at once, sets are looked up position by position
+
+        length = self.K
+        lines = envelope_ids(position, length)
+        if isinstance(players_set, Bitboard) and isinstance(opponents_set, Bitboard):
+            return zip(lines, players_set.envelope_bits(position, length),
+                       opponents_set.envelope_bits(position, length))
+        return zip(lines, envelope_masks(position, players_set, length),
+                   envelope_masks(position, opponents_set, length))
+
+    def unmake_move(self, undo):
+        """Reverts a move applied by make_move() using its undo record."""
+
+        players_move, players_set, added_lines, conflicting_lines, players_changes, opponents_changes, \
+            rank_changes, self.claimed_value, self.lost_value, self.hash, _ = undo
+        self.open_lines.difference_update(added_lines)
+        self.open_lines.update(conflicting_lines)
+        if rank_changes is not None:
+            self.update_ranks(rank_changes, -1)
+        players_set.remove(players_move)
+        for changes in players_changes, opponents_changes:
+            for pattern, change in changes.items():
+                count = self.pattern_counts[pattern] - change
+                if count:
+                    self.pattern_counts[pattern] = count
+                else:
+                    del self.pattern_counts[pattern]
+
+    def rank_move(self, players_move, players_set, opponents_set):
+        """Returns the changes of the ranks and of the mandatory moves (see beam()) made by a move just applied to
+        the board: the open lines of the move's envelope are removed as they were before the move and added as they
+        are after it."""
+        # a line blocked by the move loses its rank, the move's position loses the ranks of all lines through it;
+        # the i-th line of a direction starts at the i-th position of the direction's window (see envelope_masks())
+
+        length, own = self.K, players_set is self.claimed
+        rank_changes = Counter(), Counter()
+        windows = envelope_windows(players_move, length)
+        for index, ((_, players_mask, opponents_mask), move_bit) in enumerate(zip(
+                self.line_masks(players_move, players_set, opponents_set), envelope_bits(length))):
+            window, start = windows[index // length], index % length
+            if opponents_mask:
+                if players_mask == move_bit:
+                    self.rank_line(rank_changes, window, start, opponents_mask, not own, -1)
+                continue
+            if players_mask != move_bit:
+                self.rank_line(rank_changes, window, start, players_mask ^ move_bit, own, -1)
+            self.rank_line(rank_changes, window, start, players_mask, own, 1)
+        return rank_changes
+
+    def rank_line(self, rank_changes, window, start, mask, own, sign):
+        """Adds the changes of the ranks and of the mandatory moves by an open line being added (sign 1) or removed
+        (sign -1) to rank_changes; the line starts at the start-th position of a window of envelope_windows(),
+        the mask holds its owner's symbols, own tells whether the owner is the engine (see beam())."""
+
+        ranks, mandatory = rank_changes
+        count = mask.bit_count()
+        weight, mandatory_ = sign << 2 * count, count > 2 and (count == 4 or not own)
+        for position in window[start:start + self.K]:
+            if not mask & 1:
+                ranks[position] += weight
+                if mandatory_:
+                    mandatory[position] += sign
+            mask >>= 1
+
+    def update_ranks(self, rank_changes, sign):
+        """Applies (sign 1) or reverts (sign -1) the changes of the ranks and of the mandatory moves; only
+        the positions with a non-zero rank or count are kept."""
+
+        for counter, changes in zip((self.ranks, self.mandatory), rank_changes):
+            for position, change in changes.items():
+                count = counter[position] + sign * change
+                if count:
+                    counter[position] = count
+                else:
+                    del counter[position]
+
+    def update_pattern_counts(self, changes, value_table_):
+        """Applies changes to pattern_counts and returns the resulting change of the total value of the patterns."""
+
+        delta = 0
+        for pattern, change in changes.items():
+            count = self.pattern_counts[pattern]
+            if count:
+                delta -= value_table_[self.pattern_to_index(pattern, count)]
+            count += change
+            if count:
+                delta += value_table_[self.pattern_to_index(pattern, count)]
+                self.pattern_counts[pattern] = count
+            else:
+                del self.pattern_counts[pattern]
+        return delta
+
+    def value_table(self, fields_collection):
+        """Returns the table of weights used to evaluate patterns of the given player's symbols."""
+
+        return self.value_table_player if fields_collection is self.claimed else self.value_table_opponent
+
+    def score(self, move):
+        """Evaluates the board from both player's and opponent's perspective and returns the score."""
+        # simulate the move in place, read the running totals of both players' pattern values and revert the move
+        # again to return the score without affecting the previous game state (i.e. the board and open_lines)
+        # Note: search() evaluates the moves recursively for each of opponent's next set of reasonable moves
+
+        undo = self.make_move(move, self.claimed, self.lost, False)
+        score_ = self.claimed_value - self.lost_value
+        self.unmake_move(undo)
+
+        return score_
+
+    def book_move(self):
+        """Returns the opening book's reply to the board or None if the board is not in the book."""
+        # the book is keyed by the same Zobrist hash as the one maintained by make_move(); a reply to an occupied
+        # position can only come from a collision of hashes and is ignored; the reply is played without any search,
+        # the book holds only replies played in enough games with a confident win rate (see book.write_book())
+
+        entry = self.book.get(self.hash) if self.book is not None else None
+        if entry is None or entry[0] in self.claimed or entry[0] in self.lost:
+            return None
+        self.book_hits += 1
+        return entry[0]
+
+    def best_move(self, candidates=None):
+        """Returns the candidate with the highest score; the first one of equally scored candidates, as max() does.
+        The candidates default to next_move_candidates."""
+        # the vectorized scores are the same as the ones of score() so the choice doesn't depend on numpy
+
+        candidates = self.next_move_candidates if candidates is None else candidates
+        if self.NUMPY and vectorized is not None:
+            return vectorized.best_move(self.claimed, self.lost, candidates,
+                                        self.value_table_player, self.value_table_opponent, self.K)
+        return max(candidates, key=self.score)
+
+    def beam(self, candidates):
+        """Returns the candidates worth scoring, the best ranked first: the BEAM candidates ranked highest by the open
+        lines passing through them and all mandatory moves, i.e. the empty positions of the lines with four symbols
+        of either player and of the opponent's lines with three symbols; all candidates if there are at most BEAM."""
+        # a candidate's rank is the sum of the weights of the open lines through it, 4 ** symbols in the line, so
+        # a line with one more symbol outweighs four lines with fewer; make_move() keeps the ranks and the mandatory
+        # moves up to date by the lines of each move's envelope, so beam() only selects from them, which is much
+        # cheaper than scoring all candidates by score() or even by the numpy batch; the beam bounds the search root
+        # the mandatory moves win, block a win or block a three before it becomes an open four; they may lie outside
+        # the candidates, e.g. at the far end of a three, and are scored even if they are ranked below the beam
+
+        if self.BEAM is None or len(candidates) <= self.BEAM:
+            return candidates
+        ranks = self.ranks
+        ranked = nlargest(self.BEAM, candidates, key=ranks.__getitem__)  # ties keep the set's order
+        return ranked + sorted(self.mandatory.keys() - ranked, key=ranks.__getitem__, reverse=True)
+
+    def search(self, depth=None):
+        """Searches the game tree depth moves ahead and returns the best countermove; it uses negamax with alpha-beta
+        pruning and iterative deepening, the board is evaluated by the running totals of pattern values."""
+        # each iteration searches one move deeper than the previous one and the root moves are searched in the order
+        # of the values found by the previous iteration, i.e. the best move so far first, to get the most cutoffs;
+        # the first iteration is the static score (see ordered_moves()) which equals the max() used by play()
+        # Note: only the WIDTH best scoring moves are searched deeper; a root move failing low gets just an upper
+        # bound of its value, which still ranks it below the best move for the next iteration's ordering
+        # positions already searched, e.g. for the previous move, are looked up in the transposition table; its best
+        # move is searched first at the root as well as at the other nodes (see negamax())
+        # Note: with WIDTH = 8 a mid-game move takes ~0.07 s at depth 3 and ~0.2 s (at most ~0.45 s) at depth 4
+
+        depth = self.DEPTH if depth is None else depth
+        ordered = self.ordered_moves(self.beam(self.next_move_candidates), self.claimed, self.lost)
+        moves = [move for _, move in ordered]
+        if not moves or ordered[0][0] == self.WIN:
+            return moves[0] if moves else (0, 0)
+        moves = self.transposition_first(moves, self.next_move_candidates)
+        for depth_ in range(2, depth + 1):
+            alpha, values = -inf, {}
+            for move in moves[:self.WIDTH]:
+                undo = self.make_move(move, self.claimed, self.lost, False)
+                values[move] = value = -self.negamax(depth_ - 1, -inf, -alpha, self.lost, self.claimed,
+                                                     self.search_candidates(self.next_move_candidates, move))
+                self.unmake_move(undo)
+                if self.cancelled:
+                    return moves[0]  # the best move of the last finished iteration
+                alpha = max(alpha, value)
+            moves = sorted(values, key=values.get, reverse=True)  # the sort is stable so ties keep their order
+            self.transpositions.put(self.hash, depth_, values[moves[0]], EXACT, moves[0])
+        return moves[0]
+
+    def negamax(self, depth, alpha, beta, players_set, opponents_set, candidates):
+        """Returns the value of the board for the player to move (i.e. the owner of players_set) searched depth moves
+        ahead; a move found to be worse for the opponent than beta is enough to stop searching the node."""
+        # a win is worth more the sooner it comes, i.e. the more depth remains; a loss is worth the negative value
+        # a value stored in the transposition table by a search at least as deep is reused if it's exact or if it's
+        # a bound outside of the (alpha, beta) window; the value found is stored as a bound unless it's within it
+
+        entry = self.transpositions.get(self.hash)
+        if entry is not None:
+            entry_depth, value, bound, _ = entry
+            if entry_depth >= depth and (bound == EXACT or bound == LOWER and value >= beta or
+                                         bound == UPPER and value <= alpha):
+                return value
+        ordered = self.ordered_moves(candidates, players_set, opponents_set)
+        if not ordered:
+            return 0
+        best, best_move = ordered[0]
+        if best == self.WIN or depth == 1:
+            best += depth if best == self.WIN else 0
+            self.transpositions.put(self.hash, depth, best, EXACT, best_move)
+            return best
+        best = -inf
+        for move in self.transposition_first([move for _, move in ordered[:self.WIDTH]], candidates, entry):
+            undo = self.make_move(move, players_set, opponents_set, False)
+            value = -self.negamax(depth - 1, -beta, -max(alpha, best), opponents_set, players_set,
+                                  self.search_candidates(candidates, move))
+            self.unmake_move(undo)
+            if self.cancelled:
+                return 0  # the value is discarded by search()
+            if value > best:
+                best, best_move = value, move
+                if best >= beta:
+                    break
+        bound = LOWER if best >= beta else UPPER if best <= alpha else EXACT
+        self.transpositions.put(self.hash, depth, best, bound, best_move)
+        return best
+
+    def transposition_first(self, moves, candidates, entry=None):
+        """Returns the moves with the best move stored in the transposition table for the board moved to the front;
+        the stored move is checked to be a candidate as different boards may share the same hash."""
+
+        entry = self.transpositions.get(self.hash) if entry is None else entry
+        if entry is None or entry[-1] not in candidates or entry[-1] == moves[0]:
+            return moves
+        return [entry[-1]] + [move for move in moves if move != entry[-1]]
+
+    def ordered_moves(self, candidates, players_set, opponents_set):
+        """Returns (value, move) pairs of the candidates sorted from the best to the worst move for the player;
+        the value is the score of the board after the move from the player's perspective or WIN for a winning move."""
+
+        sign = 1 if players_set is self.claimed else -1
+        values = []
+        for move in candidates:
+            undo = self.make_move(move, players_set, opponents_set, False)
+            values.append((self.WIN if undo[-1] else sign * (self.claimed_value - self.lost_value), move))
+            self.unmake_move(undo)
+        values.sort(key=itemgetter(0), reverse=True)  # the sort is stable so ties keep the order of the candidates
+        return values
+
+    def search_candidates(self, candidates, move):
+        """Returns candidates for the next move after a move simulated by the search, cf. update_board();
+        a new set is returned, the candidates of the previous move, e.g. next_move_candidates, are kept intact."""
+
+        board = self.claimed, self.lost
+        return candidates.union([position for position in self.neighborhood(move)
+                                 if position not in board[0] and position not in board[1]]).difference([move])
+
+    def evaluate_board(self, fields_collection, value_table_):
+        """Finds valuable patterns in open_lines, evaluates each of them and returns the total value of all patterns."""
         # valuable patterns are potential winning lines with 2 to 4 player's symbols inside them
-        # Note: defining evaluate_board() here allows to use open_lines_ variable defined in score()
-        c = Counter([line & fields_collection for line in open_lines_])
-        e = [value_table[pattern_to_index(pattern, count)] for pattern, count in c.items() if len(pattern) > 1]
+        # Note: this is a full recount over all open lines; the game uses the running totals maintained by make_move()
+
+        masks = [(line, line_mask(line, fields_collection)) for line in self.open_lines]
+        c = Counter([pattern_key(line, mask) for line, mask in masks if mask & mask - 1])
+        e = [value_table_[self.pattern_to_index(pattern, count)] for pattern, count in c.items()]
         return sum(e)
 
-    claimed_ = copy(claimed)  # no need to copy lost because only claimed_ get updated
-    open_lines_ = copy(open_lines)
-    # update simulated board state for move (same code as in update_board function except next_move_candidates)
-    claimed_.add(move)
-    conflicting_lines = [line for line in envelope(move) if not set(line).isdisjoint(lost)]
-    open_lines_.update(envelope(move))
-    open_lines_.difference_update(conflicting_lines)
-    # evaluate the board from both players' point of view
-    player_score = evaluate_board(claimed_, value_table_player)
-    opponent_score = evaluate_board(lost, value_table_opponent)
-
-    return player_score - opponent_score
-
-
-def pattern_to_index(pattern, count):
-    """A heuristic formula converting a (pattern, count) pair to an index into a table of relative weights."""
-    # derived manually to provide somewhat satisfactory board evaluation results to beat a mediocre player
-
-    return ((K + 1) * 2 - len(pattern)) * (len(pattern) - 1) // 2 + count
-
-
-def envelope(position, length=K):
-    """A helper function to model all potentially winning scenarios around a given position."""
-    # return all lines containing the position with coordinates given in the position tuple
-    # a line represents K consecutive positions (global default K=5) in any direction,
-    # i.e. horizontal, vertical or any of the two diagonal
-    # e.g. there is 20 lines in an envelope for each position (considering the default K=5)
-    row, col = position
-    envelope_ = []
-    dir_matrix = [(1, 1), (1, 0), (0, 1), (-1, 1)]  # matrix to determine direction
-    for dy, dx in dir_matrix:  # each of 4 possible directions has a distinct "signature"
-        for i in range(length):  # offset to locate one end of generated lines
-            line = []
-            for j in range(length):  # length of generated lines
-                line.append((row + dy * (i - j), col + dx * (i - j)))
-            envelope_.append(frozenset(line))
-    return envelope_
-
-
-def neighborhood(position, radius=R):
-    """A helper function to collect all neighboring positions within a given distance from a given position."""
-
-    # limit the radius for the initial few moves to avoid nonsensical choices having equivalent scores
-    # Note: is this limiting really necessary? Needs more testing...
-    radius = max(1, min(radius, len(claimed)))
-    row, col = position
-    neighborhood_ = set()
-    for row_ in range(-radius, radius + 1):
-        for col_ in range(-radius, radius + 1):
-            neighborhood_.add((row + row_, col + col_))
-    neighborhood_.remove((row, col))
-    return neighborhood_
+    def pattern_to_index(self, pattern, count):
+        """A heuristic formula converting a (pattern, count) pair to an index into a table of relative weights."""
+        # derived manually to provide somewhat satisfactory board evaluation results to beat a mediocre player
+
+        size = pattern_size(pattern, self.K)
+        return ((self.K + 1) * 2 - size) * (size - 1) // 2 + count
+
+    def neighborhood(self, position, radius=None):
+        """A helper function to collect all neighboring positions within a given distance from a given position."""
+
+        # limit the radius for the initial few moves to avoid nonsensical choices having equivalent scores
+        # Note: is this limiting really necessary? Needs more testing...
+        radius = max(1, min(self.R if radius is None else radius, len(self.claimed)))
+        row, col = position
+        neighborhood_ = set()
+        for row_ in range(-radius, radius + 1):
+            for col_ in range(-radius, radius + 1):
+                neighborhood_.add((row + row_, col + col_))
+        neighborhood_.remove((row, col))
+        return neighborhood_
+
+
+engine = Engine()  # the engine playing the game of the module level play() function
+
+
+def play(opponents_move):
+    """AI player's main function; receives opponent's move (or None when the game begins) and returns a countermove.
+    The function's name 'play' is mandatory as part of the API contract; it plays a single game using the module
+    level engine, use separate Engine instances to play more games at the same time."""
+
+    return engine.play(opponents_move)
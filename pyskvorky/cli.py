@@ -16,6 +16,12 @@ def get_cli_args():
                         help="pause bot vs bot game after each move")
     parser.add_argument("-s", "--sleep", nargs="?", default=0, const=0.1, type=float, metavar="seconds",
                         help="run sleep timer after each move")
+    parser.add_argument("-t", "--telemetry", action="store_true",
+                        help="show AI players' per-move telemetry on the status line")
+    parser.add_argument("-l", "--log", default=None, metavar="<file name>",
+                        help="append the game to a file of game records (see records module)")
+    parser.add_argument("-e", "--external", action="store_true",
+                        help="run AI players as external processes (see protocol module)")
     parser.add_argument("-v", "--version", action="version", version="%(prog)s 0.1")
 
     args = parser.parse_args()
@@ -26,5 +32,159 @@ def get_cli_args():
         x_player, o_player = o_player, x_player
     sleep_time = args.sleep
     step_moves = args.debug and (x_player != "human") and (o_player != "human")
+    telemetry = args.telemetry
+    log_file = args.log
+    external = args.external
 
-    return x_player, o_player, sleep_time, step_moves
+    return x_player, o_player, sleep_time, step_moves, telemetry, log_file, external
+
+
+def get_tournament_args(argv=None):
+    """Get input arguments of a headless tournament"""
+    parser = ArgumentParser(description="Play a tournament of headless games between two AI player modules in parallel; players swap X and O markers after each game. Results of the games are streamed to a file, one JSON object per line.", epilog="Enjoy!")
+
+    parser.add_argument("-x", "--X_player", default="bot", metavar="<module name>",
+                        help="first player, X in the first game: default is 'bot'")
+    parser.add_argument("-o", "--O_player", default="rob", metavar="<module name>",
+                        help="second player, O in the first game: default is 'rob'")
+    parser.add_argument("-n", "--games", default=100, type=int, metavar="number",
+                        help="number of games: default is 100")
+    parser.add_argument("-j", "--jobs", default=None, type=int, metavar="number",
+                        help="number of worker processes: default is the number of CPUs")
+    parser.add_argument("-p", "--opening", default=2, type=int, metavar="moves",
+                        help="number of random opening moves played before the players take over: default is 2")
+    parser.add_argument("-m", "--max_moves", default=100, type=int, metavar="moves",
+                        help="max number of moves in a game, including the opening: default is 100")
+    parser.add_argument("-s", "--seed", default=0, type=int, metavar="number",
+                        help="seed of the random openings: default is 0")
+    parser.add_argument("-f", "--file", default="tournament.jsonl", metavar="<file name>",
+                        help="file to write the results to: default is 'tournament.jsonl'")
+    parser.add_argument("-l", "--log", default=None, metavar="<file name>",
+                        help="append the games to a file of game records (see records module)")
+    parser.add_argument("-e", "--external", action="store_true",
+                        help="run the players as pools of external processes (see protocol module)")
+    parser.add_argument("-t", "--time_limit", default=5.0, type=float, metavar="seconds",
+                        help="time limit of a move of an external player: default is 5 seconds")
+
+    return parser.parse_args(argv)
+
+
+def get_book_args(argv=None):
+    """Get input arguments of the opening book builder"""
+    parser = ArgumentParser(description="Build an opening book from self-play games of an AI player and from games recorded by tournaments. The book maps positions of the first moves of the games to the replies with the best results.", epilog="Enjoy!")
+
+    parser.add_argument("-f", "--file", default=None, metavar="<file name>",
+                        help="file to write the book to: default is 'book.bin' in the directory of the modules, "
+                             "where the bot looks it up")
+    parser.add_argument("-c", "--corpus", nargs="*", default=[], metavar="<file name>",
+                        help="results of tournaments (JSON lines files) to build the book from")
+    parser.add_argument("-n", "--games", default=0, type=int, metavar="number",
+                        help="number of self-play games to build the book from: default is 0")
+    parser.add_argument("-x", "--player", default="bot", metavar="<module name>",
+                        help="AI player of the self-play games: default is 'bot'")
+    parser.add_argument("-p", "--plies", default=12, type=int, metavar="moves",
+                        help="number of the first moves of each game recorded in the book: default is 12")
+    parser.add_argument("-j", "--jobs", default=None, type=int, metavar="number",
+                        help="number of worker processes playing the self-play games: default is the number of CPUs")
+    parser.add_argument("-s", "--seed", default=0, type=int, metavar="number",
+                        help="seed of the random openings of the self-play games: default is 0")
+    parser.add_argument("-m", "--min-games", default=5, type=int, metavar="number",
+                        help="number of games a reply has to be played in to be written to the book: default is 5")
+
+    return parser.parse_args(argv)
+
+
+def get_annotate_args(argv=None):
+    """Get input arguments of the annotation of recorded games"""
+    parser = ArgumentParser(description="Annotate games recorded in game records files: each move is compared to the move preferred by an AI player's engine in the same position. Annotations are written to a file, one JSON object per game and line, in the order of the games.", epilog="Enjoy!")
+
+    parser.add_argument("records", nargs="+", metavar="<file name>",
+                        help="game records files (see records module) to annotate")
+    parser.add_argument("-f", "--file", default="annotations.jsonl", metavar="<file name>",
+                        help="file to write the annotations to: default is 'annotations.jsonl'")
+    parser.add_argument("-x", "--player", default="bot", metavar="<module name>",
+                        help="AI player module providing the engine: default is 'bot'")
+    parser.add_argument("-b", "--blunder", default=100, type=int, metavar="score",
+                        help="score delta making a move a blunder: default is 100")
+    parser.add_argument("-j", "--jobs", default=None, type=int, metavar="number",
+                        help="number of worker processes: default is the number of CPUs")
+    parser.add_argument("-c", "--chunk", default=8, type=int, metavar="games",
+                        help="number of games sent to a worker process at once: default is 8")
+
+    return parser.parse_args(argv)
+
+
+def get_server_args(argv=None):
+    """Get input arguments of the game server"""
+    parser = ArgumentParser(description="Serve games against AI players to many clients at once over TCP or a Unix socket using a line based protocol (see server module). The AI players' moves are computed by a pool of worker processes.", epilog="Enjoy!")
+
+    parser.add_argument("-x", "--players", nargs="+", default=["bot"], metavar="<module name>",
+                        help="AI player modules to play against, the first one unless chosen: default is 'bot'")
+    parser.add_argument("-a", "--address", default="127.0.0.1", metavar="host",
+                        help="host to listen on: default is 127.0.0.1")
+    parser.add_argument("-p", "--port", default=7575, type=int, metavar="number",
+                        help="TCP port to listen on: default is 7575")
+    parser.add_argument("-u", "--unix", default=None, metavar="<file name>",
+                        help="listen on a Unix socket instead of a TCP port")
+    parser.add_argument("-j", "--jobs", default=None, type=int, metavar="number",
+                        help="number of worker processes: default is the number of CPUs")
+    parser.add_argument("-t", "--time_limit", default=10.0, type=float, metavar="seconds",
+                        help="time limit of an AI player's move, it loses the game if exceeded: default is 10 seconds")
+    parser.add_argument("-i", "--idle", default=300.0, type=float, metavar="seconds",
+                        help="time after which an idle client is disconnected: default is 300 seconds")
+    parser.add_argument("-m", "--max_moves", default=100, type=int, metavar="moves",
+                        help="max number of moves in a game: default is 100")
+
+    return parser.parse_args(argv)
+
+
+def get_loadgen_args(argv=None):
+    """Get input arguments of the load generator of the game server"""
+    parser = ArgumentParser(description="Load the game server by many concurrent clients playing games against its AI player; the results, the latencies of the server's moves and the server's metrics are printed.", epilog="Enjoy!")
+
+    parser.add_argument("-c", "--clients", default=10, type=int, metavar="number",
+                        help="number of concurrent clients: default is 10")
+    parser.add_argument("-n", "--games", default=2, type=int, metavar="number",
+                        help="number of games played by each client: default is 2")
+    parser.add_argument("-x", "--player", default="bot", metavar="<module name>",
+                        help="AI player module of the server to play against: default is 'bot'")
+    parser.add_argument("-a", "--address", default="127.0.0.1", metavar="host",
+                        help="host of the server: default is 127.0.0.1")
+    parser.add_argument("-p", "--port", default=7575, type=int, metavar="number",
+                        help="TCP port of the server: default is 7575")
+    parser.add_argument("-u", "--unix", default=None, metavar="<file name>",
+                        help="connect to a Unix socket instead of a TCP port")
+    parser.add_argument("-s", "--seed", default=0, type=int, metavar="number",
+                        help="seed of the clients' random moves: default is 0")
+
+    return parser.parse_args(argv)
+
+
+def get_tuner_args(argv=None):
+    """Get input arguments of the value tables tuner"""
+    parser = ArgumentParser(description="Tune the bot's value tables by SPSA in self-play matches played in parallel, then race the tuned tables and the Tribonacci tables against the bot's tables, dropping clearly losing candidates early. The best tables and the statistics of the matches are written to a JSON file.", epilog="Enjoy!")
+
+    parser.add_argument("-f", "--file", default="tuning.json", metavar="<file name>",
+                        help="file to write the report to: default is 'tuning.json'")
+    parser.add_argument("-i", "--iterations", default=50, type=int, metavar="number",
+                        help="number of SPSA iterations: default is 50")
+    parser.add_argument("-n", "--pairs", default=8, type=int, metavar="number",
+                        help="number of game pairs of a match of an iteration: default is 8")
+    parser.add_argument("-r", "--rounds", default=10, type=int, metavar="number",
+                        help="max number of rounds of the race of the candidates: default is 10")
+    parser.add_argument("-b", "--batch", default=10, type=int, metavar="number",
+                        help="number of game pairs of a candidate in a round of the race: default is 10")
+    parser.add_argument("-j", "--jobs", default=None, type=int, metavar="number",
+                        help="number of worker processes: default is the number of CPUs")
+    parser.add_argument("-p", "--opening", default=2, type=int, metavar="moves",
+                        help="number of random opening moves of each game: default is 2")
+    parser.add_argument("-m", "--max_moves", default=100, type=int, metavar="moves",
+                        help="max number of moves in a game, including the opening: default is 100")
+    parser.add_argument("-s", "--seed", default=0, type=int, metavar="number",
+                        help="seed of the perturbations and of the random openings: default is 0")
+    parser.add_argument("-c", "--perturbation", default=0.2, type=float, metavar="ratio",
+                        help="relative size of the first perturbations of the values: default is 0.2")
+    parser.add_argument("-a", "--step", default=0.1, type=float, metavar="size",
+                        help="size of the first SPSA steps: default is 0.1")
+
+    return parser.parse_args(argv)
@@ -0,0 +1,66 @@
+"""Game control rules shared by the curses game and headless matches."""
+from time import perf_counter
+from geometry import envelope_ids, line_positions
+from helper import validate_move, PlayerError, K
+
+MAX_MOVES = 100  # max number of moves; IMPROVE: introduce a stalemate
+NO_WIN = frozenset()  # winning fields of a move which didn't win
+
+
+class LineCounts:
+    """Numbers of a player's fields in each line containing any of them, updated move by move; a move completing
+    K fields in a line wins. The winning fields of the last move are cached for highlighting."""
+    # the lines are keyed by their line ids (see geometry.line_id()), the same as the engine's open lines, so a move
+    # updates the counts of the 4*K lines of its envelope (see geometry.envelope_ids()) without building any set;
+    # it gives the same result as winning_set()
+
+    def __init__(self, fields=(), length=K):
+        self.length = length
+        self.counts = {}  # line ids mapped to the numbers of the player's fields
+        self.winning_fields = NO_WIN  # all winning lines of the last move
+        for position in fields:
+            self.add(position)
+
+    def add(self, move):
+        """Count a new field in all lines containing it; return the fields of all lines it completed."""
+
+        counts, get, length = self.counts, self.counts.get, self.length
+        lines = envelope_ids(move, length)
+        won = False
+        for line in lines:
+            count = get(line, 0) + 1
+            counts[line] = count
+            if count == length:
+                won = True
+        self.winning_fields = NO_WIN
+        if won:  # rare, the winning lines are collected in a second pass
+            self.winning_fields = frozenset().union(*(line_positions(line) for line in lines
+                                                      if counts[line] == length))
+        return self.winning_fields
+
+
+def game_moves(player, opponent, move=None, max_moves=MAX_MOVES):
+    """Let the players take turns until one of them wins or max_moves moves are played; the player moves first.
+    The move argument is the last move played before (None when the game begins). After each move yield the player,
+    the opponent, the move, the time the player took to decide and the winning set (empty unless the move won).
+    Raise PlayerError if the player moves to a taken field."""
+    # a player is an instance of helper.Player; its play() is either an AI player's main function or a human input
+    # each player's line counts are updated once per move to detect a win (see LineCounts); fields already marked
+    # before the game, e.g. an opening, are counted first; a taken field must not be counted again, the line counts
+    # would then "win" by a line of fewer than K fields
+
+    lines, opponents_lines = LineCounts(player.fields), LineCounts(opponent.fields)
+    for _ in range(max_moves):
+        start = perf_counter()
+        move = validate_move(player.play(move))  # check if returned move meets api reqs; see note at validate_move()
+        think_time = perf_counter() - start
+        if move in player.fields or move in opponent.fields:
+            raise PlayerError(f"player {player.sym} played the taken field {move}")
+        player.fields.add(move)
+        winning_fields = lines.add(move)
+        yield player, opponent, move, think_time, winning_fields
+        if winning_fields:
+            break
+        # swap players before the next move
+        player, opponent = opponent, player
+        lines, opponents_lines = opponents_lines, lines
@@ -0,0 +1,153 @@
+"""Geometry of the board shared by the game control program and the players: potentially winning lines."""
+from functools import lru_cache
+
+K = 5  # number of consecutive positions marked with the same symbol required to win
+
+# envelopes of recently used positions are kept in a bounded cache; a position's envelope is requested over and over
+# during a game (each time a move is evaluated, played or checked for a win) while the game itself stays local
+CACHE_SIZE = 4096
+LINE_CACHE_SIZE = 8192  # positions of the lines scanned by each move of a game, see line_positions()
+DIRECTIONS = ((1, 1), (1, 0), (0, 1), (-1, 1))  # a step along a line in each of the 4 directions
+
+# a line is identified by an integer (line id) packing its length, direction and anchor, i.e. its first position
+# along the direction; the coordinates are offset by BIAS so that a line id can be unpacked again, they have to stay
+# within +-BIAS, far beyond any board that can be played; a line id takes a fraction of the memory of a frozenset of
+# the line's positions and it's much faster to hash and compare, the positions are computed only when needed and the
+# ones of recently used lines are shared by all games of a process via a bounded cache
+# a pattern, i.e. a player's symbols in a line, is identified the same way by its first symbol's position and
+# a bitmask of the symbols relative to it, so that the same symbols give the same key in any line containing them
+# bit i of a line's bitmask stands for the line's position i steps from the anchor, as in Bitboard.envelope_bits()
+BIAS = 1 << 20
+STEPS = tuple((dy << 21) + dx for dy, dx in DIRECTIONS)  # changes of a line id by moving its anchor one step
+
+
+@lru_cache(maxsize=None)
+def line_offsets(length=K):
+    """Return positions of all lines containing the (0, 0) position, relative to it; computed once for each length."""
+    # a line represents K consecutive positions (global default K=5) in any direction,
+    # i.e. horizontal, vertical or any of the two diagonal
+    # the order of lines and positions is the same as in the original nested loops of envelope()
+
+    offsets = []
+    for dy, dx in DIRECTIONS:  # each of 4 possible directions has a distinct "signature"
+        for i in range(length):  # offset to locate one end of generated lines
+            offsets.append(tuple((dy * (i - j), dx * (i - j)) for j in range(length)))
+    return tuple(offsets)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def envelope(position, length=K):
+    """A helper function to model all potentially winning scenarios around a given position."""
+    # return all lines containing the position with coordinates given in the position tuple
+    # e.g. there is 20 lines in an envelope for each position (considering the default K=5)
+    # the returned tuple is shared by all callers via the cache, so neither it nor its lines can be modified
+
+    row, col = position
+    return tuple(frozenset([(row + dy, col + dx) for dy, dx in line]) for line in line_offsets(length))
+
+
+def line_id(direction, anchor, length=K):
+    """Return the line id of a line given by its direction (an index into DIRECTIONS), anchor and length."""
+
+    row, col = anchor
+    return (length << 44) + (direction << 42) + ((row + BIAS) << 21) + col + BIAS
+
+
+def unpack(line):
+    """Return the direction (an index into DIRECTIONS), anchor and length of a line given by its line id."""
+
+    return line >> 42 & 3, ((line >> 21 & (1 << 21) - 1) - BIAS, (line & (1 << 21) - 1) - BIAS), line >> 44
+
+
+@lru_cache(maxsize=None)
+def envelope_offsets(length=K):
+    """Return the line ids of envelope((0, 0)) relative to line_id(0, (0, 0), 0); computed once for each length."""
+
+    origin = line_id(0, (0, 0), 0)
+    return tuple(line_id(index // length, line[-1], length) - origin
+                 for index, line in enumerate(line_offsets(length)))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def envelope_ids(position, length=K):
+    """Return the line ids of the lines of envelope(position) in the same order."""
+    # the line ids of a position's envelope are the ones of envelope((0, 0)) moved by the position
+
+    origin = line_id(0, position, 0)
+    return tuple(offset + origin for offset in envelope_offsets(length))
+
+
+@lru_cache(maxsize=LINE_CACHE_SIZE)
+def line_positions(line):
+    """Return the positions of a line given by its line id as a frozenset, like a line of envelope()."""
+    # a frozenset rather than a tuple so that set operations with the board reuse the hashes of its positions
+
+    direction, (row, col), length = unpack(line)
+    dy, dx = DIRECTIONS[direction]
+    return frozenset((row + dy * i, col + dx * i) for i in range(length))
+
+
+def line_mask(line, fields):
+    """Return the bitmask of the fields (a collection of positions) in a line given by its line id."""
+
+    direction, (row, col), length = unpack(line)
+    dy, dx = DIRECTIONS[direction]
+    mask = 0
+    for i in range(length):
+        if (row + dy * i, col + dx * i) in fields:
+            mask |= 1 << i
+    return mask
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def envelope_windows(position, length=K):
+    """Return the positions less than length steps from the position in each direction, the anchor of the first
+    line of envelope(position) in the direction first."""
+
+    row, col = position
+    return tuple(tuple((row + dy * i, col + dx * i) for i in range(1 - length, length)) for dy, dx in DIRECTIONS)
+
+
+def envelope_masks(position, fields, length=K):
+    """Return the bitmask of the fields (a collection of positions) in each line of envelope(position)."""
+    # the fields are looked up once per position of the envelope; the i-th line of a direction starts at the i-th
+    # position of the direction's window, cf. Bitboard.envelope_bits()
+
+    full, shifts, masks = (1 << length) - 1, range(length), []
+    for window in envelope_windows(position, length):
+        bits = 0
+        for i, window_position in enumerate(window):
+            if window_position in fields:
+                bits |= 1 << i
+        masks.extend(bits >> i & full for i in shifts)
+    return masks
+
+
+@lru_cache(maxsize=None)
+def envelope_bits(length=K):
+    """Return the bit of the position in the bitmask of each line of the position's envelope."""
+
+    return tuple(1 << length - 1 - index % length for index in range(4 * length))
+
+
+def pattern_key(line, mask):
+    """Return the key of a pattern given by a line id and a non-zero bitmask of the symbols in the line."""
+    # the pattern's anchor is moved from the line's anchor to the first symbol
+
+    shift = (mask & -mask).bit_length() - 1
+    return (line + shift * STEPS[line >> 42 & 3]) << (line >> 44) | mask >> shift
+
+
+def pattern_size(pattern, length=K):
+    """Return the number of symbols of a pattern given by its key and the length of its line."""
+
+    return (pattern & (1 << length) - 1).bit_count()
+
+
+def cache_stats():
+    """Return hits, misses, current size and hit rate of the envelope caches, i.e. of envelope() and envelope_ids()."""
+
+    infos = envelope.cache_info(), envelope_ids.cache_info()
+    hits, misses = sum(info.hits for info in infos), sum(info.misses for info in infos)
+    return {"hits": hits, "misses": misses, "size": sum(info.currsize for info in infos),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
@@ -1,4 +1,8 @@
 """Helper functions and custom exceptions."""
+from importlib import import_module
+from importlib.util import find_spec, module_from_spec
+from geometry import envelope
+from bitboard import Bitboard
 
 K = 5  # number of consecutive positions marked with the same symbol required to win; IMPROVE: make it a parameter
 
@@ -11,32 +15,13 @@ def winning_set(move, player, length=K):
 
     if move is None:  # nothing interesting before the initial move
         return frozenset()
+    if isinstance(player.fields, Bitboard):  # bitboards find winning lines using bitwise operations
+        return player.fields.winning_set(move, length)
     # collect and return a union of all winning lines in case there are more, not just one
-    winning_lines = {line for line in envelope(move) if move and len(line & player.fields) == length}
+    winning_lines = {line for line in envelope(move, length) if move and len(line & player.fields) == length}
     return frozenset.union(*winning_lines, frozenset())  # add empty frozenset to prevent .union() error
 
 
-def envelope(position, length=K):
-    """A helper function to model all potentially winning scenarios around a given position."""
-    # return all lines containing the position with coordinates given in the position tuple
-    # a line represents K consecutive positions (global default K=5) in any direction,
-    # i.e. horizontal, vertical or any of the two diagonal
-    # e.g. there is 20 lines in an envelope for each position (considering the default K=5)
-    # Note: this is a copy of envelope() in bot module; it has to be copied here because the bot module
-    # can change its implementation, name or in general change its strategy and remove it altogether
-
-    row, col = position
-    envelope_ = []
-    dir_matrix = [(1, 1), (1, 0), (0, 1), (-1, 1)]  # matrix to determine direction
-    for dy, dx in dir_matrix:  # each of 4 possible directions has a distinct "signature"
-        for i in range(length):  # offset to locate one end of generated lines
-            line = []
-            for j in range(length):  # length of generated lines
-                line.append((row + dy * (i - j), col + dx * (i - j)))
-            envelope_.append(frozenset(line))
-    return envelope_
-
-
 def visible_playfield(board_contents):
     """Return coordinates of the upper left and bottom right corners of the part of the board to be displayed;
     it is determined dynamically as the part of the board containing marked fields plus some buffer space around."""
@@ -69,6 +54,42 @@ def validate_move(move):
     return move  # returns only when move is validated, otherwise exits via AssertionError
 
 
+def load_player(module_name, telemetry=None):
+    """Import an AI player module and return its main function 'play'; see the API contract in the bot module."""
+    # a module providing an Engine class gets a new instance of the engine for each game (see new_player()) so that
+    # the same module can be playing more games at the same time, even against itself; otherwise the module level
+    # play() is used; if the player's module name is not found in the app's directory a ModuleNotFoundError is raised
+
+    if has_engine(module_name):
+        return new_player(module_name, telemetry).play
+    return import_module(module_name).play
+
+
+def new_player(module_name, telemetry=None):
+    """Return a new AI player with a game state of its own: an instance of the module's Engine class if it provides
+    one, otherwise a new copy of the module itself; either way the returned object provides the play() function.
+    A telemetry object (see telemetry module) is attached to a new engine; modules without an Engine aren't
+    instrumented."""
+    # unlike import_module(), which returns the same module object every time, module_from_spec() creates a new
+    # module object with a separate namespace each time, i.e. with fresh globals representing the game state
+
+    if has_engine(module_name):
+        engine = import_module(module_name).Engine()
+        if telemetry is not None:
+            telemetry.attach(engine)
+        return engine
+    spec = find_spec(module_name)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def has_engine(module_name):
+    """Check whether an AI player module provides an Engine class, i.e. whether it can play against itself."""
+
+    return hasattr(import_module(module_name), "Engine")
+
+
 class Player:
     """Simple representation of a player."""
     # a player consists of a symbol, a function name implementing player's strategy, a visual style on the screen
@@ -77,7 +98,8 @@ class Player:
         self.sym = sym
         self.play = play
         self.style = style
-        self.fields = fields or set()  # this is a hack to set a distinct mutable default value for each instance
+        # set a distinct mutable default value for each instance; 'fields or set()' would replace empty bitboards
+        self.fields = set() if fields is None else fields
         # https://stackoverflow.com/questions/2681243/how-should-i-declare-default-values-for-instance-variables-in-python
         # setting a mutable default value using dataclasses default_factory is an alternative:
         # fields: set = field(default_factory=set)  # where field is imported from dataclasses
@@ -93,3 +115,7 @@ class QuitGame(Exception):
 
 class DuplicatePlayer(Exception):
     """A custom exception."""
+
+
+class PlayerError(Exception):
+    """A custom exception."""
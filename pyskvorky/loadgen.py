@@ -0,0 +1,100 @@
+"""Load generator of the game server (see server module): many concurrent clients play games against the server's
+AI player and the results, the latencies of the server's moves seen by the clients and the server's metrics are
+reported. Run the server and the load generator from the project root directory using
+    python pyskvorky/server.py
+    python pyskvorky/loadgen.py -c 50 -n 4
+commands; each client places its markers at random free positions near the server's last move."""
+
+import asyncio
+from collections import Counter
+from random import Random
+import json
+from time import perf_counter
+from cli import get_loadgen_args
+from protocol import format_move, parse_move
+from server import percentiles, HOST, PORT
+
+NEAR = 2  # a client's move is at most this distance from the server's last move
+
+
+async def connect(host=HOST, port=PORT, path=None):
+    """Open a connection to the server; return its (reader, writer) pair."""
+
+    if path is not None:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+
+async def request(reader, writer, command):
+    """Send a command to the server and return its answer; raise ConnectionError if the server closed the
+    connection."""
+
+    writer.write(command.encode() + b"\n")
+    await writer.drain()
+    answer = await reader.readline()
+    if not answer:
+        raise ConnectionError("the server closed the connection")
+    return answer.decode().strip()
+
+
+async def play_client(connection, games, module_name, rnd, results, latencies):
+    """Play a number of games on a connection, beginning every other game at random; count the results and append
+    the latencies of the server's moves in seconds."""
+
+    reader, writer = connection
+    for _ in range(games):
+        answer = await request(reader, writer, f"START {module_name}")
+        if not answer.startswith("OK"):
+            results["ERROR"] += 1
+            continue
+        fields, last_move = set(), (0, 0)
+        answer = await request(reader, writer, "BEGIN") if rnd.random() < 0.5 else "MOVE"
+        while answer.startswith("MOVE"):
+            if answer != "MOVE":  # the server moved
+                last_move = parse_move(answer.split()[1])
+                fields.add(last_move)
+            move = last_move
+            while move in fields:
+                move = last_move[0] + rnd.randint(-NEAR, NEAR), last_move[1] + rnd.randint(-NEAR, NEAR)
+            fields.add(move)
+            start = perf_counter()
+            answer = await request(reader, writer, f"TURN {format_move(move)}")
+            latencies.append(perf_counter() - start)
+        results[answer.split()[0]] += 1
+
+
+async def run_load(clients, games, module_name="bot", host=HOST, port=PORT, path=None, seed=0):
+    """Let a number of concurrent clients play a number of games each; return the summary of the load: the results
+    of the games from the server's point of view, the numbers of the moves and the games per second, the percentiles
+    of the latencies in milliseconds and the server's metrics."""
+
+    results, latencies = Counter(), []
+    connections = [await connect(host, port, path) for _ in range(clients)]
+    start = perf_counter()
+    try:
+        await asyncio.gather(*(play_client(connection, games, module_name, Random(seed + client), results, latencies)
+                               for client, connection in enumerate(connections)))
+        elapsed = perf_counter() - start
+        stats = json.loads(await request(*connections[0], "STATS"))
+    finally:
+        for _, writer in connections:
+            writer.close()
+    return {"clients": clients, "games": clients * games, "results": dict(results), "moves": len(latencies),
+            "games per second": clients * games / elapsed,
+            "latency ms": {name: None if latency is None else round(latency * 1e3, 3)
+                           for name, latency in percentiles(latencies).items()},
+            "server": stats}
+
+
+def main():
+    """Run the load given by the cli arguments and print its summary."""
+
+    args = get_loadgen_args()
+    summary = asyncio.run(run_load(args.clients, args.games, args.player, args.address, args.port, args.unix,
+                                   args.seed))
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Out-of-process AI players: a line based player protocol over stdin and stdout, similar to the Gomocup piskvork
+protocol, an adapter running any AI player module as a long-lived process speaking the protocol and a pool of warm
+player processes used by game controllers. Run the adapter from the project root directory using
+    python pyskvorky/protocol.py bot
+command; any other program speaking the protocol can be played the same way (see RemotePlayer).
+
+The controller sends commands, one per line, and the player answers each of them by a single line:
+    START                       OK              a new game starts, the player forgets any previous game
+    BOARD                       OK              followed by lines <row>,<col>,<who> and a DONE line: the fields
+                                                marked before the game continues (see setup()); who is 1 for
+                                                the player's own fields and 2 for the opponent's
+    BEGIN                       <row>,<col>     the player makes the first move of the game
+    TURN <row>,<col>            <row>,<col>     the opponent's move; the player answers with its countermove
+    ABOUT                       name="<name>"   the player's name
+    END                                         the player exits without an answer
+A command which fails is answered by ERROR <message>, an unknown command by UNKNOWN <command>; the player keeps
+running either way. Unlike piskvork, the coordinates are the board's (row, col) of the unlimited board, negative
+ones included, START has no board size and the player doesn't move after BOARD."""
+
+from contextlib import contextmanager
+from itertools import takewhile
+import os
+import queue
+import subprocess
+import sys
+import threading
+from helper import new_player, PlayerError
+
+TIME_LIMIT = 5.0  # default time limit of a move in seconds
+START_TIME_LIMIT = 30.0  # time limit of the commands starting a game, they may wait for a new process to start up
+
+
+def format_move(move):
+    """Return a move as a <row>,<col> line of the protocol."""
+
+    return f"{move[0]},{move[1]}"
+
+
+def parse_move(text):
+    """Return the move of a <row>,<col> line of the protocol; raise ValueError if it's not a move."""
+
+    row, col = text.split(",")
+    return int(row), int(col)
+
+
+def parse_field(text):
+    """Return the (move, own) pair of a <row>,<col>,<who> line of the protocol; raise ValueError if it's not a field."""
+
+    row, col, who = text.split(",")
+    if who.strip() not in ("1", "2"):
+        raise ValueError(f"invalid field {text.strip()!r}")
+    return (int(row), int(col)), who.strip() == "1"
+
+
+def serve(module_name, infile, outfile):
+    """Answer the commands of the protocol read from a file by an AI player module until END or the end of the file;
+    each game is played by a new player (see helper.new_player())."""
+
+    def answer(line):
+        outfile.write(line + "\n")
+        outfile.flush()
+
+    engine = None
+    for line in infile:
+        command, _, argument = line.strip().partition(" ")
+        command = command.upper()
+        try:
+            if command == "END":
+                break
+            if command == "START":
+                engine = new_player(module_name)
+                answer("OK")
+            elif command == "ABOUT":
+                answer(f'name="{module_name}"')
+            elif command == "BOARD":
+                lines = list(takewhile(lambda line: line.strip().upper() != "DONE", infile))  # DONE is consumed too
+                if engine is None:
+                    raise PlayerError("no game started")
+                engine.setup([parse_field(line) for line in lines])
+                answer("OK")
+            elif command in ("BEGIN", "TURN"):
+                if engine is None:
+                    raise PlayerError("no game started")
+                answer(format_move(engine.play(parse_move(argument) if command == "TURN" else None)))
+            else:
+                answer(f"UNKNOWN {command}")
+        except Exception as error:  # pylint: disable=broad-except
+            answer(f"ERROR {type(error).__name__}: {error}")
+
+
+def player_command(module_name):
+    """Return the command running an AI player module as a process speaking the protocol."""
+
+    return [sys.executable, os.path.abspath(__file__), module_name]
+
+
+def read_lines(stream, lines):
+    """Reader thread's entry point: put the lines of a stream to a queue without the line ends; None at the end."""
+
+    with stream:
+        for line in stream:
+            lines.put(line.rstrip("\n"))
+    lines.put(None)
+
+
+class RemotePlayer:
+    """An AI player running in a process of its own which speaks the protocol; like a player module it provides
+    play() and setup(). Raise PlayerError if the process exits, exceeds a time limit or answers an error;
+    a process which exited or exceeded a time limit is killed, restart() replaces it by a new one."""
+    # the answers are read by a daemon thread and passed through a queue, so that waiting for an answer can time out
+    # on any platform; a killed process never answers late, so an answer always belongs to the last command
+
+    def __init__(self, command, time_limit=TIME_LIMIT):
+        self.command, self.time_limit = command, time_limit
+        self.name = os.path.basename(command[-1])
+        self.process, self.answers = None, None
+        self.restarts = -1  # the number of the processes replaced by new ones; the first one isn't a restart
+        self.restart()
+
+    def restart(self):
+        """Kill the process if it's running and start a new one."""
+
+        self.kill()
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, bufsize=1)
+        self.answers = queue.Queue()
+        threading.Thread(target=read_lines, args=(self.process.stdout, self.answers), daemon=True).start()
+        self.restarts += 1
+
+    def alive(self):
+        """Check whether the process is running."""
+
+        return self.process is not None and self.process.poll() is None
+
+    def kill(self):
+        """Kill the process if it's running and wait for it."""
+
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        try:
+            self.process.stdin.close()
+        except OSError:  # the buffered input can't be flushed to a killed process
+            pass
+
+    def close(self):
+        """Let the process exit by END; kill it if it doesn't exit in a second."""
+
+        if self.alive():
+            try:
+                self.process.stdin.write("END\n")
+                self.process.stdin.flush()
+                self.process.wait(1.0)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+
+    def request(self, lines, time_limit):
+        """Send the lines of a command and return the answer; raise PlayerError if there isn't any in time."""
+
+        if not self.alive():
+            raise PlayerError(f"{self.name} is not running")
+        try:
+            self.process.stdin.write("".join(line + "\n" for line in lines))
+            self.process.stdin.flush()
+            answer = self.answers.get(timeout=time_limit)
+        except OSError as error:  # the process has closed its input
+            self.kill()
+            raise PlayerError(f"{self.name} exited") from error
+        except queue.Empty:
+            self.kill()
+            raise PlayerError(f"{self.name} exceeded the time limit of {time_limit} s") from None
+        if answer is None:
+            self.kill()
+            raise PlayerError(f"{self.name} exited")
+        if answer.startswith(("ERROR", "UNKNOWN")):
+            raise PlayerError(f"{self.name}: {answer}")
+        return answer
+
+    def new_game(self):
+        """Start a new game."""
+
+        self.request(["START"], START_TIME_LIMIT)
+
+    def setup(self, board):
+        """Place a sequence of (move, own) pairs on the board before the game continues, see bot.Engine.setup()."""
+
+        self.request(["BOARD"] + [f"{format_move(move)},{1 if own else 2}" for move, own in board] + ["DONE"],
+                     START_TIME_LIMIT)
+
+    def play(self, opponents_move):
+        """Return the countermove to the opponent's move, None before the first move."""
+
+        answer = self.request(["BEGIN"] if opponents_move is None else [f"TURN {format_move(opponents_move)}"],
+                              self.time_limit)
+        try:
+            return parse_move(answer)
+        except ValueError:
+            raise PlayerError(f"{self.name} answered {answer!r} instead of a move") from None
+
+
+class PlayerPool:
+    """A pool of warm player processes running the same command (see RemotePlayer), started in advance so that a game
+    doesn't wait for a process to start up; player() lends an idle player for a game. A player whose process exited
+    or exceeded a time limit is restarted when it's returned, so the pool keeps its size."""
+
+    def __init__(self, command, size, time_limit=TIME_LIMIT):
+        self.players = [RemotePlayer(command, time_limit) for _ in range(size)]
+        self.idle = queue.Queue()
+        for player in self.players:
+            self.idle.put(player)
+
+    @contextmanager
+    def player(self):
+        """Lend an idle player with a new game started for the duration of a with block; wait for one if none is
+        idle. A player failing to start the game is restarted once."""
+
+        player = self.idle.get()
+        try:
+            try:
+                player.new_game()
+            except PlayerError:
+                player.restart()
+                player.new_game()
+            yield player
+        finally:
+            try:
+                if not player.alive():
+                    player.restart()
+            finally:
+                self.idle.put(player)
+
+    def restarts(self):
+        """Return the number of the player processes restarted so far."""
+
+        return sum(player.restarts for player in self.players)
+
+    def close(self):
+        """Let all player processes exit."""
+
+        for player in self.players:
+            player.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    """Serve the protocol on stdin and stdout by the AI player module given by the command line argument."""
+    # the player's own prints, if any, go to stderr so that stdout carries nothing but the answers
+
+    if len(sys.argv) != 2:
+        print("Usage: python pyskvorky/protocol.py <module name>", file=sys.stderr)
+        sys.exit(2)
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    serve(sys.argv[1], sys.stdin, stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,22 @@ two-dimensional board. Players try to place 5 consecutive markers in a row (vert
 The game starts by placing an X marker on any square, usually (0, 0), the 'center' of the infinite board.
 CONTROLS: arrows move the cursor, return enters player's move, escape quits the game. ALTERNATIVE CONTROLS:
 WASD as arrows, QEZX move the cursor diagonally, R back to the last move's position, C to the center of the
-field, space enters a move, shift-Q quits the game."""
+field, space enters a move, shift-Q quits the game. While an AI player thinks, the cursor can be moved and the game
+can be quit; the status line shows how long the player has been thinking. AI players can run as external processes
+(see protocol module), so that a failing player ends the game gracefully."""
 
-from importlib import import_module
 import sys
 import curses
-from curses.textpad import rectangle
 from time import sleep
 from cli import get_cli_args
-from helper import winning_set, visible_playfield, validate_move, DisplayError, QuitGame, DuplicatePlayer, Player
+from helper import new_player, has_engine
+from helper import DisplayError, QuitGame, DuplicatePlayer, PlayerError, Player
+from game import game_moves, MAX_MOVES
+from telemetry import Telemetry, format_metrics
+from protocol import RemotePlayer, player_command
+from records import RecordWriter
+from renderer import Renderer
+from worker import Worker
 
 # Implementation note: to avoid false pylint E0401 import error, add .pylintrc file to app module as described in:
 # https://stackoverflow.com/questions/1899436/pylint-unable-to-import-error-how-to-set-pythonpath
@@ -26,140 +33,212 @@ K = 5  # number of consecutive positions marked with the same symbol required to
 
 yoff, xoff = 5, 5  # offset of the curses screen (playfield) inside the terminal window; IMPROVE: make it a parameter
 
+REFRESH = 50  # period of reading the keyboard and refreshing the thinking indicator while a bot thinks in milliseconds
+
 
 ## PRESENTER part
 
 
-def draw_board():
-    """Draw a section of the board containing marked fields; determine the size of the playfield dynamically."""
+def draw_board(winning_fields=frozenset()):
+    """Draw a section of the board containing marked fields; determine the size of the playfield dynamically.
+    Winning fields of the last move (see game.LineCounts) are highlighted."""
     # BUG: in Linux the board may contain colored strips depending on the terminal background color
     # Not sure how to fix this; in Windows PowerShell and CMD the board is drawn flawlessly
     # Note: avoid using curses.DIM, it fails to display correctly in Windows CMD
+    # only the cells changed by the move are drawn, the whole playfield only if its size changes; see renderer module
 
-    board_contents = player.fields | opponent.fields  # set of all marked fields
-    ymin, xmin, ymax, xmax = visible_playfield(board_contents)
-    num_rows, num_cols = screen.getmaxyx()  # get the current size of the physical terminal window
-    if (yoff + ymax - ymin > num_rows - 1) | (xoff + 2*(xmax - xmin) > num_cols - 1):
-        raise DisplayError  # the size of the requested playfield exceeds the size of the terminal window
-        # IMPROVE: instead of raising error, the distant part of the playfield could start sliding away from view
-    rectangle(screen, yoff, xoff, yoff + ymax - ymin, xoff + 2*(xmax - xmin))  # new frame
-    rows = range(ymin + 1, ymax)  # current range of rows
-    cols = range(xmin + 1, xmax)  # current range of columns
-    field = {(i, j) for i in rows for j in range(1, 2*(xmax - xmin))}  # playing field on the screen
-    cross = {(i, j) for i in rows for j in cols if not (i and j)}  # zero axes cross coordinates
-    for i, j in field:
-        screen.addstr(yoff + i - ymin, xoff + j, ' ')
-    for i, j in cross:
-        screen.addstr(yoff + i - ymin, xoff + 2*(j - xmin), '.', cross_style)
-    for i, j in player.fields:
-        screen.addstr(yoff + i - ymin, xoff + 2*(j - xmin), player.sym, player.style)
-    for i, j in opponent.fields:
-        screen.addstr(yoff + i - ymin, xoff + 2*(j - xmin), opponent.sym, opponent.style)
-    i, j = move if move else (0, 0)  # last move's coordinates relative to the board, or (0, 0) before the first move
-    y, x = yoff + i - ymin, xoff + 2*(j - xmin)  # last move's position relative to the screen
-    if winning_set(move, player):  # check for a winning move
-        for i, j in winning_set(move, player):  # highlight winning lines
-            screen.addstr(yoff + i - ymin, xoff + 2*(j - xmin), player.sym, winner_style)
-            screen.addstr(y, x, player.sym, winner_style | curses.A_UNDERLINE)
-    elif move:  # move is not None, which means this is not the initial move
-        screen.addstr(y, x, player.sym, player.style | curses.A_UNDERLINE)
+    y, x = renderer.draw((player, opponent), move, winning_fields)  # last move's position relative to the screen
     screen.move(y, x)  # place blinking cursor on the last move field
     screen.refresh()
 
 
+def draw_status(text):
+    """Write a line of text to the status line at row 1, above the playfield; the rest of the row is cleared."""
+
+    num_cols = screen.getmaxyx()[1]
+    screen.move(1, 0)
+    screen.clrtoeol()
+    screen.addstr(1, xoff, text[:max(0, num_cols - xoff - 1)])  # cut the text to fit the window
+
+
+def move_cursor(key, row, col, last_move):
+    """Return the position of the cursor on the board after a navigation key; keep the cursor inside the playfield.
+    Raise QuitGame if the key quits the game; other keys leave the cursor in place."""
+
+    ymin, xmin, ymax, xmax = renderer.viewport.bounds.playfield()
+    if key in ["c", "KEY_HOME"]:  # move the cursor to the (0, 0) field
+        row, col = 0, 0
+    elif key in ["r", "KEY_END"]:  # move the cursor to the last move field
+        row, col = last_move if last_move else (0, 0)
+    elif key in ["a", "KEY_LEFT"]:  # move the cursor one position to the left
+        col = max(col - 1, xmin + 1)
+    elif key in ["d", "KEY_RIGHT"]:  # move the cursor one position to the right
+        col = min(col + 1, xmax - 1)
+    elif key in ["w", "KEY_UP"]:  # move the cursor one position up
+        row = max(row - 1, ymin + 1)
+    elif key in ["s", "KEY_DOWN"]:  # move the cursor one position down
+        row = min(row + 1, ymax - 1)
+    elif key in ["q"]:  # move the cursor diagonally up & left
+        row, col = max(row - 1, ymin + 1), max(col - 1, xmin + 1)
+    elif key in ["e"]:  # move the cursor diagonally up & right
+        row, col = max(row - 1, ymin + 1), min(col + 1, xmax - 1)
+    elif key in ["z"]:  # move the cursor diagonally down & left
+        row, col = min(row + 1, ymax - 1), max(col - 1, xmin + 1)
+    elif key in ["x"]:  # move the cursor diagonally down & right
+        row, col = min(row + 1, ymax - 1), min(col + 1, xmax - 1)
+    elif key in ["Q", chr(27)]:  # chr(27) == "KEY_ESCAPE"; quit the game
+        raise QuitGame
+    return row, col
+
+
 def enter_move(last_move):
     """Control human player input: allow the player to move cursor inside the playfield to navigate to the desired position;
     return the current cursor position if confirmed as player's intended move; allow the player to quit the game at any time."""
+    # the cursor moves on the board, the window scrolls to show it if the playfield doesn't fit the screen
 
-    board_contents = player.fields | opponent.fields  # set of all marked fields
-    ymin, xmin, ymax, xmax = visible_playfield(board_contents)
-    ylast, xlast = last_move if last_move else (0, 0)
+    row, col = last_move if last_move else (0, 0)  # current cursor position on the game board
     while True:
-        y, x = screen.getyx()  # current cursor position on the physical screen (not the game board)
-        row, col = y - yoff + ymin, (x - xoff)//2 + xmin  # current cursor position on the game board
+        screen.move(*renderer.show((row, col)))  # current cursor position on the physical screen
+        screen.refresh()
         key = screen.getkey()
-        if key in ["c", "KEY_HOME"]:  # move the cursor to the (0, 0) field
-            screen.move(yoff - ymin, xoff - 2*xmin)
-        elif key in ["r", "KEY_END"]:  # move the cursor to the last move field
-            screen.move(yoff + ylast - ymin, xoff + 2*(xlast - xmin))
-        elif key in ["a", "KEY_LEFT"]:  # move the cursor one position to the left
-            screen.move(y, max(x-2, xoff + 2))
-        elif key in ["d", "KEY_RIGHT"]:  # move the cursor one position to the right
-            screen.move(y, min(x+2, xoff + 2*(xmax - xmin) - 2))
-        elif key in ["w", "KEY_UP"]:  # move the cursor one position up
-            screen.move(max(y-1, yoff + 1), x)
-        elif key in ["s", "KEY_DOWN"]:  # move the cursor one position down
-            screen.move(min(y+1, yoff + ymax - ymin - 1), x)
-        elif key in ["q"]:  # move the cursor diagonally up & left
-            screen.move(max(y-1, yoff + 1), max(x-2, xoff + 2))
-        elif key in ["e"]:  # move the cursor diagonally up & right
-            screen.move(max(y-1, yoff + 1), min(x+2, xoff + 2*(xmax - xmin) - 2))
-        elif key in ["z"]:  # move the cursor diagonally down & left
-            screen.move(min(y+1, yoff + ymax - ymin - 1), max(x-2, xoff + 2))
-        elif key in ["x"]:  # move the cursor diagonally down & right
-            screen.move(min(y+1, yoff + ymax - ymin - 1), min(x+2, xoff + 2*(xmax - xmin) - 2))
-        elif key in ["Q", chr(27)]:  # chr(27) == "KEY_ESCAPE"; quit the game
-            raise QuitGame
-        elif key in [" ", chr(10)]:  # chr(10) == "KEY_ENTER"; place your symbol to the field under the cursor
-            if (row, col) not in board_contents:  # but ignore fields already taken
+        if key in [" ", chr(10)]:  # chr(10) == "KEY_ENTER"; place your symbol to the field under the cursor
+            if (row, col) not in player.fields and (row, col) not in opponent.fields:  # but ignore fields already taken
                 break
+        else:
+            row, col = move_cursor(key, row, col, last_move)
     return row, col
 
 
+def background_player(sym, engine, ponder=False):
+    """Return the main function 'play' of an AI player (an engine or a module, see helper.new_player()) computing
+    its moves on a worker thread while the keyboard stays live; see wait_for_move(). A pondering player precomputes
+    its replies to the opponent's likely moves while the opponent thinks, if it provides ponder()."""
+
+    worker = Worker(engine.play, getattr(engine, "cancel", None), getattr(engine, "ponder", None) if ponder else None)
+
+    def play(opponents_move):
+        worker.start(opponents_move)
+        return wait_for_move(sym, worker, opponents_move)
+
+    return play
+
+
+def load_ai_player(sym, module_name, ponder=False):
+    """Return the main function 'play' of an AI player module computing its moves on a worker thread (see
+    background_player()); an external player runs in a process of its own (see protocol module) and neither
+    ponders nor reports telemetry."""
+
+    if external:
+        engine = RemotePlayer(player_command(module_name))
+        remote_players.append(engine)  # the processes are closed when the game ends
+        engine.new_game()
+        return background_player(sym, engine)
+    return background_player(sym, new_player(module_name, telemetries[sym] if show_telemetry else None), ponder)
+
+
+def wait_for_move(sym, worker, last_move):
+    """Wait for the move of an AI player computed by a worker thread (see worker module) and return it; meanwhile
+    the cursor can be moved around the board and the game can be quit, which cancels the player's search.
+    A thinking indicator on the status line shows the time the player has been thinking."""
+    # a move computed within a single refresh period is returned without showing the indicator
+
+    if worker.done(REFRESH / 1000):
+        return worker.result()
+    row, col = last_move if last_move else (0, 0)  # current cursor position on the game board
+    screen.timeout(REFRESH)  # getkey() waits for a key at most REFRESH milliseconds
+    try:
+        while not worker.done():
+            draw_status(f"{sym} is thinking... {worker.elapsed():.1f} s")
+            screen.move(*renderer.show((row, col)))
+            screen.refresh()
+            try:
+                key = screen.getkey()
+            except curses.error:  # no key pressed in time
+                continue
+            try:
+                row, col = move_cursor(key, row, col, last_move)
+            except QuitGame:
+                worker.cancel()  # let the engine stop its search before the game ends
+                raise
+    finally:
+        screen.timeout(-1)  # getkey() waits for a key again
+    draw_status("")
+    return worker.result()
+
+
 ## GAME CONTROL part
 
 
 def start_game():
     """A trivial game control mechanism that can be improved in many ways..."""
-    # IMPROVE: make MAX a parameter and introduce a stalemate
-    # IMPROVE: log the game (moves sequence) into a file
+    # the rules (turn order, move validation, win check and max moves) are implemented by game_moves()
+    # the game is recorded move by move and appended to the game records file when it ends if requested; see records
+    # module
     # IMPROVE: replace global variables
     global move, player, opponent
 
-    max_moves = 100  # max number of moves; IMPROVE: make it a parameter and introduce a stalemate
-
+    if recorder is not None:
+        recorder.start_game(X_player, O_player, K)
     draw_board()  # draw an empty board to let the human playerplace the initial move
-    for _ in range(max_moves):  # IMPROVE: make MAX a parameter and introduce a stalemate
-        move = validate_move(player.play(move))  # check if returned move meets api reqs; see note at validate_move()
+    for player, opponent, move, think_time, winning_fields in game_moves(player, opponent, move, MAX_MOVES):
+        if recorder is not None:
+            recorder.add_move(move, think_time)
         if player.play != enter_move:  # distinguish between a bot and a human player
             # IMPROVE: this condition deserves refactoring, ideally rename enter_move() and place into a module
             sleep(sleep_time)  # insert a delay between displaying each bot's move to simulate thinking :)
+            if show_telemetry:  # the think time of any AI player, the rest of the metrics of instrumented engines
+                metrics = telemetries[player.sym].moves
+                draw_status(f"{player.sym}: " + (format_metrics(metrics[-1]) if metrics and metrics[-1]["move"] == move
+                                                 else f"{think_time * 1e3:.1f} ms"))
         if step_moves:
             screen.getch()  # debug tool: insert a keypress between moves to allow stepping a bot vs bot match
-        player.fields.add(move)
-        draw_board()
-        if winning_set(move, player):  # check for a winning move
-            draw_board()
-            screen.addstr(1, xoff, f"Well done, {player.sym}! Player {opponent.sym} lost in {len(player.fields)} moves.")
+        draw_board(winning_fields)
+        if winning_fields:  # check for a winning move
+            if recorder is not None:
+                recorder.end_game(player.sym)
+            draw_status(f"Well done, {player.sym}! Player {opponent.sym} lost in {len(player.fields)} moves.")
             screen.addstr(2, xoff, "Press any key to close the curses screen.")
             screen.getch()  # wait for key press to continue
-            break
-        # swap players before the next move
-        player, opponent = opponent, player
 
 
 ## MAIN part
 
 
 try:
-    X_player, O_player, sleep_time, step_moves = get_cli_args()  # get cli arguments
+    X_player, O_player, sleep_time, step_moves, show_telemetry, log_file, external = get_cli_args()
 
-    if X_player == O_player and X_player != 'human':
-        # the same AI player module can't be run against itself; maybe in the future...
+    if X_player == O_player and X_player != 'human' and not external and not has_engine(X_player):
+        # the same AI player module can't be run against itself unless it provides an Engine class (see bot module)
+        # or each of them runs in a process of its own
         raise DuplicatePlayer
 
     # import players requested via cli arguments --X_player and --O_player; no need to import a human player
     # if the player's module name is not found in the app's directory a ModuleNotFoundError is raised and caught
     # Note: it is a part of the API contract that the AI player's main function is called 'play'
-    player1 = getattr(import_module(X_player), "play") if X_player != "human" else enter_move
-    player2 = getattr(import_module(O_player), "play") if O_player != "human" else enter_move
+    # with telemetry on, each AI player's engine gets its own telemetry object keeping the metrics of its moves
+    # AI players think on a worker thread so that the game can be quit any time; see background_player()
+    # an AI player ponders only against a human, two pondering AI players would just slow each other down
+    telemetries = {"X": Telemetry(), "O": Telemetry()}
+    remote_players = []
+    player1 = load_ai_player("X", X_player, O_player == "human") if X_player != "human" else enter_move
+    player2 = load_ai_player("O", O_player, X_player == "human") if O_player != "human" else enter_move
+
+    # open the game records file before the curses screen; a game without a winner (e.g. interrupted) is recorded
+    # when the recorder is closed
+    recorder = RecordWriter(log_file) if log_file else None
 
 except ModuleNotFoundError:
     print("ModuleNotFoundError: Invalid player module name or location.")
     sys.exit()
 
 except DuplicatePlayer:
-    print("DuplicatePlayer: You're trying to run the same module twice.")
+    print("DuplicatePlayer: You're trying to run the same module twice; the module doesn't provide an Engine.")
+    sys.exit()
+
+except PlayerError as error:
+    print(f"PlayerError: {error}")
+    for remote_player in remote_players:
+        remote_player.close()
     sys.exit()
 
 screen = curses.initscr()  # initialize the curses screen
@@ -174,12 +253,14 @@ curses.init_pair(4, curses.COLOR_CYAN, curses.COLOR_BLACK)
 
 winner_style = curses.color_pair(3) | curses.A_BOLD
 cross_style = curses.color_pair(4)
+renderer = Renderer(screen, yoff, xoff, cross_style, winner_style)  # remembers the cells drawn on the screen
 
 # a player and an opponent are dynamic entities swapping their contents after each turn
 # a board consists of two collections of fields representing player's and opponent's marked positions
 # a move represents the last move, i.e. a tuple of coordinates (row, column) representing a position
 
 # by default use standard X and O symbols; X usually starts, hence player starts, opponent goes next
+# players' fields are plain sets; a winning move is detected by the line counts kept by game_moves() (see game module)
 player = Player("X", player1, curses.color_pair(1) | curses.A_BOLD)
 opponent = Player("O", player2, curses.color_pair(2) | curses.A_BOLD)
 
@@ -189,17 +270,26 @@ try:
     start_game()
 
 except QuitGame:
-    screen.addstr(1, xoff, "Game interrupted.")
+    draw_status("Game interrupted.")
     screen.addstr(2, xoff, "Press any key to close the curses screen.")
     screen.getch()  # wait for key press to continue
 
 except DisplayError:
-    screen.addstr(1, xoff, "Can't display your playfield.")
+    draw_status("Can't display your playfield.")
     screen.addstr(2, xoff, "Resize your terminal window and try again.")
     screen.addstr(3, xoff, "Press any key to close the curses screen.")
     screen.getch()  # wait for key press to continue
 
+except PlayerError as error:  # an external player exited, exceeded its time limit or failed to move
+    draw_status(f"Game interrupted: {error}")
+    screen.addstr(2, xoff, "Press any key to close the curses screen.")
+    screen.getch()  # wait for key press to continue
+
 finally:
+    if recorder is not None:
+        recorder.close()
+    for remote_player in remote_players:
+        remote_player.close()
     screen.keypad(False)
     curses.echo()
     curses.endwin()  # reset the original terminal window
@@ -0,0 +1,219 @@
+"""Compact binary game records: an append-only file of games recorded move by move and read back one game at a time.
+Games are recorded by the curses game and by the tournament module using their --log option, e.g.
+    python pyskvorky/tournament.py -n 1000 -l games.pyskg
+command run from the project root directory appends all games of the tournament to the games.pyskg file."""
+import struct
+from time import time
+
+K = 5  # number of consecutive positions marked with the same symbol required to win
+CHUNK = 1 << 16  # number of bytes read from the file at once
+MAX_TEXT = 1024  # max length of a player's name in bytes
+MAX_VARINT = 10  # max number of bytes of a varint, enough for 64 bits
+
+# the file starts with a header (magic and version) followed by the games; a game consists of a header, the moves and
+# an end marker followed by the result; all numbers are unsigned LEB128 varints (7 bits per byte, the lowest first),
+# signed numbers are zigzag encoded (0, -1, 1, -2, ... as 0, 1, 2, 3, ...) so that small numbers take a single byte:
+#   game header: K, start of the game (seconds since the epoch), number of the opening moves not chosen by the players
+#                (e.g. random, see tournament module), X player and O player (length and UTF-8 bytes)
+#   move: (zigzag row delta) * 2 + 1, zigzag column delta, think time in microseconds; the deltas are relative to
+#         the previous move, the first move is relative to (0, 0), so a move mostly takes 3 bytes
+#   end marker: 0, followed by the result: 0 for no winner, 1 if X won, 2 if O won
+# the writer collects the moves of a game in memory and appends the whole game to the file by a single write when
+# the game ends, so the file only contains finished games and more processes can append games to the same file;
+# a game cut short by a crash while being written is left incomplete at the end of the file and the reader skips it;
+# any other malformed data, e.g. an invalid result or a player's name longer than MAX_TEXT, is reported as corrupt
+HEADER = struct.Struct("<8sB")  # magic, version
+MAGIC, VERSION = b"PYSKGAME", 1
+RESULTS = (None, "X", "O")  # winners indexed by the result
+
+
+def encode_varint(number):
+    """Return an unsigned integer encoded as a varint."""
+
+    encoded = bytearray()
+    while number > 0x7f:
+        encoded.append(number & 0x7f | 0x80)
+        number >>= 7
+    encoded.append(number)
+    return bytes(encoded)
+
+
+def decode_varint(data, pos):
+    """Return a (number, position after it) pair of a varint starting at a given position of the data;
+    raise IndexError if the data end inside the varint, ValueError if the varint is longer than MAX_VARINT bytes."""
+
+    number, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        number |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return number, pos
+        shift += 7
+        if shift >= 7 * MAX_VARINT:
+            raise ValueError("invalid varint")
+
+
+def zigzag(number):
+    """Return a signed integer mapped to an unsigned one."""
+
+    return number * 2 if number >= 0 else -number * 2 - 1
+
+
+def unzigzag(number):
+    """Return the signed integer mapped to an unsigned one by zigzag()."""
+
+    return number >> 1 if not number & 1 else -(number >> 1) - 1
+
+
+def encode_text(text):
+    """Return a string encoded as its length and UTF-8 bytes; raise ValueError if it's longer than MAX_TEXT bytes."""
+
+    encoded = text.encode("utf-8")
+    if len(encoded) > MAX_TEXT:
+        raise ValueError(f"text longer than {MAX_TEXT} bytes: {text[:20]}...")
+    return encode_varint(len(encoded)) + encoded
+
+
+class RecordWriter:
+    """Appends games to a file move by move: start_game(), add_move() for each move, end_game(); the moves are not
+    streamed to the file one by one, they are buffered in memory and the whole game is written by a single write when
+    it ends, so that more processes can append games to the same file; a crash loses just the game in progress.
+    The writer can be used as a context manager closing the file."""
+
+    def __init__(self, path):
+        self.file = open(path, "ab")  # pylint: disable=consider-using-with
+        if not self.file.tell():
+            self.file.write(HEADER.pack(MAGIC, VERSION))
+            self.file.flush()
+        self.game, self.last = None, (0, 0)  # the encoded current game and its last move
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start_game(self, x_player, o_player, length=K, started=None, opening=0):
+        """Start a new game; an unfinished previous game is ended without a winner."""
+
+        self.end_game(None)
+        if length < 1:
+            raise ValueError(f"invalid K: {length}")
+        self.game = bytearray(encode_varint(length) + encode_varint(int(time() if started is None else started)) +
+                              encode_varint(opening) + encode_text(x_player) + encode_text(o_player))
+        self.last = (0, 0)
+
+    def add_move(self, move, think_time=0.0):
+        """Add a move of the current game and the time the player took to decide in seconds."""
+
+        row, col = move
+        self.game += encode_varint(zigzag(row - self.last[0]) * 2 + 1)
+        self.game += encode_varint(zigzag(col - self.last[1]))
+        self.game += encode_varint(round(think_time * 1e6))
+        self.last = move
+
+    def end_game(self, winner):
+        """End the current game with its winner ("X", "O" or None) and write the game to the file;
+        it does nothing if there is no game in progress."""
+
+        if self.game is None:
+            return
+        self.game += bytes((0, RESULTS.index(winner)))
+        self.file.write(self.game)
+        self.file.flush()
+        self.game = None
+
+    def write_game(self, game):
+        """Write a whole game given as a dictionary with the same keys as the ones returned by read_games()
+        (think_times, started and opening are optional)."""
+
+        self.start_game(game["X"], game["O"], game.get("K", K), game.get("started"), game.get("opening", 0))
+        for move, think_time in zip(game["moves"], game.get("think_times") or [0.0] * len(game["moves"])):
+            self.add_move(tuple(move), think_time)
+        self.end_game(game["winner"])
+
+    def close(self):
+        """Close the file; an unfinished game is ended without a winner."""
+
+        self.end_game(None)
+        self.file.close()
+
+
+def parse_game(data, pos):
+    """Return a (game, position after it) pair of a game starting at a given position of the data;
+    raise IndexError if the data end inside the game, ValueError if the game is malformed."""
+
+    length, pos = decode_varint(data, pos)
+    if length < 1:
+        raise ValueError(f"invalid K: {length}")
+    started, pos = decode_varint(data, pos)
+    opening, pos = decode_varint(data, pos)
+    players = []
+    for _ in range(2):
+        size, pos = decode_varint(data, pos)
+        if size > MAX_TEXT:
+            raise ValueError(f"invalid length of a player's name: {size}")
+        if pos + size > len(data):
+            raise IndexError
+        players.append(data[pos:pos + size].decode("utf-8"))
+        pos += size
+    # the varints of the moves are decoded inline, most of them take a single byte
+    moves, think_times = [], []
+    row, col = 0, 0
+    while True:
+        row_delta = data[pos]
+        if row_delta > 0x7f:
+            row_delta, pos = decode_varint(data, pos)
+        else:
+            pos += 1
+        if not row_delta:
+            break
+        col_delta = data[pos]
+        if col_delta > 0x7f:
+            col_delta, pos = decode_varint(data, pos)
+        else:
+            pos += 1
+        think_time = data[pos]
+        if think_time > 0x7f:
+            think_time, pos = decode_varint(data, pos)
+        else:
+            pos += 1
+        row += -(row_delta >> 2) - 1 if row_delta & 2 else row_delta >> 2  # unzigzag(row_delta >> 1)
+        col += -(col_delta >> 1) - 1 if col_delta & 1 else col_delta >> 1  # unzigzag(col_delta)
+        moves.append((row, col))
+        think_times.append(think_time / 1e6)
+    result = data[pos]
+    if result >= len(RESULTS):
+        raise ValueError(f"invalid result: {result}")
+    winner = RESULTS[result]
+    return {"X": players[0], "O": players[1], "K": length, "started": started, "opening": opening, "winner": winner,
+            "moves": moves, "think_times": think_times}, pos + 1
+
+
+def read_games(path):
+    """Yield games of a file one by one as dictionaries with X, O, K, started, opening, winner, moves and think_times
+    keys (think_times of all moves, including the opening ones); the file is read in chunks so that any number of
+    games can be read in constant memory. An incomplete game at the end of the file is skipped; raise ValueError
+    if a game is malformed, the games after it are not read."""
+    # only the end of the file makes a game incomplete, a game parsed up to the end of the data read so far is
+    # parsed again with the next chunk; offset is the position of the data in the file
+
+    with open(path, "rb") as file:
+        data = file.read(max(CHUNK, HEADER.size))
+        if len(data) < HEADER.size or HEADER.unpack_from(data) != (MAGIC, VERSION):
+            raise ValueError(f"Not a valid game records file: {path}")
+        pos, offset, end_of_file = HEADER.size, 0, False
+        while pos < len(data) or not end_of_file:
+            try:
+                game, pos_ = parse_game(data, pos)
+            except IndexError:
+                if end_of_file:
+                    return  # an incomplete game at the end of the file
+                chunk = file.read(CHUNK)
+                data, pos, offset, end_of_file = data[pos:] + chunk, 0, offset + pos, not chunk
+                continue
+            except ValueError as error:
+                raise ValueError(f"Corrupt game record at byte {offset + pos} of {path}: {error}") from error
+            pos = pos_
+            yield game
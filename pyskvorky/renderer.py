@@ -0,0 +1,96 @@
+"""Rendering of the board on a curses screen which redraws only the cells changed since the previous move."""
+import curses
+from curses.textpad import rectangle
+from viewport import Viewport
+
+
+class Renderer:
+    """Draws the window of the playfield (see viewport module) framed by a rectangle at a given offset of the screen.
+    It remembers the symbol and attribute drawn in each cell and after a move it draws only the cells which may have
+    changed: the move, the previous move (losing its underline) and the winning fields; the whole window is redrawn
+    only when the window changes, i.e. when the playfield grows or the window scrolls."""
+    # a board position (row, col) is drawn at the screen position (yoff + row - ymin, xoff + 2 * (col - xmin)),
+    # the columns in between stay empty; empty positions on the zero axes are marked by a dot
+    # draw() is called after each move, so the move is the only new marked field; nothing scans the whole board
+
+    def __init__(self, screen, yoff, xoff, cross_style, winner_style):
+        self.screen, self.yoff, self.xoff = screen, yoff, xoff
+        self.cross_style, self.winner_style = cross_style, winner_style
+        self.viewport = None  # created by the first draw() from the fields marked by then
+        self.window = None  # the rectangle drawn, (ymin, xmin, ymax, xmax), None before the first draw
+        self.cells = {}  # board positions mapped to the (symbol, attribute) pairs drawn
+        self.highlighted = set()  # positions drawn with a highlight: the last move and the winning fields
+        self.players, self.move, self.winning_fields = (), None, frozenset()  # the board drawn
+
+    def screen_position(self, position):
+        """Return the screen coordinates of a board position."""
+
+        ymin, xmin, _, _ = self.window
+        return self.yoff + position[0] - ymin, self.xoff + 2 * (position[1] - xmin)
+
+    def inside(self, position):
+        """Check whether a board position is shown inside the window's frame."""
+
+        ymin, xmin, ymax, xmax = self.window
+        return ymin < position[0] < ymax and xmin < position[1] < xmax
+
+    def cell(self, position):
+        """Return the (symbol, attribute) pair of a board position."""
+
+        for player in self.players:
+            if position in player.fields:
+                if position in self.winning_fields:
+                    style = self.winner_style
+                else:
+                    style = player.style
+                return player.sym, style | curses.A_UNDERLINE if position == self.move else style
+        return (".", self.cross_style) if not (position[0] and position[1]) else (" ", 0)
+
+    def put(self, position):
+        """Draw a cell shown inside the window unless it's already drawn."""
+
+        if self.inside(position):
+            cell = self.cell(position)
+            if self.cells.get(position) != cell:
+                self.screen.addstr(*self.screen_position(position), *cell)
+                self.cells[position] = cell
+
+    def draw(self, players, move, winning_fields=frozenset()):
+        """Draw the board of the players (helper.Player objects) after a move (None before the first move) highlighting
+        the move and the winning fields; the window scrolls to show the move. Return the screen coordinates of the move,
+        or of (0, 0) if it's None. Raise DisplayError if no window fits the screen."""
+
+        if self.viewport is None:
+            self.viewport = Viewport(set().union(*(player.fields for player in players)))
+        elif move:
+            self.viewport.add(move)
+        self.players, self.move, self.winning_fields = players, move, winning_fields
+        highlighted = set(winning_fields) | ({move} if move else set())
+        position = self.show(move if move else (0, 0))
+        for position_ in self.highlighted | highlighted:
+            self.put(position_)
+        self.highlighted = highlighted
+        return position
+
+    def show(self, position):
+        """Scroll the window to show a position of the playfield if needed and return its screen coordinates.
+        Raise DisplayError if no window fits the screen."""
+        # the last row of the terminal window stays empty, curses can't write to its lower right corner
+
+        num_rows, num_cols = self.screen.getmaxyx()  # get the current size of the physical terminal window
+        window = self.viewport.follow(position, num_rows - 2 - self.yoff, (num_cols - 1 - self.xoff) // 2)
+        if window != self.window:
+            self.redraw(window)
+        return self.screen_position(position)
+
+    def redraw(self, window):
+        """Draw the frame and all cells of a new window."""
+
+        ymin, xmin, ymax, xmax = window
+        self.window, self.cells = window, {}
+        rectangle(self.screen, self.yoff, self.xoff, self.yoff + ymax - ymin, self.xoff + 2*(xmax - xmin))
+        for row in range(ymin + 1, ymax):
+            self.screen.addstr(self.yoff + row - ymin, self.xoff + 1, " " * (2*(xmax - xmin) - 1))
+            for col in range(xmin + 1, xmax):
+                self.cells[row, col] = " ", 0
+                self.put((row, col))
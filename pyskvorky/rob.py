@@ -5,6 +5,11 @@ to return your countermove. For demonstration purposes a copy of 'bot.py' module
 
 from collections import Counter
 from copy import copy
+from geometry import envelope
+try:
+    import vectorized  # batch scoring of the candidates requires numpy which is an optional dependency
+except ImportError:
+    vectorized = None
 
 # Note: it is a part of the API contract that the AI player's main function is called 'play'
 
@@ -64,12 +69,28 @@ def play(opponents_move):
     # function below with a random selection from a list of equivalent highest rated moves
 
     update_board(opponents_move, lost, claimed)
-    countermove = max(next_move_candidates, key=score)
+    if vectorized is None:
+        countermove = max(next_move_candidates, key=score)
+    else:
+        # score all candidates in a single batch; the scores and the choice are the same as of the max() above
+        countermove = vectorized.best_move(claimed, lost, next_move_candidates, value_table_player,
+                                           value_table_opponent, K)
     update_board(countermove, claimed, lost)
 
     return countermove
 
 
+def setup(board):
+    """Places a sequence of (move, own) pairs on the board before the game continues, e.g. a randomized opening;
+    own is True for the player's own markers. It's an optional part of the API used by headless matches."""
+
+    for move, own in board:
+        if own:
+            update_board(move, claimed, lost)
+        else:
+            update_board(move, lost, claimed)
+
+
 def update_board(players_move, players_set, opponents_set):
     """Maintains the game status after each move and countermove."""
     # conflicting_lines is a set of lines that containing a mix of both player's symbols,
@@ -78,8 +99,8 @@ def update_board(players_move, players_set, opponents_set):
     players_set.add(players_move)
     next_move_candidates.update(neighborhood(players_move))
     next_move_candidates.difference_update(players_set | opponents_set)
-    conflicting_lines = [line for line in envelope(players_move) if not set(line).isdisjoint(opponents_set)]
-    open_lines.update(envelope(players_move))
+    conflicting_lines = [line for line in envelope(players_move, K) if not set(line).isdisjoint(opponents_set)]
+    open_lines.update(envelope(players_move, K))
     open_lines.difference_update(conflicting_lines)
 
 
@@ -101,8 +122,8 @@ def score(move):
     open_lines_ = copy(open_lines)
     # update simulated board state for move (same code as in update_board function except next_move_candidates)
     claimed_.add(move)
-    conflicting_lines = [line for line in envelope(move) if not set(line).isdisjoint(lost)]
-    open_lines_.update(envelope(move))
+    conflicting_lines = [line for line in envelope(move, K) if not set(line).isdisjoint(lost)]
+    open_lines_.update(envelope(move, K))
     open_lines_.difference_update(conflicting_lines)
     # evaluate the board from both players' point of view
     player_score = evaluate_board(claimed_, value_table_player)
@@ -118,24 +139,6 @@ def pattern_to_index(pattern, count):
     return ((K + 1) * 2 - len(pattern)) * (len(pattern) - 1) // 2 + count
 
 
-def envelope(position, length=K):
-    """A helper function to model all potentially winning scenarios around a given position."""
-    # return all lines containing the position with coordinates given in the position tuple
-    # a line represents K consecutive positions (global default K=5) in any direction,
-    # i.e. horizontal, vertical or any of the two diagonal
-    # e.g. there is 20 lines in an envelope for each position (considering the default K=5)
-    row, col = position
-    envelope_ = []
-    dir_matrix = [(1, 1), (1, 0), (0, 1), (-1, 1)]  # matrix to determine direction
-    for dy, dx in dir_matrix:  # each of 4 possible directions has a distinct "signature"
-        for i in range(length):  # offset to locate one end of generated lines
-            line = []
-            for j in range(length):  # length of generated lines
-                line.append((row + dy * (i - j), col + dx * (i - j)))
-            envelope_.append(frozenset(line))
-    return envelope_
-
-
 def neighborhood(position, radius=R):
     """A helper function to collect all neighboring positions within a given distance from a given position."""
 
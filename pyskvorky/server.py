@@ -0,0 +1,447 @@
+"""Asyncio game server hosting many concurrent games of remote clients against AI players over TCP or a Unix socket.
+Run it from the project root directory using
+    python pyskvorky/server.py -x bot rob
+command and play by any line based client (e.g. telnet 127.0.0.1 7575) or load it by the bundled load generator
+(see loadgen module). The AI players' moves are computed by a pool of worker processes, the event loop only passes
+the moves, so it never blocks.
+
+The client sends commands, one per line, and the server answers each of them by a single line:
+    START [<module>]    OK <game id>        a new game against an AI player module (the first of the server's
+                                            players by default); the previous game of the client, if any, is over
+    BEGIN               <result>            the server's player makes the first move of the game
+    TURN <row>,<col>    <result>            the client's move, answered by the server's player's countermove
+    STATS               <JSON object>       the server's metrics (see Metrics.summary())
+    QUIT                                    the server closes the connection without an answer
+where the result is one of
+    MOVE <row>,<col>    the server's player's countermove, the game goes on
+    WIN <row>,<col>     the server's player's countermove won the game
+    LOSS                the client's move won the game
+    DRAW [<row>,<col>]  the max number of moves was played, after the client's move or the countermove
+    TIMEOUT             the server's player exceeded the time limit of a move and lost the game
+    ABORTED             the game was aborted as the worker process of the server's player was stopped
+A command which fails, e.g. a move to a taken field, is answered by ERROR <message> and the game goes on, unless
+the server's player failed; an unknown command is answered by UNKNOWN <command>. A move which timed out stops its
+player's worker process, so the other games hosted by the process are aborted, as are the games of a crashed process;
+the next BEGIN or TURN of their clients is answered by ABORTED. A connection idle for longer than the idle timeout is
+closed, which ends its game. The coordinates are the ones of the protocol module."""
+
+import asyncio
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from itertools import count
+import json
+import multiprocessing
+import os
+from time import perf_counter
+from cli import get_server_args
+from game import LineCounts, MAX_MOVES
+from helper import new_player, validate_move, PlayerError
+from protocol import format_move, parse_move
+
+HOST, PORT = "127.0.0.1", 7575  # default address of the server
+MOVE_TIMEOUT = 10.0  # time limit of a move of the server's player in seconds
+IDLE_TIMEOUT = 300.0  # time limit of a client's command in seconds
+LATENCY_SAMPLES = 10000  # number of the latest moves whose latencies are kept for the percentiles
+QUANTILES = (50, 90, 99)  # percentiles of the latencies reported by the metrics
+
+# the engines live in the worker processes, each game's engine in a single process for the whole game so that it
+# keeps its state between the moves; a worker process runs one move at a time, so the games it hosts take turns
+engines = {}  # the engines of the games hosted by a worker process by game ids
+
+
+def start_engine(game_id, module_name):
+    """Worker process' entry point: create a new player of an AI player module for a game."""
+
+    engines[game_id] = new_player(module_name)
+
+
+def play_engine(game_id, move):
+    """Worker process' entry point: return a game's player's countermove to a move."""
+
+    return engines[game_id].play(move)
+
+
+def end_engine(game_id):
+    """Worker process' entry point: drop a game's player."""
+
+    engines.pop(game_id, None)
+
+
+def percentiles(samples, quantiles=QUANTILES):
+    """Return a dict of the given percentiles of the samples, e.g. p50 for the median, using the nearest rank
+    method; None for no samples."""
+
+    ordered = sorted(samples)
+    return {f"p{quantile}": ordered[min(len(ordered) - 1, len(ordered) * quantile // 100)] if ordered else None
+            for quantile in quantiles}
+
+
+class ShardProcess:
+    """A worker process owned by the server running the calls sent to it one at a time, in the order they were sent.
+    The results are read by the event loop as they come, so awaiting a call never blocks it."""
+    # the calls and their results are passed through a pipe; the results come in the order of the calls, so each
+    # one completes the oldest pending call; the process can be terminated at any time, e.g. in the middle of a move
+
+    def __init__(self):
+        self.connection, connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve_calls, args=(connection,), daemon=True)
+        self.process.start()
+        connection.close()
+        self.pending = deque()  # futures of the calls sent and not answered yet
+        self.loop = None  # the event loop reading the results, known since the first call
+
+    def call(self, function, *args):
+        """Send a call of a function to the process and return a future of its result."""
+
+        future = asyncio.get_running_loop().create_future()
+        if self.connection.closed:
+            future.set_exception(BrokenProcessPool("the worker process is gone"))
+            return future
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+            self.loop.add_reader(self.connection.fileno(), self.receive)
+        try:
+            self.connection.send((function, args))
+        except OSError:
+            self.close()
+            future.set_exception(BrokenProcessPool("the worker process is gone"))
+            return future
+        self.pending.append(future)
+        return future
+
+    def receive(self):
+        """Complete the oldest pending call by the result sent by the process; fail all pending calls if it's gone."""
+
+        try:
+            failed, result = self.connection.recv()
+        except (EOFError, OSError):
+            self.close()
+            return
+        future = self.pending.popleft()
+        if not future.done():  # the caller may have stopped waiting, e.g. by a timeout
+            if failed:
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Terminate the process and fail the pending calls by BrokenProcessPool."""
+
+        if self.loop is not None:
+            self.loop.remove_reader(self.connection.fileno())
+            self.loop = None
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+        while self.pending:
+            future = self.pending.popleft()
+            if not future.done():
+                future.set_exception(BrokenProcessPool("the worker process was stopped"))
+
+
+def serve_calls(connection):
+    """Worker process' main function: run the calls received from the connection and send back their results or
+    the errors they raised until the connection is closed."""
+
+    while True:
+        try:
+            function, args = connection.recv()
+        except EOFError:
+            return
+        try:
+            result = False, function(*args)
+        except Exception as error:  # pylint: disable=broad-except
+            result = True, error
+        connection.send(result)
+
+
+class Shards:
+    """A pool of worker processes hosting the engines of the games; a new game goes to the process hosting the fewest
+    games. A process which crashed or was stopped is replaced by a new one, the games it hosted are given to
+    the restarted function."""
+
+    def __init__(self, jobs, restarted=None):
+        self.processes = [ShardProcess() for _ in range(jobs)]
+        self.games = [set() for _ in range(jobs)]  # ids of the games hosted by the processes
+        self.restarted = restarted  # called with the ids of the games lost by a restart
+
+    def assign(self, game_id):
+        """Return the index of the process hosting a new game."""
+
+        shard = min(range(len(self.games)), key=lambda shard_: len(self.games[shard_]))
+        self.games[shard].add(game_id)
+        return shard
+
+    def release(self, shard, game_id):
+        """Count a game hosted by a process as over."""
+
+        self.games[shard].discard(game_id)
+
+    def restart(self, shard):
+        """Stop a process, e.g. one stuck in a move, and replace it by a new one; the games it hosted are released
+        and given to the restarted function. The calls waiting for the process fail by BrokenProcessPool."""
+
+        process, self.processes[shard] = self.processes[shard], ShardProcess()
+        process.close()
+        released, self.games[shard] = self.games[shard], set()
+        if self.restarted is not None and released:
+            self.restarted(released)
+
+    async def call(self, shard, function, *args):
+        """Run a function in a process and return its result without blocking the event loop."""
+
+        process = self.processes[shard]
+        try:
+            return await process.call(function, *args)
+        except BrokenProcessPool:
+            if self.processes[shard] is process:  # the process crashed
+                self.restart(shard)
+            raise
+
+    def submit(self, shard, function, *args):
+        """Run a function in a process without waiting for it."""
+
+        future = self.processes[shard].call(function, *args)
+        future.add_done_callback(lambda future_: future_.cancelled() or future_.exception())  # errors are ignored
+
+    def close(self):
+        """Stop the processes; the moves being computed are abandoned."""
+
+        for process in self.processes:
+            process.close()
+
+
+class Metrics:
+    """Counters of the server's games and moves and the latencies of the latest moves of the server's players."""
+    # a move's latency is the time from the client's move to the countermove, including the wait for a worker process
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.games = self.peak_games = self.started = self.finished = self.moves = self.timeouts = 0
+        self.latencies = deque(maxlen=samples)
+        self.start_time = perf_counter()
+
+    def start_game(self):
+        """Count a new game."""
+
+        self.started += 1
+        self.games += 1
+        self.peak_games = max(self.peak_games, self.games)
+
+    def end_game(self):
+        """Count a game which is over."""
+
+        self.games -= 1
+        self.finished += 1
+
+    def summary(self):
+        """Return the metrics: the numbers of the concurrent games, now and at the peak, of the games started and
+        finished, of the server's moves and of the moves which timed out, the uptime in seconds and the percentiles
+        of the latencies in milliseconds."""
+
+        return {"games": self.games, "peak_games": self.peak_games, "started": self.started,
+                "finished": self.finished, "moves": self.moves, "timeouts": self.timeouts,
+                "uptime": round(perf_counter() - self.start_time, 3),
+                "latency_ms": {name: None if latency is None else round(latency * 1e3, 3)
+                               for name, latency in percentiles(self.latencies).items()}}
+
+
+class Game:
+    """A game hosted by the server: its AI player's process and the fields and line counts of both sides."""
+
+    def __init__(self, game_id, module_name, shard):
+        self.id, self.module_name, self.shard = game_id, module_name, shard
+        self.fields, self.client_fields = set(), set()  # the server's player's fields and the client's ones
+        self.lines, self.client_lines = LineCounts(), LineCounts()
+        self.moves, self.over = 0, False
+        self.result = None  # the result of a game aborted by the server, reported by the client's next move
+
+
+class GameServer:
+    """Hosts the games of the clients connected to it, at most one game per connection at a time. The games are
+    played against the AI player modules given, each game by a new player with a state of its own."""
+
+    def __init__(self, players=("bot",), jobs=None, move_timeout=MOVE_TIMEOUT, idle_timeout=IDLE_TIMEOUT,
+                 max_moves=MAX_MOVES):
+        self.players, self.max_moves = players, max_moves
+        self.move_timeout, self.idle_timeout = move_timeout, idle_timeout
+        self.shards = Shards(jobs or os.cpu_count(), self.abort_games)
+        self.metrics = Metrics()
+        self.game_ids = count(1)
+        self.games = {}  # the games in progress by ids
+
+    async def serve(self, host=HOST, port=PORT, path=None):
+        """Start serving on a TCP port, or on a Unix socket if its path is given; return the asyncio server."""
+
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        """Stop the worker processes."""
+
+        self.shards.close()
+
+    async def handle(self, reader, writer):
+        """Serve a client's connection: answer its commands until it quits, disconnects or is idle for too long."""
+
+        game = None
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                command, _, argument = line.decode(errors="replace").strip().partition(" ")
+                command = command.upper()
+                if not line or command == "QUIT":
+                    break
+                answer, game = await self.execute(game, command, argument)
+                writer.write(answer.encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:  # the client is gone; a cancellation by the server shutting down goes on after cleanup
+            pass  # (some Python 3.11 releases log the cancelled handler as an error of client_connected_cb)
+        finally:
+            if game is not None:
+                self.end_game(game)
+            writer.close()
+
+    async def execute(self, game, command, argument):
+        """Execute a client's command in a game (None before the first one); return the answer and the game."""
+
+        try:
+            if command == "START":
+                module_name = argument or self.players[0]
+                if module_name not in self.players:
+                    raise ValueError(f"unknown player {module_name!r}")
+                if game is not None:
+                    self.end_game(game)
+                game = None  # no game if the new one fails to start
+                game = await self.start_game(module_name)
+                return f"OK {game.id}", game
+            if command == "STATS":
+                return json.dumps(self.metrics.summary()), game
+            if command not in ("BEGIN", "TURN"):
+                return f"UNKNOWN {command}", game
+            if game is not None and game.result is not None:
+                return game.result, None
+            if game is None or game.over:
+                raise ValueError("no game in progress")
+            if command == "BEGIN":
+                if game.moves:
+                    raise ValueError("the game has begun")
+                return await self.countermove(game, None), game
+            move = parse_move(argument)
+            if move in game.fields or move in game.client_fields:
+                raise ValueError(f"the field {format_move(move)} is taken")
+            return await self.countermove(game, move), game
+        except Exception as error:  # pylint: disable=broad-except
+            return f"ERROR {type(error).__name__}: {error}", game
+
+    async def start_game(self, module_name):
+        """Return a new game whose player is started in a worker process."""
+
+        game_id = next(self.game_ids)
+        shard = self.shards.assign(game_id)
+        game = Game(game_id, module_name, shard)
+        try:
+            await self.shards.call(shard, start_engine, game.id, module_name)
+        except BaseException:
+            self.shards.release(shard, game.id)
+            raise
+        self.metrics.start_game()
+        self.games[game.id] = game
+        return game
+
+    def end_game(self, game):
+        """End a game unless it's over and drop its player."""
+
+        if game.over:
+            return
+        game.over = True
+        self.metrics.end_game()
+        del self.games[game.id]
+        self.shards.release(game.shard, game.id)
+        self.shards.submit(game.shard, end_engine, game.id)  # after the move being computed, if any
+
+    async def countermove(self, game, move):
+        """Let the game's player answer the client's move, None if the player begins the game; return the result."""
+        # a move which timed out would keep its worker process busy, delaying the other games hosted by it, so the
+        # process is replaced by a new one and its other games are aborted (see abort_games())
+
+        if move is not None:
+            game.client_fields.add(move)
+            game.moves += 1
+            if game.client_lines.add(move):
+                return self.result(game, "LOSS")
+            if game.moves >= self.max_moves:
+                return self.result(game, "DRAW")
+        start = perf_counter()
+        try:
+            countermove = await asyncio.wait_for(self.shards.call(game.shard, play_engine, game.id, move),
+                                                 self.move_timeout)
+            countermove = validate_move(tuple(countermove))
+            if countermove in game.fields or countermove in game.client_fields:
+                raise PlayerError(f"{game.module_name} played the taken field {format_move(countermove)}")
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            answer = self.result(game, "TIMEOUT")
+            self.shards.restart(game.shard)
+            return answer
+        except BrokenProcessPool:
+            self.end_game(game)
+            if game.result is None:
+                raise
+            return game.result  # the game was aborted while waiting for the move
+        except BaseException:
+            self.end_game(game)
+            raise
+        self.metrics.latencies.append(perf_counter() - start)
+        self.metrics.moves += 1
+        game.fields.add(countermove)
+        game.moves += 1
+        if game.lines.add(countermove):
+            return self.result(game, "WIN", countermove)
+        if game.moves >= self.max_moves:
+            return self.result(game, "DRAW", countermove)
+        return f"MOVE {format_move(countermove)}"
+
+    def abort_games(self, game_ids):
+        """End the games lost by a restart of their worker process (see Shards.restart()); the result ABORTED is
+        reported by the client's next move."""
+
+        for game_id in game_ids:
+            game = self.games.get(game_id)
+            if game is not None:  # a game being started fails by itself
+                game.result = "ABORTED"
+                self.end_game(game)
+
+    def result(self, game, result, countermove=None):
+        """End a game and return the answer of its last move: the result and the countermove, if any."""
+
+        self.end_game(game)
+        return result if countermove is None else f"{result} {format_move(countermove)}"
+
+
+async def run_server(server, host=HOST, port=PORT, path=None):
+    """Serve the games until the server is stopped."""
+
+    async with await server.serve(host, port, path) as asyncio_server:
+        print(f"Serving {', '.join(server.players)} on {path or f'{host}:{port}'}")
+        await asyncio_server.serve_forever()
+
+
+def main():
+    """Run the game server given by the cli arguments until it's interrupted."""
+
+    args = get_server_args()
+    server = GameServer(args.players, args.jobs, args.time_limit, args.idle, args.max_moves)
+    try:
+        asyncio.run(run_server(server, args.address, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
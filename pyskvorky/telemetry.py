@@ -0,0 +1,126 @@
+"""Instrumentation of an AI player's engine (see bot.Engine): per-move telemetry and optional profiling of play().
+A Telemetry object is attached to a single engine instance by shadowing the engine's hot path methods with counting
+wrappers in the instance's namespace; the Engine class stays intact so engines without telemetry pay nothing."""
+import cProfile
+import pstats
+from time import perf_counter
+from geometry import envelope_ids
+
+# metrics of a move (a dictionary passed to the callback and kept in Telemetry.moves):
+# move - the engine's countermove, time - wall time of play() in seconds,
+# scored - candidates scored one by one by score() or ordered_moves() or in a batch by best_move(),
+# simulated - moves applied to the board by make_move(): the opponent's move and the countermove and the moves
+#     simulated by scoring or by the search,
+# lines - lines of the envelopes examined by make_move(), i.e. simulated moves times the lines in an envelope,
+# envelope_hits, envelope_misses - lookups of the envelope_ids() cache (see geometry module; the cache is per process),
+# tt_hits - hits of the transposition table (see transposition module), book - whether the move came from the book,
+# threat_nodes - nodes of the forced win search (see threats module),
+# ponder - True if the move answered a reply precomputed by ponder() (see bot.Engine.ponder()), False if the engine
+#     pondered but not the opponent's move, None if it didn't ponder,
+# open_lines, candidates - sizes of open_lines and next_move_candidates after the move
+
+
+class Telemetry:
+    """Per-move metrics of an engine's play() calls. The metrics of each move are appended to moves and passed to
+    the callback, if any; a profiler is any object with enable() and disable() methods, e.g. cProfile.Profile or
+    a sampling profiler, enabled only while play() runs."""
+
+    def __init__(self, callback=None, profiler=None):
+        self.callback, self.profiler = callback, profiler
+        self.moves = []  # metrics of all moves played so far
+        self.scored, self.simulated = 0, 0  # counters of the current move
+
+    def attach(self, engine):
+        """Instrument an engine instance and return it."""
+        # the wrappers call the methods bound before the wrapping, i.e. the original methods of the class
+
+        play, make_move, score = engine.play, engine.make_move, engine.score
+        best_move, ordered_moves = engine.best_move, engine.ordered_moves
+
+        def make_move_(players_move, players_set, opponents_set, ranked=True):
+            self.simulated += 1
+            return make_move(players_move, players_set, opponents_set, ranked)
+
+        def score_(move):
+            self.scored += 1
+            return score(move)
+
+        def best_move_(candidates=None):
+            scored = self.scored
+            countermove = best_move(candidates)
+            if self.scored == scored:  # the candidates were scored in a single batch, not by score()
+                self.scored += len(engine.next_move_candidates if candidates is None else candidates)
+            return countermove
+
+        def ordered_moves_(candidates, players_set, opponents_set):
+            self.scored += len(candidates)
+            return ordered_moves(candidates, players_set, opponents_set)
+
+        def play_(opponents_move):
+            self.scored, self.simulated = 0, 0
+            cache, tt_hits, book_hits = envelope_ids.cache_info(), engine.transpositions.hits, engine.book_hits
+            threat_nodes = engine.threats.total_nodes
+            ponder_hits, ponder_misses = engine.ponder_hits, engine.ponder_misses
+            if self.profiler is not None:
+                self.profiler.enable()
+            start = perf_counter()
+            try:
+                countermove = play(opponents_move)
+            finally:
+                elapsed = perf_counter() - start
+                if self.profiler is not None:
+                    self.profiler.disable()
+            cache_ = envelope_ids.cache_info()
+            self.record({"move": countermove, "time": elapsed, "scored": self.scored, "simulated": self.simulated,
+                         "lines": self.simulated * len(envelope_ids((0, 0), engine.K)),
+                         "envelope_hits": cache_.hits - cache.hits, "envelope_misses": cache_.misses - cache.misses,
+                         "tt_hits": engine.transpositions.hits - tt_hits, "book": engine.book_hits > book_hits,
+                         "threat_nodes": engine.threats.total_nodes - threat_nodes,
+                         "ponder": (True if engine.ponder_hits > ponder_hits else
+                                    False if engine.ponder_misses > ponder_misses else None),
+                         "open_lines": len(engine.open_lines), "candidates": len(engine.next_move_candidates)})
+            return countermove
+
+        engine.play, engine.make_move, engine.score = play_, make_move_, score_
+        engine.best_move, engine.ordered_moves = best_move_, ordered_moves_
+        return engine
+
+    def record(self, metrics):
+        """Keep the metrics of a move and pass them to the callback."""
+
+        self.moves.append(metrics)
+        if self.callback is not None:
+            self.callback(metrics)
+
+    def summary(self):
+        """Return the number of moves, the total and max time of play(), the totals of the counters and the ponder
+        hits, misses and hit rate."""
+
+        summary = {"moves": len(self.moves), "time": sum(move["time"] for move in self.moves),
+                   "max_time": max((move["time"] for move in self.moves), default=0.0)}
+        for key in "scored", "simulated", "lines", "envelope_hits", "envelope_misses", "tt_hits", "threat_nodes":
+            summary[key] = sum(move[key] for move in self.moves)
+        summary["book"] = sum(move["book"] for move in self.moves)
+        summary["ponder_hits"] = sum(move["ponder"] is True for move in self.moves)
+        summary["ponder_misses"] = sum(move["ponder"] is False for move in self.moves)
+        pondered = summary["ponder_hits"] + summary["ponder_misses"]
+        summary["ponder_rate"] = summary["ponder_hits"] / pondered if pondered else 0.0
+        return summary
+
+    def profile_stats(self, sort="cumulative"):
+        """Return the pstats.Stats of a cProfile profiler sorted by a given key, or None without such a profiler."""
+
+        if not isinstance(self.profiler, cProfile.Profile):
+            return None
+        return pstats.Stats(self.profiler).sort_stats(sort)
+
+
+def format_metrics(metrics):
+    """Return a short one line description of a move's metrics, e.g. for a status line."""
+
+    lookups = metrics["envelope_hits"] + metrics["envelope_misses"]
+    hit_rate = metrics["envelope_hits"] / lookups if lookups else 0.0
+    source = "book, " if metrics["book"] else "ponder, " if metrics["ponder"] else ""
+    return (f"{source}{metrics['time'] * 1e3:.1f} ms, {metrics['scored']} scored, {metrics['lines']} lines, "
+            f"cache {hit_rate:.0%}, tt {metrics['tt_hits']}, threats {metrics['threat_nodes']}, "
+            f"open {metrics['open_lines']}, candidates {metrics['candidates']}")
@@ -0,0 +1,198 @@
+"""Threat-space search for forced wins: sequences of fours and open threes which the opponent has to answer."""
+from time import perf_counter
+from geometry import line_positions
+from transposition import zobrist_key
+
+NODES = 2000  # node budget of a single search; a node is a threat (a move making a four or an open three)
+TIME_LIMIT = 0.05  # time cap of a single search in seconds
+MAX_DEPTH = 12  # max number of threats in a winning sequence
+ATTACKER, DEFENDER = 0, 1  # the player to move searching for a forced win and the opponent
+
+# a four is a line with 4 symbols of one player and no opponent's symbols; the empty position completes a five
+# so the opponent has to block it; a move making two fours (or an open four, i.e. two fours in two lines sharing
+# 4 symbols) can't be blocked at all; an open three is a pattern which can be turned into such a double four by a
+# single move; unless the opponent can answer with a four of their own, they have to block one of the three's lines
+# the forcing moves are found from the lines taken exclusively by one player (see bot.Engine.open_lines) sorted by
+# the number of symbols in them; the search updates the lines in place and takes its moves back when done
+# Note: the moves are tried in sorted order; the iteration order of the sets of lines depends on the history of the
+# sets (e.g. on the moves simulated by the engine's scoring), and it would affect the choice among equal wins
+
+
+class BudgetExceeded(Exception):
+    """Raised when the search runs out of its node budget or time."""
+
+
+class ThreatSolver:
+    """Searches for a forced win of an engine (see bot.Engine) to move using only its fours and open threes.
+    solve() returns a winning sequence of moves or None; proved tells whether no forced win exists within max_depth
+    threats, i.e. the search neither ran out of the budget nor reached max_depth."""
+
+    def __init__(self, engine, nodes=NODES, time_limit=TIME_LIMIT, max_depth=MAX_DEPTH):
+        self.engine = engine
+        self.max_nodes, self.time_limit, self.max_depth = nodes, time_limit, max_depth
+        self.nodes, self.elapsed, self.proved = 0, 0.0, False  # counters of the last search
+        self.total_nodes, self.total_elapsed = 0, 0.0  # counters of all searches
+        # state of a search: both players' symbols, their lines with 2, 3 and 4 symbols, hash of the moves made by
+        # the search and the remaining depths of positions known to have no forced win
+        self.stones, self.lines, self.hash, self.failed = None, None, 0, {}
+        self.deadline, self.depth_limited = 0.0, False
+
+    def solve(self):
+        """Returns a winning sequence of moves starting with the engine's move or None. The sequence alternates the
+        threats and the forced answers and ends by a threat which can't be answered; with more possible answers to
+        a threat, the sequence follows the first one. The search is deepened one threat at a time so that the
+        shortest winning sequence is found."""
+
+        engine = self.engine
+        self.stones = engine.claimed, engine.lost
+        self.lines = [{2: set(), 3: set(), 4: set()}, {2: set(), 3: set(), 4: set()}]
+        for line in engine.open_lines:
+            positions = line_positions(line)
+            for player, stones in enumerate(self.stones):
+                count = len(positions & stones)
+                if count:
+                    if 1 < count < 5:  # a five means the game is over, there is nothing to search
+                        self.lines[player][count].add(line)
+                    break
+        self.hash, self.failed, self.nodes, self.depth_limited = 0, {}, 0, False
+        start = perf_counter()
+        self.deadline = start + self.time_limit
+        try:
+            for depth in range(1, self.max_depth + 1):
+                self.depth_limited = False
+                sequence = self.attack(depth)
+                if sequence or not self.depth_limited:
+                    break
+            self.proved = sequence is None and not self.depth_limited
+        except BudgetExceeded:
+            sequence, self.proved = None, False
+        self.elapsed = perf_counter() - start
+        self.total_nodes += self.nodes
+        self.total_elapsed += self.elapsed
+        return sequence
+
+    def stats(self):
+        """Returns the counters of the last search and the nodes per second rate of all searches."""
+
+        return {"nodes": self.nodes, "elapsed": self.elapsed, "proved": self.proved, "total_nodes": self.total_nodes,
+                "nodes_per_second": self.total_nodes / self.total_elapsed if self.total_elapsed else 0.0}
+
+    def attack(self, depth):
+        """Returns a winning sequence of the attacker to move or None if no threat of the attacker wins."""
+
+        if self.lines[ATTACKER][4]:
+            return [min(position for line in self.lines[ATTACKER][4] for position in self.empty(line))]
+        if self.lines[DEFENDER][4]:
+            return None  # the attacker has to block the defender's four, it's not a forcing move
+        if not depth:
+            self.depth_limited = True
+            return None
+        if self.failed.get(self.hash, -1) >= depth:
+            return None
+        for move in self.threat_moves(3):
+            sequence = self.threat(move, depth, True)
+            if sequence:
+                return sequence
+        if not self.lines[DEFENDER][3]:  # otherwise the defender could answer a three by a four
+            for move in self.threat_moves(2):
+                sequence = self.threat(move, depth, False)
+                if sequence:
+                    return sequence
+        self.failed[self.hash] = depth
+        return None
+
+    def threat(self, move, depth, four):
+        """Returns a winning sequence starting with the attacker's threat if the attacker wins after all possible
+        answers to the threat, otherwise returns None."""
+
+        self.count_node()
+        changes = self.place(move, ATTACKER)
+        try:
+            fives = sorted({position for line in self.lines[ATTACKER][4] for position in self.empty(line)})
+            if len(fives) > 1:
+                return [move]
+            if four:
+                answers = fives
+            elif fives:
+                return None  # a four made by a move from a line of two symbols, it's been searched already
+            else:
+                answers = self.three_answers()
+            sequence = None
+            for answer in answers:
+                changes_ = self.place(answer, DEFENDER)
+                try:
+                    line = self.attack(depth - 1)
+                finally:
+                    self.undo(answer, DEFENDER, changes_)
+                if line is None:
+                    return None
+                sequence = sequence or [move, answer] + line
+            return sequence
+        finally:
+            self.undo(move, ATTACKER, changes)
+
+    def threat_moves(self, count):
+        """Returns the empty positions of the attacker's lines with a given number of symbols."""
+
+        return sorted({position for line in self.lines[ATTACKER][count] for position in self.empty(line)})
+
+    def three_answers(self):
+        """Returns the defender's possible answers to the attacker's open threes, i.e. the empty positions of lines
+        with three attacker's symbols which can be turned into a double four; empty if there's no open three."""
+        # any other answer leaves a move making a double four to the attacker
+
+        fives = {}  # positions making a four mapped to the positions completing the five then
+        for line in self.lines[ATTACKER][3]:
+            first, second = self.empty(line)
+            fives.setdefault(first, set()).add(second)
+            fives.setdefault(second, set()).add(first)
+        double_fours = {position for position, positions in fives.items() if len(positions) > 1}
+        return sorted({position for line in self.lines[ATTACKER][3] if not line_positions(line).isdisjoint(double_fours)
+                       for position in self.empty(line)})
+
+    def empty(self, line):
+        """Returns the empty positions of a line taken exclusively by the attacker."""
+
+        return [position for position in line_positions(line) if position not in self.stones[ATTACKER]]
+
+    def place(self, position, player):
+        """Places a player's symbol and updates both players' lines; returns the changes for undo()."""
+
+        stones, others = self.stones[player], self.stones[1 - player]
+        lines, others_lines = self.lines[player], self.lines[1 - player]
+        stones.add(position)
+        self.hash ^= zobrist_key(position, player == ATTACKER)
+        changes = []
+        for line, mask, others_mask in self.engine.line_masks(position, stones, others):
+            count, others_count = mask.bit_count(), others_mask.bit_count()
+            if others_count:
+                if count == 1 and others_count > 1:  # the opponent's line is blocked
+                    others_lines[others_count].remove(line)
+                    changes.append((others_lines[others_count], line, True))
+            elif count > 1:
+                lines[count].add(line)
+                changes.append((lines[count], line, False))
+                if count > 2:
+                    lines[count - 1].remove(line)
+                    changes.append((lines[count - 1], line, True))
+        return changes
+
+    def undo(self, position, player, changes):
+        """Takes back a symbol placed by place()."""
+
+        for lines, line, removed in reversed(changes):
+            if removed:
+                lines.add(line)
+            else:
+                lines.remove(line)
+        self.stones[player].remove(position)
+        self.hash ^= zobrist_key(position, player == ATTACKER)
+
+    def count_node(self):
+        """Counts a node of the search and stops the search when the budget or the time is exhausted
+        or the engine's move is cancelled (see bot.Engine.cancel())."""
+
+        self.nodes += 1
+        if self.nodes > self.max_nodes or not self.nodes % 64 and (perf_counter() > self.deadline or
+                                                                  self.engine.cancelled):
+            raise BudgetExceeded
@@ -0,0 +1,154 @@
+"""Headless tournament between two AI player modules. Games are played without curses by a pool of worker processes,
+following the same rules as the curses game (see game module). Run it from the project root directory using
+    python pyskvorky/tournament.py -x bot -o rob -n 1000
+command; results of the games are streamed to a file, one JSON object per line, as soon as they are finished."""
+
+from collections import Counter
+from contextlib import nullcontext, ExitStack
+from functools import partial
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+import os
+from random import Random
+import json
+import sys
+from time import perf_counter
+from cli import get_tournament_args
+from game import game_moves
+from helper import new_player, Player, PlayerError
+from protocol import player_command, PlayerPool, TIME_LIMIT
+from records import RecordWriter
+
+OPENING_RADIUS = 2  # random opening moves are placed within this distance from the (0, 0) position
+
+
+def random_opening(rnd, moves, radius=OPENING_RADIUS):
+    """Return a list of distinct random positions around (0, 0) to be used as an opening of a game."""
+
+    positions = [(row, col) for row in range(-radius, radius + 1) for col in range(-radius, radius + 1)]
+    return rnd.sample(positions, moves)
+
+
+def play_game(game, x_player, o_player, opening, max_moves, engines=None):
+    """Play a single headless game between two AI player modules after a given opening; return the game's result.
+    The game is played by the X and O engines given, e.g. player processes (see protocol module), if any; an engine
+    raising PlayerError loses the game, the error is kept in the result."""
+    # each game gets new players (see new_player()) so that the worker processes can play any number of games;
+    # the player to move after the opening gets the opening's last move as an argument of play(), as if it was
+    # just played by the opponent; the rest of the opening is placed on the players' boards using setup()
+
+    players = [Player("X", None, None), Player("O", None, None)]
+    engines = engines or [new_player(x_player), new_player(o_player)]
+    for side, (player, engine) in enumerate(zip(players, engines)):
+        player.play = engine.play
+        player.fields.update(opening[side::2])
+        if opening:
+            board = [(move, i % 2 == side) for i, move in enumerate(opening)]
+            engine.setup(board[:-1] if side == len(opening) % 2 else board)
+
+    player, opponent = players[len(opening) % 2], players[1 - len(opening) % 2]
+    move = opening[-1] if opening else None
+    moves, think_times, winner, error = list(opening), [], None, None
+    try:
+        for player, opponent, move, think_time, winning_fields in game_moves(player, opponent, move,
+                                                                             max_moves - len(opening)):
+            moves.append(move)
+            think_times.append(round(think_time, 6))
+            if winning_fields:
+                winner = player.sym
+    except PlayerError as player_error:  # the player to move failed: the opponent of the last one to move
+        winner, error = (player if think_times else opponent).sym, str(player_error)
+    modules = {"X": x_player, "O": o_player}
+    book_hits = [getattr(engine, "book_hits", 0) for engine in engines]  # moves played from an opening book
+    return {"game": game, "X": x_player, "O": o_player, "winner": winner, "winner_module": modules.get(winner),
+            "length": len(moves), "opening": len(opening), "moves": moves, "think_times": think_times,
+            "book_hits": book_hits, "error": error}
+
+
+def play_task(task, pools=None):
+    """Worker process' entry point: play a game given by a (game, x_player, o_player, seed, opening, max_moves)
+    tuple. The players are player processes lent by the pools of the player modules (see protocol module) if given."""
+    # players swap their markers after each game, i.e. the second player is X in odd games
+
+    game, x_player, o_player, seed, opening, max_moves = task
+    if game % 2:
+        x_player, o_player = o_player, x_player
+    opening = random_opening(Random(seed + game), opening)
+    if pools is None:
+        return play_game(game, x_player, o_player, opening, max_moves)
+    with pools[x_player].player() as x_engine, pools[o_player].player() as o_engine:
+        return play_game(game, x_player, o_player, opening, max_moves, [x_engine, o_engine])
+
+
+def finished_games(tasks, jobs, external=False, time_limit=TIME_LIMIT):
+    """Yield results of the games in the order they are finished. External players are run as player processes
+    (see protocol module): the games are played by threads of this process, each player module has a pool of warm
+    player processes, enough for all the threads, and each move is limited by the time limit in seconds."""
+    # the threads only pass the moves between the player processes, so the players run on all cores regardless of
+    # the GIL and a player which crashes or runs out of time just loses its game; its process is restarted
+
+    if external:
+        jobs = jobs or os.cpu_count()
+        names = list(tasks[0][1:3]) if tasks else []
+        with ExitStack() as stack:
+            pools = {name: stack.enter_context(PlayerPool(player_command(name), jobs * names.count(name), time_limit))
+                     for name in set(names)}
+            with ThreadPool(jobs) as pool:
+                yield from pool.imap_unordered(partial(play_task, pools=pools), tasks)
+    elif jobs == 1:
+        yield from map(play_task, tasks)
+    else:
+        with Pool(jobs) as pool:
+            yield from pool.imap_unordered(play_task, tasks)
+
+
+def run_tournament(x_player, o_player, games, file, jobs=None, opening=2, max_moves=100, seed=0, log=None,
+                   external=False, time_limit=TIME_LIMIT):
+    """Play a given number of games using a pool of worker processes (jobs=1 plays in the current process), or
+    jobs games at a time by external player processes (see finished_games()); write results to a file as soon as
+    the games are finished and return the results' summary.
+    The games are appended to a file of game records (see records module) too if log is given."""
+    # the records keep think times of all moves, the opening moves get zero think times
+
+    tasks = [(game, x_player, o_player, seed, opening, max_moves) for game in range(games)]
+    summary, book_hits = Counter(), Counter()
+    think_times = {x_player: [], o_player: []}
+    start = perf_counter()
+    with open(file, "w", encoding="utf-8") as results, RecordWriter(log) if log else nullcontext() as recorder:
+        for result in finished_games(tasks, jobs, external, time_limit):
+            results.write(json.dumps(result) + "\n")
+            results.flush()
+            if recorder is not None:
+                recorder.write_game(dict(result, think_times=[0.0] * result["opening"] + result["think_times"]))
+            summary[result["winner_module"] or "draw"] += 1
+            summary["moves"] += result["length"]
+            first = result["opening"] % 2  # index of X's first think time; X makes all even moves of the game
+            think_times[result["X"]].extend(result["think_times"][first::2])
+            think_times[result["O"]].extend(result["think_times"][1 - first::2])
+            book_hits.update({result["X"]: result["book_hits"][0], result["O"]: result["book_hits"][1]})
+            if result["error"] is not None:
+                summary["errors"] += 1  # games lost by a failed external player
+    elapsed = perf_counter() - start
+
+    return {"games": games, "wins": {player: summary[player] for player in think_times}, "draws": summary["draw"],
+            "average length": summary["moves"] / max(1, games), "games per hour": games * 3600 / elapsed,
+            "average think time": {player: sum(times) / max(1, len(times)) for player, times in think_times.items()},
+            "book hits": {player: book_hits[player] for player in think_times}, "errors": summary["errors"]}
+
+
+def main():
+    """Run a tournament given by the cli arguments and print its summary."""
+
+    args = get_tournament_args()
+    for module_name in {args.X_player, args.O_player}:
+        if not hasattr(new_player(module_name), "setup") and args.opening:
+            print(f"Player module '{module_name}' doesn't support openings (setup() is missing); use --opening 0.")
+            sys.exit()
+    summary = run_tournament(args.X_player, args.O_player, args.games, args.file, args.jobs, args.opening,
+                             args.max_moves, args.seed, args.log, args.external, args.time_limit)
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
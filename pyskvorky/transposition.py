@@ -0,0 +1,88 @@
+"""Zobrist hashing of the unlimited board and a bounded transposition table of positions evaluated by a search."""
+from collections import OrderedDict
+
+SIZE = 1 << 16  # max number of positions kept in a transposition table
+DEPTH_PREFERRED, LRU = "depth", "lru"  # replacement policies of a transposition table
+EXACT, LOWER, UPPER = 0, 1, 2  # bound types of a stored value: exact value, lower bound (fail high), upper bound
+
+# Zobrist hashing assigns a random 64-bit key to each (position, player) pair and hashes a board by xor-ing the keys
+# of all marked positions; a move updates the hash by a single xor and taking the move back by the same xor again;
+# the board is unlimited so the keys can't be pregenerated into a table, instead a key is derived from the position
+# by the splitmix64 mixing function which makes the keys look random while being the same in every process
+
+MASK = (1 << 64) - 1
+
+
+def zobrist_key(position, own):
+    """Return the 64-bit key of a position marked by the player (own is True) or by the opponent."""
+
+    row, col = position
+    key = ((row & 0x7fffffff) << 33 | (col & 0xffffffff) << 1 | bool(own)) + 0x9e3779b97f4a7c15 & MASK
+    key = (key ^ key >> 30) * 0xbf58476d1ce4e5b9 & MASK
+    key = (key ^ key >> 27) * 0x94d049bb133111eb & MASK
+    return key ^ key >> 31
+
+
+class TranspositionTable:
+    """Bounded map of board hashes to (depth, value, bound, move) entries of positions already searched.
+    With the depth-preferred policy each hash maps to a single slot and a new entry replaces the slot's entry
+    only if it belongs to the same position or it was searched at least as deep; the LRU policy keeps the most
+    recently used entries and drops the least recently used one when the table is full."""
+    # collisions count lookups which found their slot taken by another position (depth-preferred policy only);
+    # two positions with the same 64-bit hash can't be told apart, so a stored move must be checked before use
+
+    def __init__(self, size=SIZE, policy=DEPTH_PREFERRED):
+        if policy not in (DEPTH_PREFERRED, LRU):
+            raise ValueError(f"Unknown replacement policy: {policy}")
+        self.size, self.policy = size, policy
+        self.entries = OrderedDict() if policy == LRU else {}  # slots are allocated only when used
+        self.hits, self.misses, self.collisions = 0, 0, 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Return the (depth, value, bound, move) entry stored for a board hash or None if there is none."""
+
+        if self.policy == LRU:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        slot = self.entries.get(key % self.size)
+        if slot is None or slot[0] != key:
+            self.misses += 1
+            self.collisions += slot is not None
+            return None
+        self.hits += 1
+        return slot[1:]
+
+    def put(self, key, depth, value, bound, move):
+        """Store an entry for a board hash according to the replacement policy."""
+
+        if self.policy == LRU:
+            self.entries[key] = depth, value, bound, move
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+            return
+        index = key % self.size
+        slot = self.entries.get(index)
+        if slot is None or slot[0] == key or depth >= slot[1]:
+            self.entries[index] = key, depth, value, bound, move
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+
+        self.entries.clear()
+        self.hits, self.misses, self.collisions = 0, 0, 0
+
+    def stats(self):
+        """Return hits, misses, collisions, current size and hit rate of the table."""
+
+        requests = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "collisions": self.collisions, "size": len(self),
+                "hit_rate": self.hits / requests if requests else 0.0}
@@ -0,0 +1,186 @@
+"""Self-play tuner of the bot's value tables (see bot module). Candidate tables are proposed by SPSA (simultaneous
+perturbation stochastic approximation): each iteration plays a headless match between two opposite random
+perturbations of the current tables and moves the tables towards the winner of the match. The tuned tables and
+alternative candidates (e.g. the Tribonacci tables of the rob module) are then raced against the bot's own tables;
+a candidate clearly losing the race is dropped early. Run it from the project root directory using
+    python pyskvorky/tuner.py -i 100 -n 8
+command; the matches are played by a pool of worker processes and the best tables and the statistics of the matches
+are written to a JSON file after each iteration, so that an interrupted run keeps its progress."""
+
+from contextlib import nullcontext
+from math import exp, log, sqrt
+from multiprocessing import Pool
+from random import Random
+import json
+import os
+import tempfile
+from time import perf_counter
+import bot
+from cli import get_tuner_args
+from tournament import play_game, random_opening
+
+TABLES = ("value_table_opponent", "value_table_player")  # the tuned tables, attributes of bot.Engine
+FIBONACCI = {name: list(getattr(bot, name)) for name in TABLES}  # the bot's tables, the baseline of the race
+TRIBONACCI = {"value_table_opponent": [0, 0, 1, 1, 2, 4, 7, 13, 24, 44, 81, 149, 274, 504, 927, 1705],
+              "value_table_player": [0, 0, 0, 0, 1, 1, 2, 4, 7, 13, 24, 44, 81, 274, 504, 1705]}  # as in rob module
+PERTURBATION = 0.2  # relative size of the perturbations of the first iteration
+STEP = 0.1  # size of the steps of the first iteration
+Z = 2.0  # a candidate is dropped from the race when its score is below 0 by more than Z standard errors
+
+# the parameters tuned by SPSA are the logarithms of the tables' nonzero values, so a perturbation changes each value
+# by the same ratio and the values stay positive; the zero values stay zero and the values are rounded to integers,
+# so the values 1 and 2 hardly ever change; the perturbations and the steps shrink with the iterations by the usual
+# SPSA gain sequences c / k ** 0.101 and a / (k + A) ** 0.602 where A is a tenth of the iterations
+# a match is played in pairs of games with the same random opening and the players swapping their markers; a pair's
+# score is the first player's wins minus its losses, i.e. -2 to 2; the match's score is the mean score of a game
+
+
+class TunedEngine(bot.Engine):
+    """The bot's engine evaluating the board by the tables given; it plays without an opening book, which would hide
+    the differences of the tables."""
+
+    BOOK = None
+
+    def __init__(self, tables):
+        super().__init__()
+        for name in TABLES:
+            setattr(self, name, list(tables[name]))
+
+
+def play_pair(task):
+    """Worker process' entry point: play a pair of games given by a (tables, opponents_tables, seed, opening,
+    max_moves) tuple; return the first tables' (wins, draws, losses) triple."""
+
+    tables, opponents_tables, seed, opening, max_moves = task
+    opening = random_opening(Random(seed), opening)
+    wins, draws, losses = 0, 0, 0
+    for game, names in enumerate((("tuned", "opponent"), ("opponent", "tuned"))):
+        engines = {"tuned": TunedEngine(tables), "opponent": TunedEngine(opponents_tables)}
+        result = play_game(game, *names, opening, max_moves, [engines[name] for name in names])
+        wins += result["winner_module"] == "tuned"
+        losses += result["winner_module"] == "opponent"
+        draws += result["winner_module"] is None
+    return wins, draws, losses
+
+
+def match(mapper, tables, opponents_tables, pairs, seed, opening=2, max_moves=100):
+    """Play a match of a number of game pairs between two tables; return the first tables' (wins, draws, losses)
+    triple. The pairs are played by a map-like function, e.g. a pool's map()."""
+
+    tasks = [(tables, opponents_tables, seed + pair, opening, max_moves) for pair in range(pairs)]
+    return tuple(map(sum, zip(*mapper(play_pair, tasks))))
+
+
+def to_params(tables):
+    """Return the parameters tuned by SPSA: the logarithms of the tables' nonzero values."""
+
+    return [log(value) for name in TABLES for value in tables[name] if value]
+
+
+def from_params(params, template):
+    """Return the tables of the parameters; the zero values of the template tables stay zero."""
+
+    values = iter(params)
+    return {name: [max(1, round(exp(next(values)))) if value else 0 for value in template[name]] for name in TABLES}
+
+
+def spsa(mapper, tables, iterations, pairs, seed=0, opening=2, max_moves=100, perturbation=PERTURBATION, step=STEP):
+    """Tune the tables by SPSA; yield the tables and the statistics of the match played after each iteration."""
+
+    rnd = Random(seed)
+    params = to_params(tables)
+    for k in range(1, iterations + 1):
+        c_k = perturbation / k ** 0.101
+        a_k = step / (k + iterations / 10) ** 0.602
+        delta = [rnd.choice((-1, 1)) for _ in params]
+        plus = from_params([param + c_k * d for param, d in zip(params, delta)], tables)
+        minus = from_params([param - c_k * d for param, d in zip(params, delta)], tables)
+        wins, draws, losses = match(mapper, plus, minus, pairs, seed + k * pairs, opening, max_moves)
+        score = (wins - losses) / (2 * pairs)
+        params = [param + a_k * score / (2 * c_k) * d for param, d in zip(params, delta)]
+        yield from_params(params, tables), {"iteration": k, "wins": wins, "draws": draws, "losses": losses,
+                                            "score": score}
+
+
+def race(mapper, candidates, baseline, rounds, batch, seed=0, opening=2, max_moves=100):
+    """Race candidate tables (a dict of names and tables) against the baseline tables: each round plays a batch of
+    game pairs of each candidate still in the race; a candidate whose score is clearly below 0 is dropped. Return
+    the statistics of the candidates: wins, draws, losses, score and whether the candidate was dropped."""
+    # all candidates play the same openings; the score's standard error is estimated from the pairs' scores
+
+    stats = {name: {"wins": 0, "draws": 0, "losses": 0, "score": 0.0, "dropped": False, "pair_scores": []}
+             for name in candidates}
+    for round_ in range(rounds):
+        names = [name for name in candidates if not stats[name]["dropped"]]
+        seeds = range(seed + round_ * batch, seed + (round_ + 1) * batch)
+        tasks = [(candidates[name], baseline, pair_seed, opening, max_moves) for name in names for pair_seed in seeds]
+        results = iter(mapper(play_pair, tasks))  # a single map of all candidates' pairs keeps all workers busy
+        for name in names:
+            stat = stats[name]
+            for _ in seeds:
+                result = next(results)
+                for key, count in zip(("wins", "draws", "losses"), result):
+                    stat[key] += count
+                stat["pair_scores"].append((result[0] - result[2]) / 2)
+            scores = stat["pair_scores"]
+            stat["score"] = sum(scores) / len(scores)
+            if len(scores) > 1:
+                variance = sum((score - stat["score"]) ** 2 for score in scores) / (len(scores) - 1)
+                stat["dropped"] = stat["score"] + Z * sqrt(variance / len(scores)) < 0
+    for stat in stats.values():
+        del stat["pair_scores"]
+    return stats
+
+
+def write_report(path, report):
+    """Write the report to a JSON file; a temporary file is renamed so that the file is never left half written."""
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, encoding="utf-8") as file:
+        json.dump(report, file)
+    os.replace(file.name, path)
+
+
+def run_tuning(file, iterations, pairs, rounds, batch, jobs=None, seed=0, opening=2, max_moves=100,
+               perturbation=PERTURBATION, step=STEP):
+    """Tune the bot's tables by SPSA using a pool of worker processes (jobs=1 plays in the current process), race
+    the tuned tables and the Tribonacci tables against the bot's tables and write the report to a file after each
+    iteration and at the end; return the report. The best tables are the bot's ones unless a candidate wins the
+    race with a positive score."""
+
+    start = perf_counter()
+    report = {"best": "fibonacci", "tables": {"fibonacci": FIBONACCI, "tribonacci": TRIBONACCI}, "iterations": [],
+              "race": {}, "games": 0, "elapsed": 0.0}
+    with Pool(jobs) if jobs != 1 else nullcontext() as pool:
+        mapper = pool.map if pool is not None else lambda function, tasks: list(map(function, tasks))
+        for tables, stats in spsa(mapper, FIBONACCI, iterations, pairs, seed, opening, max_moves, perturbation,
+                                  step):
+            report["tables"]["spsa"] = tables
+            report["iterations"].append(stats)
+            report["games"] += 2 * pairs
+            report["elapsed"] = perf_counter() - start
+            write_report(file, report)
+        candidates = {name: tables for name, tables in report["tables"].items() if name != "fibonacci"}
+        report["race"] = race(mapper, candidates, FIBONACCI, rounds, batch, seed + (iterations + 1) * pairs, opening,
+                              max_moves)
+    report["games"] += sum(stat["wins"] + stat["draws"] + stat["losses"] for stat in report["race"].values())
+    winners = [(stat["score"], name) for name, stat in report["race"].items() if stat["score"] > 0]
+    report["best"] = max(winners)[1] if winners else "fibonacci"
+    report["elapsed"] = perf_counter() - start
+    write_report(file, report)
+    return report
+
+
+def main():
+    """Run the tuning given by the cli arguments and print the results of the race."""
+
+    args = get_tuner_args()
+    report = run_tuning(args.file, args.iterations, args.pairs, args.rounds, args.batch, args.jobs, args.seed,
+                        args.opening, args.max_moves, args.perturbation, args.step)
+    for name, stats in report["race"].items():
+        print(f"{name}: {stats}")
+    print(f"best: {report['best']} {report['tables'][report['best']]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Vectorized evaluation of all candidates for the next move at once; it requires the numpy package.
+The score of each candidate is the same as the one computed by bot.Engine.score() or rob.score() one by one, i.e. the
+total value of the player's patterns after the candidate move less the total value of the opponent's patterns."""
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+K = 5  # number of consecutive positions marked with the same symbol required to win
+DIRECTIONS = ((1, 1), (1, 0), (0, 1), (-1, 1))  # the same order of directions as in geometry.line_offsets()
+STEPS = np.array(DIRECTIONS)  # row and column steps of the directions
+
+# the board is copied to a dense int8 array covering the marked positions and the candidates, padded by K-1 empty
+# positions on each side, with 1 for the player's symbols, -1 for the opponent's symbols and 0 for empty positions;
+# each line of K positions is then described by two K-bit masks of both players' symbols computed by strided views
+# of the array in all four directions; a pattern (the player's symbols in a line without opponent's symbols) is
+# identified by an integer key composed of the direction, the player, its first symbol's position and its mask
+
+POPCOUNT = np.array([bin(mask).count("1") for mask in range(32)])  # number of symbols in a 5-bit mask
+TRAILING = np.array([(mask & -mask).bit_length() - 1 if mask else 0 for mask in range(32)])  # first symbol's bit
+
+
+def dense_board(claimed, lost, candidates, length=K):
+    """Return the board as a dense int8 array and the (row, col) position of its [0, 0] item."""
+
+    positions = np.array(list(claimed) + list(lost) + list(candidates)).reshape(-1, 2)
+    top, left = positions.min(axis=0) - (length - 1)
+    bottom, right = positions.max(axis=0) + (length - 1)
+    board = np.zeros((bottom - top + 1, right - left + 1), dtype=np.int8)
+    for fields, symbol in (claimed, 1), (lost, -1):
+        if fields:
+            rows, cols = np.array(list(fields)).T
+            board[rows - top, cols - left] = symbol
+    return board, (top, left)
+
+
+def line_view(board, direction, length=K):
+    """Return a strided (rows, cols, length) view of the lines of a given length starting at each position of the
+    board in a given direction and the row of the board where the first line starts; lines crossing the board's
+    edge are left out."""
+
+    dy, dx = direction
+    rows, cols = board.shape
+    row_stride, col_stride = board.strides
+    first_row = length - 1 if dy < 0 else 0
+    return as_strided(board[first_row:], shape=(rows - (length - 1) * abs(dy), cols - (length - 1) * dx, length),
+                      strides=(row_stride, col_stride, dy * row_stride + dx * col_stride), writeable=False), first_row
+
+
+def line_masks(board, length=K):
+    """Return (row offset, player's masks, opponent's masks) for each direction; masks[r, c] describes the line
+    starting at board[r + row offset, c] with bit i set for a symbol at the i-th position of the line."""
+
+    bits = 1 << np.arange(length)
+    masks = []
+    for direction in DIRECTIONS:
+        lines, first_row = line_view(board, direction, length)
+        masks.append((first_row, (lines == 1) @ bits, (lines == -1) @ bits))
+    return masks
+
+
+def pattern_keys(board, direction, player, rows, cols, masks):
+    """Return keys of the patterns given by masks of the lines starting at given rows and cols of the board;
+    the direction is either an index into DIRECTIONS or an array of them, one for each line."""
+
+    trailing = TRAILING[masks]
+    height, width = board.shape
+    first_row, first_col = rows + trailing * STEPS[direction, 0], cols + trailing * STEPS[direction, 1]
+    return (((direction * 2 + player) * height + first_row) * width + first_col) * 32 + (masks >> trailing)
+
+
+def key_players(keys, board):
+    """Return the players (0 for the player, 1 for the opponent) of the patterns given by their keys."""
+
+    return keys // (32 * board.size) % 2
+
+
+def pattern_values(keys, counts, board, tables, length=K):
+    """Return values of the patterns given by their keys and counts, zero for a zero count; the value tables are
+    indexed as bot.Engine.pattern_to_index() does, tables[0] is used for the player, tables[1] for the opponent.
+    Raise IndexError if a pattern's index is out of its table, as Engine.score() does."""
+    # each table is indexed only by the patterns of its player, the tables may differ in length
+
+    symbols = POPCOUNT[keys % 32]
+    player = key_players(keys, board)
+    index = ((length + 1) * 2 - symbols) * (symbols - 1) // 2 + counts
+    values = np.zeros(len(keys), dtype=np.int64)
+    for player_, table in enumerate(tables):
+        selected = (player == player_) & (counts > 0)
+        values[selected] = table[index[selected]]
+    return values
+
+
+def batch_scores(claimed, lost, candidates, value_table_player, value_table_opponent, length=K):
+    """Return an array of scores of the candidates (a sequence of positions) for the player owning the claimed
+    positions; the scores are computed in a single batch."""
+    # the total value before the move is computed from the counts of all patterns on the board; then each candidate
+    # changes the counts of the patterns in its envelope: a line without opponent's symbols replaces its pattern
+    # by the pattern extended by the move, a line with opponent's symbols only loses its opponent's pattern;
+    # the changes are summed per candidate and pattern so that the new counts and values can be looked up at once
+
+    board, (top, left) = dense_board(claimed, lost, candidates, length)
+    tables = np.array(value_table_player), np.array(value_table_opponent)
+    masks = line_masks(board, length)
+
+    # counts of all patterns on the board, i.e. of 2+ symbols of one player in a line without opponent's symbols
+    keys = []
+    for direction, (first_row, players, opponents) in enumerate(masks):
+        for player, own, other in (0, players, opponents), (1, opponents, players):
+            rows, cols = np.nonzero((other == 0) & (POPCOUNT[own] > 1))
+            keys.append(pattern_keys(board, direction, player, rows + first_row, cols, own[rows, cols]))
+    pattern_set, pattern_counts = np.unique(np.concatenate(keys), return_counts=True)
+    values = pattern_values(pattern_set, pattern_counts, board, tables, length)
+    total = np.where(key_players(pattern_set, board) == 0, values, -values).sum()
+
+    # changes of the pattern counts caused by each candidate; the lines of a candidate's envelope are ordered
+    # by direction and the position of the candidate in the line, as in geometry.envelope()
+    positions = np.array(list(candidates)).reshape(-1, 2) - (top, left)
+    directions, shifts = np.repeat(np.arange(len(DIRECTIONS)), length), np.tile(np.arange(length), len(DIRECTIONS))
+    rows = positions[:, :1] - shifts * STEPS[directions, 0]  # starting positions of the lines, one row per candidate
+    cols = positions[:, 1:] - shifts * STEPS[directions, 1]
+    own, other = np.empty_like(rows), np.empty_like(rows)
+    for direction, (first_row, players, opponents) in enumerate(masks):
+        lines = slice(direction * length, (direction + 1) * length)
+        own[:, lines] = players[rows[:, lines] - first_row, cols[:, lines]]
+        other[:, lines] = opponents[rows[:, lines] - first_row, cols[:, lines]]
+    extended = own | 1 << shifts
+    indexes, keys, changes = [], [], []
+    for selection, player, mask, change in (((other == 0) & (POPCOUNT[own] > 1), 0, own, -1),
+                                            ((other == 0) & (POPCOUNT[extended] > 1), 0, extended, 1),
+                                            ((own == 0) & (POPCOUNT[other] > 1), 1, other, -1)):
+        selected, lines = np.nonzero(selection)
+        indexes.append(selected)
+        keys.append(pattern_keys(board, directions[lines], player, rows[selected, lines], cols[selected, lines],
+                                 mask[selected, lines]))
+        changes.append(np.full(len(selected), change))
+    indexes, keys, changes = np.concatenate(indexes), np.concatenate(keys), np.concatenate(changes)
+
+    # sum the changes per candidate and pattern and evaluate the changed patterns
+    pairs, inverse = np.unique(indexes * (32 * 2 * 4 * board.size) + keys, return_inverse=True)
+    changes = np.bincount(inverse.ravel(), weights=changes).astype(np.int64)
+    indexes, keys = pairs // (32 * 2 * 4 * board.size), pairs % (32 * 2 * 4 * board.size)
+    counts = np.zeros_like(keys)
+    if len(pattern_set):
+        found = np.minimum(np.searchsorted(pattern_set, keys), len(pattern_set) - 1)
+        counts = np.where(pattern_set[found] == keys, pattern_counts[found], 0)
+    deltas = (pattern_values(keys, counts + changes, board, tables, length) -
+              pattern_values(keys, counts, board, tables, length))
+    signs = np.where(key_players(keys, board) == 0, 1, -1)
+    return total + np.bincount(indexes, weights=deltas * signs, minlength=len(positions)).astype(np.int64)
+
+
+def best_move(claimed, lost, candidates, value_table_player, value_table_opponent, length=K):
+    """Return the candidate with the highest score; like max(), it returns the first of the equally scored
+    candidates in the order of iteration over the candidates."""
+
+    candidates = list(candidates)
+    scores = batch_scores(claimed, lost, candidates, value_table_player, value_table_opponent, length)
+    return candidates[int(np.argmax(scores))]
@@ -0,0 +1,79 @@
+"""Viewport of the curses game: the bounds of the marked fields maintained move by move and a scrolling window showing
+the part of the playfield which fits the terminal, following the last move and the cursor."""
+from helper import buf, minsize, DisplayError
+
+# rectangles are (ymin, xmin, ymax, xmax) tuples of board coordinates like the ones of helper.visible_playfield();
+# the outermost rows and columns of a rectangle are covered by its frame, only the positions inside are shown
+
+
+class Bounds:
+    """The smallest rectangle containing the marked fields, updated in constant time by each move."""
+
+    def __init__(self, fields=()):
+        self.ymin = self.xmin = self.ymax = self.xmax = None  # None for an empty board
+        for move in fields:
+            self.add(move)
+
+    def add(self, move):
+        """Extend the bounds by a move."""
+
+        row, col = move
+        if self.ymin is None:
+            self.ymin, self.xmin, self.ymax, self.xmax = row, col, row, col
+            return
+        if row < self.ymin:
+            self.ymin = row
+        elif row > self.ymax:
+            self.ymax = row
+        if col < self.xmin:
+            self.xmin = col
+        elif col > self.xmax:
+            self.xmax = col
+
+    def playfield(self):
+        """Return the playfield, i.e. the bounds plus some buffer space around; the same as helper.visible_playfield()
+        of the marked fields."""
+
+        if self.ymin is None:
+            return -minsize, -minsize, minsize, minsize
+        return (min(-minsize, self.ymin - buf), min(-minsize, self.xmin - buf),
+                max(minsize, self.ymax + buf), max(minsize, self.xmax + buf))
+
+
+def scroll(low, high, span, start, focus):
+    """Return the first row (or column) of a window of a given span between the low and high rows of the playfield
+    so that the focus row is inside the window; the window starting at start is kept if the focus is inside it,
+    otherwise the window is centered around the focus. The window is the whole playfield if it fits the span."""
+
+    if high - low <= span:
+        return low
+    if start is None or not start < focus < start + span:
+        start = focus - span // 2
+    return min(max(start, low), high - span)
+
+
+class Viewport:
+    """The window of the playfield shown on the screen. The window is the whole playfield if it fits the screen,
+    otherwise it is a part of the playfield of the screen's size which scrolls to follow a given focus."""
+
+    def __init__(self, fields=()):
+        self.bounds = Bounds(fields)
+        self.window = None  # the current window, None before the first follow()
+
+    def add(self, move):
+        """Extend the playfield by a move."""
+
+        self.bounds.add(move)
+
+    def follow(self, focus, height, width):
+        """Return the window showing a focus position (a position inside the playfield) for a given maximal height
+        (ymax - ymin) and width (xmax - xmin) of a window; raise DisplayError if nothing fits in them."""
+
+        if height < 2 or width < 2:
+            raise DisplayError  # not even a single position fits inside the frame
+        ymin, xmin, ymax, xmax = self.bounds.playfield()
+        top, left = (None, None) if self.window is None else self.window[:2]
+        top = scroll(ymin, ymax, height, top, focus[0])
+        left = scroll(xmin, xmax, width, left, focus[1])
+        self.window = top, left, min(ymax, top + height), min(xmax, left + width)
+        return self.window
@@ -0,0 +1,81 @@
+"""Background thinking of AI players: a player's play() runs on a worker thread while the curses game keeps reading
+the keyboard, so that the player can be watched thinking and the game can be quit at any time."""
+import threading
+from time import perf_counter
+
+# a move is computed by a daemon thread started for each move; the caller polls done() between reading keys and
+# takes the move by result(); the thread shares the player's state with no other thread as long as the player
+# isn't asked for another move before it returns
+# cancelling is cooperative: cancel() calls the player's cancel function (see bot.Engine.cancel()), which makes
+# play() return its best move so far; a player without one can't be stopped, its daemon thread is left running
+# a player with a ponder function (see bot.Engine.ponder()) goes on thinking on the same thread after its move,
+# until the opponent's move comes: start() cancels the pondering and waits for the thread before the next move
+
+
+class Worker:
+    """Runs an AI player's play() on a background thread one move at a time; cancel is an optional function asking
+    a running play() to return as soon as possible, ponder is an optional function run after each move."""
+
+    def __init__(self, play, cancel=None, ponder=None):
+        self.play, self.cancel_play, self.ponder = play, cancel, ponder
+        self.thread, self.start_time = None, 0.0
+        self.ready = threading.Event()  # set when the countermove is computed
+        self.move, self.error = None, None  # the result of the last play()
+
+    def start(self, opponents_move):
+        """Start computing the countermove to the opponent's move; stop pondering first."""
+
+        if self.thread is not None and self.thread.is_alive():
+            if self.cancel_play is not None:
+                self.cancel_play()
+            self.thread.join()
+        self.move, self.error = None, None
+        self.ready.clear()
+        self.thread = threading.Thread(target=self.run, args=(opponents_move,), daemon=True)
+        self.start_time = perf_counter()
+        self.thread.start()
+
+    def run(self, opponents_move):
+        """Worker thread's entry point: call play() and keep its result or the error it raised, then ponder."""
+
+        try:
+            self.move = self.play(opponents_move)
+        except Exception as error:  # pylint: disable=broad-except
+            self.error = error
+        finally:
+            self.ready.set()
+        if self.ponder is not None and self.error is None:
+            try:
+                self.ponder()
+            except Exception:  # pylint: disable=broad-except
+                pass  # a failed pondering leaves nothing to reuse, the next move is computed as usual
+
+    def done(self, timeout=0.0):
+        """Check whether the countermove is computed, waiting for it up to a given time in seconds."""
+
+        return self.ready.wait(timeout)
+
+    def elapsed(self):
+        """Return the time in seconds since the computation started."""
+
+        return perf_counter() - self.start_time
+
+    def result(self):
+        """Wait for the countermove and return it; an error raised by play() is raised again."""
+
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self.move
+
+    def cancel(self, timeout=1.0):
+        """Ask a running play() or ponder() to return and wait for the thread up to a given time in seconds;
+        return whether it stopped. A player without a cancel function is left running."""
+
+        if self.thread is None or not self.thread.is_alive():
+            return True
+        if self.cancel_play is None:
+            return False
+        self.cancel_play()
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
@@ -4,3 +4,6 @@ import sys
 # set paths for tests imports to work; is there a better way?
 sys.path.append('.')
 sys.path.append('..')
+# the package modules import each other as top-level modules (e.g. 'from geometry import envelope')
+sys.path.append('pyskvorky')
+sys.path.append('../pyskvorky')
@@ -0,0 +1,72 @@
+"""Tests for pyskvorky.annotate module."""
+import json
+import pytest
+from pyskvorky import annotate, records, tournament
+
+
+def _games(number, max_moves=30):
+    """Return games played by the bot against rob as dictionaries of the records.read_games() keys."""
+
+    games = []
+    for game in range(number):
+        result = tournament.play_task((game, "bot", "rob", 0, 2, max_moves))
+        games.append({"X": result["X"], "O": result["O"], "winner": result["winner"], "opening": result["opening"],
+                      "moves": [tuple(move) for move in result["moves"]]})
+    return games
+
+
+def test_replay():
+    """Test replay() gives each player's engine the board before the player's move."""
+
+    game = {"moves": [(0, 0), (1, 1), (0, 1), (2, 2)]}
+    for engine, ply, move in annotate.replay(game):
+        assert move not in engine.claimed and move not in engine.lost
+        assert len(engine.claimed) + len(engine.lost) == ply
+        assert set(game["moves"][:ply][ply % 2::2]) == engine.claimed  # own moves are every other one
+
+
+def test_annotate_bot():
+    """Test the moves of the bot are the preferred ones and the opening is not annotated."""
+
+    game = _games(1)[0]
+    annotations = list(annotate.annotate(annotate.replay(game), game["opening"]))
+    assert [annotation["ply"] for annotation in annotations] == list(range(2, len(game["moves"])))
+    for annotation in annotations:
+        if game["XO"[annotation["ply"] % 2]] == "bot":
+            assert annotation["move"] == annotation["preferred"]
+            assert annotation["delta"] == 0 and not annotation["blunder"]
+
+
+def test_blunder():
+    """Test a move ignoring the opponent's four is a blunder."""
+
+    game = {"X": "bot", "O": "rob", "winner": "X", "opening": 0,
+            "moves": [(0, 0), (5, 5), (0, 1), (5, -5), (0, 2), (-5, 5), (0, 3), (-5, -5)]}
+    last = annotate.annotate_game((game, "bot", annotate.BLUNDER))["annotations"][-1]
+    assert last["preferred"] in ((0, -1), (0, 4))
+    assert last["blunder"] and last["delta"] >= annotate.BLUNDER
+
+
+@pytest.mark.parametrize('jobs', [1, 2], ids=str)
+def test_annotated_games(jobs):
+    """Test annotations come in the order of the games, also when processed by worker processes in chunks."""
+
+    games = _games(5, 16)
+    annotations = list(annotate.annotated_games(iter(games), jobs=jobs, chunk=2, window=2))
+    assert [(game["X"], game["winner"], len(game["annotations"])) for game in annotations] == \
+        [(game["X"], game["winner"], len(game["moves"]) - game["opening"]) for game in games]
+
+
+def test_run_annotation(tmp_path):
+    """Test run_annotation() annotates games of the records files and summarizes them per player."""
+
+    log, file = tmp_path / "games.pyskg", tmp_path / "annotations.jsonl"
+    with records.RecordWriter(log) as writer:
+        for game in _games(2):
+            writer.write_game(game)
+    summary = annotate.run_annotation([log, log], file, jobs=1)
+    lines = file.read_text().splitlines()
+    assert len(lines) == 4
+    moves = sum(len(json.loads(line)["annotations"]) for line in lines)
+    assert summary["bot"]["moves"] + summary["rob"]["moves"] == moves
+    assert summary["bot"]["agreement"] == 1.0 and summary["bot"]["blunders"] == 0
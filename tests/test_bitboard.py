@@ -0,0 +1,46 @@
+"""Tests for pyskvorky.bitboard module."""
+import pytest
+from pyskvorky import bitboard, geometry
+
+
+fields = {(-1, 1), (0, 1), (1, 1), (2, 1), (3, 1), (-3, 3), (-2, 2), (0, 0), (-5, -3), (-4, -2), (7, -9)}
+
+
+@pytest.mark.parametrize('position', [(-1, 1), (0, 0), (2, 2), (-6, 4), (10, -10)], ids=str)
+def test_envelope_bits(position):
+    """Test envelope_bits() matches the fields of each line in the envelope."""
+
+    board = bitboard.Bitboard(fields)
+    counts = [bits.bit_count() for bits in board.envelope_bits(position)]
+    assert counts == [len(line & fields) for line in geometry.envelope(position)]
+
+
+def test_add_discard():
+    """Test bitmasks are kept in sync with the set when fields are added and removed in any order."""
+
+    board = bitboard.Bitboard()
+    for position in sorted(fields, reverse=True):
+        board.add(position)
+    board.discard((0, 1))
+    board.remove((7, -9))
+    assert board == fields - {(0, 1), (7, -9)}
+    assert [bits.bit_count() for bits in board.envelope_bits((0, 1))] == \
+        [len(line & board) for line in geometry.envelope((0, 1))]
+    board.clear()
+    assert board.envelope_bits((0, 1)) == [0] * 20
+
+
+winning_list = [  # fields, move, expected winning set
+    (fields, (-1, 1), {(-1, 1), (0, 1), (1, 1), (2, 1), (3, 1)}),
+    (fields | {(-1, 1), (1, -1), (2, -2)}, (0, 0), {(2, -2), (1, -1), (0, 0), (-1, 1), (-2, 2), (-3, 3)}),
+    (fields | {(-1, 1), (1, -1), (2, -2)}, (-1, 1),
+     {(-1, 1), (0, 1), (1, 1), (2, 1), (3, 1), (2, -2), (1, -1), (0, 0), (-2, 2), (-3, 3)}),
+    (fields, (0, 0), set()),
+]
+
+
+@pytest.mark.parametrize('fields_, move, result', winning_list, ids=str)
+def test_winning_set(fields_, move, result):
+    """Test winning_set() returns all fields of all winning lines containing the move."""
+
+    assert bitboard.Bitboard(fields_).winning_set(move) == result
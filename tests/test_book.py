@@ -0,0 +1,114 @@
+"""Tests for pyskvorky.book module."""
+import json
+import pytest
+from pyskvorky import book, bot
+
+
+# two games starting at (0, 0): X wins the first one, O wins the second one; the second game has a random opening
+# of two moves which are not recorded as replies
+games = [
+    ([(0, 0), (1, 1), (0, 1), (1, 2), (0, 2)], 0, 0),
+    ([(0, 0), (-1, 1), (0, 1), (1, 2), (2, 2)], 1, 2),
+]
+
+
+def test_collect():
+    """Test collect() counts games and wins of the replies to each position."""
+
+    statistics = book.collect(games)
+    assert dict(statistics[0]) == {(0, 0): [1, 1]}
+    after_first_move = book.zobrist_key((0, 0), False)  # hashed from O's perspective
+    assert dict(statistics[after_first_move]) == {(1, 1): [1, 0]}
+    assert sum(reply[0] for replies in statistics.values() for reply in replies.values()) == 5 + 3
+
+
+def test_collect_plies():
+    """Test collect() records only a given number of the first moves."""
+
+    statistics = book.collect(games, 2)
+    assert sum(reply[0] for replies in statistics.values() for reply in replies.values()) == 2
+
+
+def test_write_book(tmp_path):
+    """Test the book file maps each position to its best reply."""
+
+    path = str(tmp_path / "book.bin")
+    statistics = book.collect(games + [([(0, 0), (1, 1), (1, 0)], None, 0)])
+    assert book.write_book(path, statistics, 1, 0.0) == 4 < len(statistics)  # the replies of the rest never won
+    opening_book = book.OpeningBook(path)
+    assert len(opening_book) == 4
+    keys = [opening_book.record(i)[0] for i in range(len(opening_book))]
+    assert keys == sorted(keys)
+    assert opening_book.get(0) == ((0, 0), 2, 1)  # the second game's (0, 0) is a part of its opening
+    assert opening_book.get(book.zobrist_key((0, 0), False)) is None  # (1, 1) lost its game, (-1, 1) isn't recorded
+    assert opening_book.get(12345) is None
+    assert opening_book.stats() == {"positions": 4, "hits": 1, "misses": 2}
+    opening_book.close()
+
+
+def test_write_book_confidence(tmp_path):
+    """Test the book prefers a reply winning most of many games to one winning a single game and leaves out
+    the positions without a reply played in enough games with a confident win rate."""
+
+    path = str(tmp_path / "book.bin")
+    statistics = {1: {(0, 0): [1, 1], (1, 1): [100, 99]}, 2: {(0, 0): [4, 4]}, 3: {(0, 0): [50, 0]},
+                  4: {(2, 2): [10, 9], (3, 3): [12, 9]}}
+    assert book.wilson_bound(1, 1) < book.wilson_bound(100, 99)
+    assert book.write_book(path, statistics) == 2
+    opening_book = book.OpeningBook(path)
+    assert [opening_book.get(key) for key in range(1, 5)] == [((1, 1), 100, 99), None, None, ((2, 2), 10, 9)]
+    opening_book.close()
+    assert book.write_book(path, statistics, 1) == 3  # a single game is enough, 4 of 4 wins clear the bound too
+
+
+def test_invalid_book(tmp_path):
+    """Test a file which is not a book is rejected."""
+
+    path = tmp_path / "book.bin"
+    path.write_bytes(b"not a book" * 10)
+    with pytest.raises(ValueError):
+        book.OpeningBook(str(path))
+
+
+def test_corpus_games(tmp_path):
+    """Test games recorded by a tournament are read as (moves, winner, opening) tuples."""
+
+    path = tmp_path / "tournament.jsonl"
+    results = [{"moves": [[0, 0], [1, 1]], "winner": "O", "opening": 2}, {"moves": [[0, 0]], "winner": None}]
+    path.write_text("".join(json.dumps(result) + "\n" for result in results), encoding="utf-8")
+    assert list(book.corpus_games([str(path)])) == [([(0, 0), (1, 1)], 1, 2), ([(0, 0)], None, 0)]
+
+
+def test_engine_book(tmp_path):
+    """Test the engine plays the book's reply and counts the book hits."""
+
+    path = str(tmp_path / "book.bin")
+    book.write_book(path, book.collect([([(0, 0), (5, 5), (3, 3)], 0, 0)]), 1, 0.0)
+
+    class BookEngine(bot.Engine):
+        """Engine using the test book."""
+        BOOK = path
+
+    engine = BookEngine()
+    assert engine.play(None) == (0, 0)
+    assert engine.play((5, 5)) == (3, 3)
+    assert engine.book_hits == 1
+    assert engine.play((4, 4)) != (3, 3) and engine.book_hits == 1
+    assert BookEngine().book is engine.book  # the mapped file is shared
+
+
+def test_ponder_book(tmp_path):
+    """Test a book reply found by ponder() is counted as a book hit when it's played, and only then."""
+
+    path = str(tmp_path / "book.bin")
+    book.write_book(path, book.collect([([(0, 0), (0, 1), (3, 3)], 0, 0)]), 1, 0.0)
+
+    class BookEngine(bot.Engine):
+        """Engine using the test book."""
+        BOOK = path
+
+    engine = BookEngine()
+    engine.play(None)
+    assert engine.ponder()[(0, 1)] == (3, 3) and engine.book_hits == 0
+    assert engine.play((0, 1)) == (3, 3)
+    assert (engine.ponder_hits, engine.book_hits) == (1, 1)
@@ -1,39 +1,53 @@
 """Tests for pyskvorky.bot module."""
+from collections import Counter
 from numbers import Number
 from importlib import reload
 import pytest
-from pyskvorky import bot
+from pyskvorky import bot, geometry
 
 
 @pytest.fixture
-def _init_board():
-    """Re-initialize the board"""
+def _engine():
+    """Return an engine with an empty board"""
     # Note: start the fixture name with '_' to prevent pylint warnings W0621 and W0623
     # this is a pytest/pylint deficiency; recommended fix is the '_' prefix or use of 'name' parameter; see:
     # https://stackoverflow.com/questions/46089480/pytest-fixtures-redefining-name-from-outer-scope-pylint
 
-    bot.claimed, bot.lost = set(), set()
-    bot.next_move_candidates = set()
-    bot.open_lines = set()
+    return bot.Engine()
 
 
 @pytest.fixture
-def _prime_board():
-    """Populate the board with 3 moves."""
+def _prime_engine():
+    """Return an engine with the board populated with 3 moves."""
 
-    bot.claimed, bot.lost = {(0, 0), (0, 1), (0, 2)}, {(-1, 0), (-1, 2)}
+    engine = bot.Engine()
+    engine.claimed, engine.lost = {(0, 0), (0, 1), (0, 2)}, {(-1, 0), (-1, 2)}
+    return engine
 
 
 def test_globals():
-    """Test globals are initialized to empty sets after import."""
+    """Test the module level engine's state is initialized to empty sets after import."""
     # Note: we must reload the module to test the initialization status because if some other tests
-    # are run prior this one the status of the globals may chenge and the test would fail
+    # are run prior this one the status of the engine may chenge and the test would fail
 
     reload(bot)
-    assert bot.claimed == set()
-    assert bot.lost == set()
-    assert bot.next_move_candidates == set()
-    assert bot.open_lines == set()
+    assert bot.engine.claimed == set()
+    assert bot.engine.lost == set()
+    assert bot.engine.next_move_candidates == set()
+    assert bot.engine.open_lines == set()
+
+
+def test_engines(_engine):
+    """Test engines don't share their game state, e.g. when the bot plays against itself."""
+
+    opponent = bot.Engine()
+    move = None
+    for _ in range(6):
+        move = _engine.play(move)
+        move = opponent.play(move)
+    assert _engine.claimed == opponent.lost
+    assert _engine.lost == opponent.claimed - {move}  # the opponent's last move hasn't been played yet
+    assert len(_engine.claimed) == len(opponent.claimed) == 6
 
 
 @pytest.mark.parametrize('move', [None, (-1, -2), (0, 0)], ids=str)
@@ -51,21 +65,21 @@ def test_play(move):
 
 
 @pytest.mark.parametrize('move', [(-1, -2), (0, 0)], ids=str)
-def test_update_board(_init_board, move):
+def test_update_board(_engine, move):
     """Test update_board() updates the board with move and countermove."""
     # Note: ignore open_lines and next_move_candidates for the moment
 
-    countermove = bot.play(move)
-    assert move in bot.lost
-    assert countermove in bot.claimed
+    countermove = _engine.play(move)
+    assert move in _engine.lost
+    assert countermove in _engine.claimed
 
 
-def test_initial_move(_init_board):
+def test_initial_move(_engine):
     """Test bot's initial move and the board after the move."""
 
-    assert bot.play(None) == (0, 0)
-    assert bot.claimed == {(0, 0)}
-    assert bot.lost == set()
+    assert _engine.play(None) == (0, 0)
+    assert _engine.claimed == {(0, 0)}
+    assert _engine.lost == set()
 
 
 # patterns, counts and expected results of pattern_to_index(pattern, count)
@@ -95,13 +109,99 @@ pattern_count_list = [  # pattern, count, expected result
 def test_pattern_to_index(pattern, count, result):
     """Test score() returns a number."""
 
-    assert bot.pattern_to_index(pattern, count) == result
+    line = geometry.line_id(0, (-5, -3), 5)
+    pattern = bot.pattern_key(line, geometry.line_mask(line, pattern))
+    assert bot.Engine().pattern_to_index(pattern, count) == result
 
 
 def test_score():
     """Test score() returns a number."""
 
-    assert isinstance(bot.score((0, 0)), Number)
+    assert isinstance(bot.Engine().score((0, 0)), Number)
+
+
+@pytest.mark.parametrize('move', [(1, 1), (-1, 1), (0, 3)], ids=str)
+def test_make_unmake_move(_engine, move):
+    """Test unmake_move() reverts the board and open_lines to the state before make_move()."""
+
+    engine = _engine
+    for players_move, players_set, opponents_set in [
+            ((0, 0), engine.claimed, engine.lost), ((-1, 0), engine.lost, engine.claimed),
+            ((0, 1), engine.claimed, engine.lost), ((-1, 2), engine.lost, engine.claimed)]:
+        engine.update_board(players_move, players_set, opponents_set)
+    claimed, lost, open_lines = set(engine.claimed), set(engine.lost), set(engine.open_lines)
+    pattern_counts, values = dict(engine.pattern_counts), (engine.claimed_value, engine.lost_value)
+    ranks = dict(engine.ranks), dict(engine.mandatory)
+
+    undo = engine.make_move(move, engine.claimed, engine.lost)
+    assert move in engine.claimed
+    engine.unmake_move(undo)
+    assert (engine.claimed, engine.lost, engine.open_lines) == (claimed, lost, open_lines)
+    assert (engine.pattern_counts, (engine.claimed_value, engine.lost_value)) == (pattern_counts, values)
+    assert (engine.ranks, engine.mandatory) == ranks
+
+
+def test_running_values(_engine):
+    """Test the running totals maintained by update_board() match a full evaluation of all open lines."""
+
+    engine = _engine
+    engine.play(None)
+    for move in [(1, 1), (0, 2), (-1, 1), (2, 2), (1, 0), (-2, 2), (3, 3), (0, -1)]:
+        if move in engine.claimed:
+            continue
+        engine.play(move)
+        assert engine.claimed_value == engine.evaluate_board(engine.claimed, engine.value_table_player)
+        assert engine.lost_value == engine.evaluate_board(engine.lost, engine.value_table_opponent)
+
+
+# opponent's moves of a recorded game against the bot, which began the game at (0, 0)
+recorded_moves = [(0, -1), (0, -3), (-4, 0), (-5, -3), (3, -1), (4, 1), (4, 4), (-6, -5), (-7, -3), (-5, -8),
+                  (-5, -9), (-9, -6), (-11, -7), (-8, -9), (-13, -12), (-14, -10)]
+
+
+def _baseline_score(engine, open_lines, move):
+    """Return the score of a move as the original bot computed it: a full recount of the patterns in copies of
+    the board and the open lines (frozensets of positions) updated with the move."""
+
+    def evaluate_board(fields_collection, value_table):
+        c = Counter([line & fields_collection for line in open_lines_])
+        e = [value_table[((bot.K + 1) * 2 - len(pattern)) * (len(pattern) - 1) // 2 + count]
+             for pattern, count in c.items() if len(pattern) > 1]
+        return sum(e)
+
+    claimed_ = engine.claimed | {move}
+    open_lines_ = set(open_lines)
+    open_lines_.update(geometry.envelope(move, bot.K))
+    open_lines_.difference_update([line for line in geometry.envelope(move, bot.K)
+                                   if not line.isdisjoint(engine.lost)])
+    return (evaluate_board(claimed_, engine.value_table_player) -
+            evaluate_board(engine.lost, engine.value_table_opponent))
+
+
+def test_recorded_moves():
+    """Test the make/unmake scoring chooses the same moves as the original full recount in a recorded game."""
+
+    class StaticEngine(bot.Engine):
+        """The engine choosing the best scoring move without any search, beam, forced wins or opening book."""
+
+        BEAM, THREATS, BOOK, NUMPY, DEPTH = None, False, None, False, 1
+
+    engine, open_lines = StaticEngine(), set()
+
+    def update_board(move, players_set, opponents_set):
+        engine.update_board(move, players_set, opponents_set)
+        open_lines.update(geometry.envelope(move, bot.K))
+        open_lines.difference_update([line for line in geometry.envelope(move, bot.K)
+                                      if not line.isdisjoint(opponents_set)])
+
+    update_board((0, 0), engine.claimed, engine.lost)
+    for move in recorded_moves:
+        update_board(move, engine.lost, engine.claimed)
+        expected = max(engine.next_move_candidates, key=lambda move_: _baseline_score(engine, open_lines, move_))
+        countermove = engine.choose_move()
+        assert countermove == expected
+        update_board(countermove, engine.claimed, engine.lost)
+        assert {geometry.line_positions(line) for line in engine.open_lines} == open_lines
 
 
 # expected result of envelope((-1, 1), 5)
@@ -130,9 +230,9 @@ env5 = [
 
 
 def test_envelope():
-    """Test envelope() for K=5"""
+    """Test the line ids of envelope_ids() map to the lines of envelope() for K=5"""
 
-    assert bot.envelope((-1, 1), 5) == env5
+    assert [geometry.line_positions(line) for line in bot.envelope_ids((-1, 1), 5)] == env5
 
 
 # expected results of neighborhood((-1, 1), radius) for radius = 1, 2 and 3
@@ -151,15 +251,240 @@ nbr = {
 
 
 @pytest.mark.parametrize('position, radius', [((-1, 1), 1), ((-1, 1), 2), ((-1, 1), 3)], ids=str)
-def test_neighborhood_initial(_init_board, position, radius):
+def test_neighborhood_initial(_engine, position, radius):
     """Test neighborhood() function limits the radius in the first move to 1."""
 
-    assert bot.neighborhood(position, radius) == nbr[1]
+    assert _engine.neighborhood(position, radius) == nbr[1]
 
 
 @pytest.mark.parametrize('position, radius', [((-1, 1), 1), ((-1, 1), 2), ((-1, 1), 3)], ids=str)
-def test_neighborhood_full(_prime_board, position, radius):
+def test_neighborhood_full(_prime_engine, position, radius):
     """Test neighborhood() function won't limit the radius after the initial few (three) moves."""
-    # Note: use prime_board fixture to populate the board to avoid automatic radius adjustment
+    # Note: use prime_engine fixture to populate the board to avoid automatic radius adjustment
+
+    assert _prime_engine.neighborhood(position, radius) == nbr[radius]
+
+
+def _played_engine(moves, engine=None):
+    """Return an engine (a new one by default) which played a given sequence of alternating own and opponent's
+    moves."""
+
+    engine = bot.Engine() if engine is None else engine
+    for i, move in enumerate(moves):
+        if i % 2:
+            engine.update_board(move, engine.lost, engine.claimed)
+        else:
+            engine.update_board(move, engine.claimed, engine.lost)
+    return engine
+
+
+opening = [(0, 0), (1, 1), (0, 1), (-1, 1), (1, 0), (2, 2), (-1, -1), (0, 2), (2, -1)]
+
+
+class BitboardEngine(bot.Engine):
+    """The engine representing the board by bitboards."""
+
+    BITBOARD = True
+
+
+def test_line_ids():
+    """Test open_lines hold line ids and the set and bitboard boards give the same lines and patterns."""
+
+    engine, bitboard_engine = _played_engine(opening), _played_engine(opening, BitboardEngine())
+    assert engine.open_lines and all(isinstance(line, int) for line in engine.open_lines)
+    assert all(isinstance(pattern, int) for pattern in engine.pattern_counts)
+    assert (engine.open_lines, engine.pattern_counts, engine.claimed_value, engine.lost_value) == \
+        (bitboard_engine.open_lines, bitboard_engine.pattern_counts, bitboard_engine.claimed_value,
+         bitboard_engine.lost_value)
+
+
+def test_search_depth_one():
+    """Test search() at depth 1 selects the same move as the static score, i.e. max() over the beam."""
+
+    engine = _played_engine(opening)
+    assert engine.search(1) == max(engine.beam(engine.next_move_candidates), key=engine.score)
+
+
+def test_beam():
+    """Test beam() returns the candidates ranked highest, all of them if there are few, and keeps the board."""
+
+    engine = _played_engine(opening)
+    candidates = set(engine.next_move_candidates)
+    board = set(engine.claimed), set(engine.lost), set(engine.open_lines)
+    beam = engine.beam(candidates)
+    assert len(beam) == len(set(beam)) == engine.BEAM and set(beam) <= candidates
+    assert (engine.claimed, engine.lost, engine.open_lines, engine.next_move_candidates) == (*board, candidates)
+    assert max(candidates, key=engine.score) in beam
+    assert engine.beam(beam[:3]) == beam[:3]
+    engine.BEAM = None
+    assert engine.beam(candidates) is candidates
+
+
+def _recount_ranks(engine):
+    """Return the ranks and the mandatory moves of beam() recounted by a pass over all open lines."""
+
+    ranks, mandatory = Counter(), Counter()
+    for line in engine.open_lines:
+        positions = geometry.line_positions(line)
+        empty = positions.difference(engine.claimed, engine.lost)
+        count = engine.K - len(empty)
+        for position in empty:
+            ranks[position] += 1 << 2 * count
+            mandatory[position] += count > 2 and (count == 4 or positions.isdisjoint(engine.claimed))
+    return +ranks, +mandatory
+
+
+@pytest.mark.parametrize('bitboard', [False, True], ids=['sets', 'bitboards'])
+def test_ranks(bitboard):
+    """Test the ranks and the mandatory moves kept by make_move() match a recount over all open lines."""
+
+    class RanksEngine(bot.Engine):
+        """Engine on a board of either representation."""
+        BITBOARD = bitboard
+
+    engine = RanksEngine()
+    for move, own in [((0, 0), True), ((5, 0), False), ((3, 3), True), ((5, 1), False), ((-3, 3), True),
+                      ((5, 2), False), ((0, 1), True), ((4, 1), False), ((0, 2), True)]:
+        engine.setup([(move, own)])
+        assert (engine.ranks, engine.mandatory) == _recount_ranks(engine)
+    undo = engine.make_move((0, 3), engine.lost, engine.claimed)
+    assert (engine.ranks, engine.mandatory) == _recount_ranks(engine)
+    engine.unmake_move(undo)
+    assert (engine.ranks, engine.mandatory) == _recount_ranks(engine)
+
+
+@pytest.mark.parametrize('moves, mandatory', [
+    ([(0, 0), (5, 0), (0, 1), (5, 1), (0, 2), (5, 2), (0, 3), (5, 3)], {(0, -1), (0, 4), (5, -1), (5, 4)}),
+    ([(0, 0), (5, 0), (3, 3), (5, 1), (-3, 3), (5, 2)], {(5, -2), (5, -1), (5, 3), (5, 4)}),
+])
+def test_beam_mandatory(moves, mandatory):
+    """Test beam() includes the moves completing a four and blocking the opponent's three even below the beam."""
+
+    engine = _played_engine(moves)
+    engine.BEAM = 1
+    beam = engine.beam(engine.next_move_candidates)
+    assert set(beam) >= mandatory
+    assert beam[0] in mandatory
+
+
+@pytest.mark.parametrize('depth', [2, 3, 4])
+def test_search_keeps_state(depth):
+    """Test search() leaves the board, open_lines, pattern_counts, running totals and candidates intact."""
+
+    engine = _played_engine(opening)
+    state = (set(engine.claimed), set(engine.lost), set(engine.open_lines), dict(engine.pattern_counts),
+             engine.claimed_value, engine.lost_value, set(engine.next_move_candidates))
+    assert engine.search(depth) in engine.next_move_candidates
+    assert state == (engine.claimed, engine.lost, engine.open_lines, engine.pattern_counts,
+                     engine.claimed_value, engine.lost_value, engine.next_move_candidates)
+
+
+@pytest.mark.parametrize('depth', [1, 2, 3])
+def test_search_wins(depth):
+    """Test search() completes its own four rather than blocking the opponent's four."""
+
+    engine = _played_engine([(0, 0), (5, 0), (0, 1), (5, 1), (0, 2), (5, 2), (0, 3), (5, 3)])
+    assert engine.search(depth) in {(0, -1), (0, 4)}
+
+
+@pytest.mark.parametrize('depth', [2, 3])
+def test_search_blocks(depth):
+    """Test search() blocks the opponent's winning move."""
+
+    engine = _played_engine([(0, 0), (5, 0), (2, 2), (5, 1), (-3, 3), (5, 2), (3, -3), (5, 3)])
+    assert engine.search(depth) in {(5, -1), (5, 4)}
+
+
+def test_choose_move():
+    """Test choose_move() returns the countermove play() would make without changing the board."""
+
+    engine = _played_engine(opening[:-1])
+    board = set(engine.claimed), set(engine.lost), set(engine.next_move_candidates), set(engine.open_lines)
+    countermove = engine.choose_move()
+    assert (engine.claimed, engine.lost, engine.next_move_candidates, engine.open_lines) == board
+    assert _played_engine(opening[:-2]).play(opening[-2]) == countermove
+
+
+def test_cancel():
+    """Test a cancelled choose_move() returns the statically best move and leaves the state intact."""
+
+    engine = _played_engine(opening)
+    engine.DEPTH, engine.WIDTH = 6, 20
+    state = (set(engine.claimed), set(engine.lost), set(engine.open_lines), dict(engine.pattern_counts),
+             engine.claimed_value, engine.lost_value, set(engine.next_move_candidates))
+    engine.cancel()
+    assert engine.choose_move() == engine.search(1)
+    assert engine.cancelled  # until play() starts
+    assert state == (engine.claimed, engine.lost, engine.open_lines, engine.pattern_counts,
+                     engine.claimed_value, engine.lost_value, engine.next_move_candidates)
+
+
+def test_ponder():
+    """Test ponder() finds the countermoves to the opponent's best replies without changing the board
+    and play() answers a predicted reply from them."""
+
+    engine = _played_engine(opening)
+    state = (set(engine.claimed), set(engine.lost), set(engine.open_lines), dict(engine.pattern_counts),
+             engine.claimed_value, engine.lost_value, set(engine.next_move_candidates), engine.hash)
+    replies = engine.ponder()
+    assert len(replies) == bot.PONDER
+    assert list(replies) == [move for _, move in engine.ordered_moves(engine.next_move_candidates, engine.lost,
+                                                                      engine.claimed)[:bot.PONDER]]
+    assert state == (engine.claimed, engine.lost, engine.open_lines, engine.pattern_counts,
+                     engine.claimed_value, engine.lost_value, engine.next_move_candidates, engine.hash)
+    assert engine.book_hits == 0
+    reply, countermove = list(replies.items())[-1]
+    assert engine.play(reply) == countermove == _played_engine(opening).play(reply)
+    assert (engine.ponder_hits, engine.ponder_misses, engine.replies) == (1, 0, {})
+
+
+def test_ponder_miss():
+    """Test play() computes the countermove to a reply not predicted by ponder()."""
+
+    engine = _played_engine(opening)
+    replies = engine.ponder(1)
+    reply = next(move for move in sorted(engine.next_move_candidates) if move not in replies)
+    assert engine.play(reply) == _played_engine(opening).play(reply)
+    assert (engine.ponder_hits, engine.ponder_misses) == (0, 1)
+    engine.ponder(0)
+    engine.update_board((9, 9), engine.lost, engine.claimed)  # the board changed, the replies don't apply
+    assert engine.pondered_move((1, 1)) is None
+    assert (engine.ponder_hits, engine.ponder_misses) == (0, 1)
+
+
+def test_play_depth():
+    """Test an engine with a deeper search plays a game using search()."""
+
+    class DeepEngine(bot.Engine):
+        """Engine searching 3 moves ahead."""
+        DEPTH = 3
+
+    engine, opponent, move = DeepEngine(), bot.Engine(), None
+    for _ in range(5):
+        move = opponent.play(engine.play(move))
+    assert len(engine.claimed) == len(opponent.claimed) == 5
+
+
+def test_hash():
+    """Test make_move() and unmake_move() maintain the board's hash independently of the order of the moves."""
+
+    engine = _played_engine(opening)
+    own, opponents = opening[::2], opening[1::2]
+    other = _played_engine([move for pair in zip(own[::-1], opponents[::-1]) for move in pair] + own[:1])
+    assert engine.hash == other.hash != 0
+    board_hash = engine.hash
+    undo = engine.make_move((3, 3), engine.claimed, engine.lost)
+    assert engine.hash != board_hash
+    engine.unmake_move(undo)
+    assert engine.hash == board_hash
+
+
+def test_search_transpositions():
+    """Test search() stores the positions it searched and reuses them when the search is repeated."""
 
-    assert bot.neighborhood(position, radius) == nbr[radius]
+    engine = _played_engine(opening)
+    move = engine.search(3)
+    assert len(engine.transpositions) > 0
+    hits = engine.transpositions.hits
+    assert engine.search(3) == move
+    assert engine.transpositions.hits > hits
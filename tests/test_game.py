@@ -0,0 +1,97 @@
+"""Tests for pyskvorky.game module."""
+from random import Random
+import pytest
+from pyskvorky import game, geometry, helper
+
+
+def scripted(moves):
+    """Return a play() function playing a given sequence of moves regardless of the opponent's moves."""
+
+    moves = iter(moves)
+    return lambda opponents_move: next(moves)
+
+
+def test_game_moves_win():
+    """Test game_moves() lets the players take turns and stops after a winning move."""
+
+    player = helper.Player("X", scripted([(0, i) for i in range(5)]), None)
+    opponent = helper.Player("O", scripted([(1, i) for i in range(5)]), None)
+    moves = list(game.game_moves(player, opponent))
+    assert [player_.sym for player_, *_ in moves] == ["X", "O"] * 4 + ["X"]
+    last_player, last_opponent, move, think_time, winning_fields = moves[-1]
+    assert (last_player, last_opponent, move) == (player, opponent, (0, 4))
+    assert think_time >= 0
+    assert winning_fields == {(0, i) for i in range(5)}
+    assert not any(winning for *_, winning in moves[:-1])
+
+
+@pytest.mark.parametrize('repeated', [(0, 3), (1, 0)], ids=str)
+def test_game_moves_taken_field(repeated):
+    """Test game_moves() rejects a move to a taken field rather than counting it as a win."""
+
+    player = helper.Player("X", scripted([(0, 0), (0, 1), (0, 2), (0, 3), repeated]), None)
+    opponent = helper.Player("O", scripted([(1, i) for i in range(5)]), None)
+    moves = game.game_moves(player, opponent)
+    assert not any(winning for *_, winning in [next(moves) for _ in range(8)])
+    with pytest.raises(game.PlayerError):
+        next(moves)
+    assert len(player.fields) == 4
+
+
+def test_game_moves_max_moves():
+    """Test game_moves() stops after max_moves moves without a winner."""
+
+    player = helper.Player("X", scripted([(0, 2 * i) for i in range(10)]), None)
+    opponent = helper.Player("O", scripted([(1, 2 * i) for i in range(10)]), None)
+    assert len(list(game.game_moves(player, opponent, max_moves=7))) == 7
+    assert len(player.fields) == 4 and len(opponent.fields) == 3
+
+
+winning_list = [  # fields, move, result; cases similar to test_winning_set() in test_helper.py and more winning lines
+    ({(-1, 1), (0, 1), (1, 1), (2, 1), (3, 1), (-3, 3), (-2, 2), (0, 0)}, (-1, 1),
+     {(-1, 1), (0, 1), (1, 1), (2, 1), (3, 1)}),
+    ({(-3, 1), (-1, 1), (0, 1), (1, 1), (2, 1), (-3, 3), (-2, 2), (0, 0)}, (-1, 1), set()),
+    ({(0, i) for i in range(-2, 3)} | {(i, 0) for i in range(-4, 1)} | {(i, i) for i in range(5)}, (0, 0),
+     {(0, i) for i in range(-2, 3)} | {(i, 0) for i in range(-4, 1)} | {(i, i) for i in range(5)}),
+    ({(0, i) for i in range(-2, 4)}, (0, 0), {(0, i) for i in range(-2, 4)}),  # six in a row, two winning lines
+]
+
+
+@pytest.mark.parametrize('fields, move, result', winning_list, ids=str)
+def test_line_counts(fields, move, result):
+    """Test LineCounts.add() returns all fields of all winning lines, the same as helper.winning_set()."""
+
+    lines = game.LineCounts(fields - {move})
+    assert lines.add(move) == result == lines.winning_fields
+    assert result == helper.winning_set(move, helper.Player("X", None, None, fields))
+
+
+def test_line_counts_line_ids():
+    """Test LineCounts identifies the lines by the same line ids as the engine's open lines."""
+
+    lines = game.LineCounts([(0, 0), (0, 1)])
+    assert set(lines.counts) == set(geometry.envelope_ids((0, 0))) | set(geometry.envelope_ids((0, 1)))
+    assert lines.counts[geometry.line_id(2, (0, -3))] == 2  # the horizontal line from (0, -3) to (0, 1)
+
+
+def test_line_counts_random():
+    """Test LineCounts agrees with helper.winning_set() on random boards."""
+
+    rnd = Random(0)
+    for _ in range(20):
+        player = helper.Player("X", None, None)
+        lines = game.LineCounts()
+        for _ in range(60):
+            move = rnd.randint(-4, 4), rnd.randint(-4, 4)
+            if move not in player.fields:
+                player.fields.add(move)
+                assert lines.add(move) == helper.winning_set(move, player)
+
+
+def test_game_moves_opening():
+    """Test game_moves() counts the fields marked before the game."""
+
+    player = helper.Player("X", scripted([(0, 4)]), None, {(0, i) for i in range(4)})
+    opponent = helper.Player("O", scripted([]), None, {(1, i) for i in range(4)})
+    *_, winning_fields = list(game.game_moves(player, opponent))[-1]
+    assert winning_fields == {(0, i) for i in range(5)}
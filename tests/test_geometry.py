@@ -0,0 +1,61 @@
+"""Tests for pyskvorky.geometry module."""
+import pytest
+from pyskvorky import geometry
+
+
+def test_line_offsets():
+    """Test line_offsets() returns 4 directions times K lines of K positions, each line containing (0, 0)."""
+
+    offsets = geometry.line_offsets(5)
+    assert len(offsets) == 20
+    assert all(len(line) == 5 and (0, 0) in line for line in offsets)
+    assert geometry.line_offsets(5) is offsets  # computed only once
+
+
+@pytest.mark.parametrize('length', [3, 5, 6], ids=str)
+def test_envelope(length):
+    """Test envelope() translates the offsets to a given position."""
+
+    envelope = geometry.envelope((-1, 1), length)
+    assert len(envelope) == 4 * length
+    assert all(len(line) == length and (-1, 1) in line for line in envelope)
+    assert len(set(envelope)) == 4 * length
+    assert isinstance(envelope, tuple) and geometry.envelope((-1, 1), length) is envelope  # shared, immutable
+
+
+@pytest.mark.parametrize('length', [3, 5, 6], ids=str)
+@pytest.mark.parametrize('position', [(0, 0), (-1, 1), (7, -300)], ids=str)
+def test_envelope_ids(position, length):
+    """Test the line ids of envelope_ids() unpack to the lines of envelope() and the position's bits."""
+
+    lines = geometry.envelope_ids(position, length)
+    assert tuple(geometry.line_positions(line) for line in lines) == geometry.envelope(position, length)
+    assert [geometry.line_mask(line, {position}) for line in lines] == list(geometry.envelope_bits(length))
+    anchor = position[0] - length + 1, position[1] - length + 1
+    assert geometry.unpack(lines[0]) == (0, anchor, length) and geometry.line_id(0, anchor, length) == lines[0]
+
+
+def test_pattern_key():
+    """Test the same symbols give the same pattern key in any line containing them."""
+
+    fields = {(0, 1), (0, 3)}
+    masks = [(line, geometry.line_mask(line, fields)) for line in geometry.envelope_ids((0, 1))]
+    keys = [geometry.pattern_key(line, mask) for line, mask in masks if mask.bit_count() == 2]
+    assert len(keys) == 3 and len(set(keys)) == 1 and geometry.pattern_size(keys[0]) == 2
+    row = geometry.line_id(2, (0, 0))
+    assert geometry.pattern_key(row, 0b1010) == geometry.pattern_key(row + geometry.STEPS[2], 0b101)
+    assert geometry.pattern_key(row, 0b1010) != geometry.pattern_key(geometry.line_id(1, (0, 0)), 0b1010)
+
+
+def test_cache_stats():
+    """Test cache_stats() counts repeated envelope() and envelope_ids() calls as cache hits."""
+
+    geometry.envelope.cache_clear()
+    geometry.envelope_ids.cache_clear()
+    geometry.envelope((2, 3), 5)
+    geometry.envelope((2, 3), 5)
+    geometry.envelope_ids((2, 3), 5)
+    geometry.envelope_ids((2, 3), 5)
+    stats = geometry.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 2)
+    assert stats["hit_rate"] == 0.5
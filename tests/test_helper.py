@@ -1,19 +1,23 @@
 """Tests for helper and cli modules."""
 from unittest.mock import patch
+from importlib import import_module
 import pytest
 from pyskvorky import helper, cli
 
 
 argv_list = [  # argv, result
-    (['pyskvorky'], ('bot', 'human', 0, False)),
-    (['pyskvorky', '-r'], ('human', 'bot', 0, False)),
-    (['pyskvorky', '-o', 'rob', '-d'], ('bot', 'rob', 0, True)),
-    (['pyskvorky', '-d'], ('bot', 'human', 0, False)),
-    (['pyskvorky', '-o', 'rob', '-s', '1'], ('bot', 'rob', 1, False)),
-    (['pyskvorky', '-orob', '-s', '1'], ('bot', 'rob', 1, False)),
-    (['pyskvorky', '-orob', '-s1'], ('bot', 'rob', 1, False)),
-    (['pyskvorky', '-obot'], ('bot', 'bot', 0, False)),
-    (['pyskvorky', '-oh'], ('bot', 'h', 0, False)),
+    (['pyskvorky'], ('bot', 'human', 0, False, False, None, False)),
+    (['pyskvorky', '-r'], ('human', 'bot', 0, False, False, None, False)),
+    (['pyskvorky', '-o', 'rob', '-d'], ('bot', 'rob', 0, True, False, None, False)),
+    (['pyskvorky', '-d'], ('bot', 'human', 0, False, False, None, False)),
+    (['pyskvorky', '-o', 'rob', '-s', '1'], ('bot', 'rob', 1, False, False, None, False)),
+    (['pyskvorky', '-orob', '-s', '1'], ('bot', 'rob', 1, False, False, None, False)),
+    (['pyskvorky', '-orob', '-s1'], ('bot', 'rob', 1, False, False, None, False)),
+    (['pyskvorky', '-obot'], ('bot', 'bot', 0, False, False, None, False)),
+    (['pyskvorky', '-oh'], ('bot', 'h', 0, False, False, None, False)),
+    (['pyskvorky', '-o', 'rob', '-t'], ('bot', 'rob', 0, False, True, None, False)),
+    (['pyskvorky', '-l', 'games.pyskg'], ('bot', 'human', 0, False, False, 'games.pyskg', False)),
+    (['pyskvorky', '-o', 'rob', '-e'], ('bot', 'rob', 0, False, False, None, True)),
 ]
 
 
@@ -24,7 +28,7 @@ def test_get_cli_args(argv, result):
     # https://stackoverflow.com/questions/18668947/how-do-i-set-sys-argv-so-i-can-unit-test-it
     # this is what works too but we're trying to avoid:
     # sys.argv = ['pyskvorky'] + []
-    # assert cli.get_cli_args() == ('bot', 'human', 0, False)
+    # assert cli.get_cli_args() == ('bot', 'human', 0, False, False, None, False)
     with patch('sys.argv', argv):
         assert cli.get_cli_args() == result
 
@@ -38,6 +42,52 @@ def test_get_cli_args_SystemExit(argv):
             cli.get_cli_args()
 
 
+def test_get_tournament_args():
+    """Test parsing tournament cli arguments."""
+
+    args = cli.get_tournament_args(['-o', 'bot', '-n', '10', '-j1', '-p', '0'])
+    assert (args.X_player, args.O_player, args.games, args.jobs, args.opening) == ('bot', 'bot', 10, 1, 0)
+    assert (args.max_moves, args.seed, args.file, args.log) == (100, 0, 'tournament.jsonl', None)
+    assert (args.external, args.time_limit) == (False, 5.0)
+
+
+def test_get_book_args():
+    """Test parsing opening book builder cli arguments."""
+
+    args = cli.get_book_args(['-c', 'a.jsonl', 'b.jsonl', '-n', '10'])
+    assert (args.file, args.corpus, args.games, args.player) == (None, ['a.jsonl', 'b.jsonl'], 10, 'bot')
+    assert (args.plies, args.jobs, args.seed, args.min_games) == (12, None, 0, 5)
+
+
+def test_get_annotate_args():
+    """Test parsing annotation cli arguments."""
+
+    args = cli.get_annotate_args(['a.pyskg', 'b.pyskg', '-j2', '-b', '50'])
+    assert (args.records, args.file, args.player) == (['a.pyskg', 'b.pyskg'], 'annotations.jsonl', 'bot')
+    assert (args.blunder, args.jobs, args.chunk) == (50, 2, 8)
+
+
+def test_get_server_args():
+    """Test parsing game server and load generator cli arguments."""
+
+    args = cli.get_server_args(['-x', 'bot', 'rob', '-u', 'server.sock'])
+    assert (args.players, args.address, args.port, args.unix, args.jobs) == (['bot', 'rob'], '127.0.0.1', 7575,
+                                                                               'server.sock', None)
+    assert (args.time_limit, args.idle, args.max_moves) == (10.0, 300.0, 100)
+    args = cli.get_loadgen_args(['-c', '50', '-p', '8000'])
+    assert (args.clients, args.games, args.player, args.address, args.port, args.unix, args.seed) == \
+        (50, 2, 'bot', '127.0.0.1', 8000, None, 0)
+
+
+def test_get_tuner_args():
+    """Test parsing value tables tuner cli arguments."""
+
+    args = cli.get_tuner_args(['-i', '100', '-j4', '-c', '0.1'])
+    assert (args.file, args.iterations, args.pairs, args.rounds, args.batch) == ('tuning.json', 100, 8, 10, 10)
+    assert (args.jobs, args.opening, args.max_moves, args.seed, args.perturbation, args.step) == \
+        (4, 2, 100, 0, 0.1, 0.1)
+
+
 def test_player():
     """Test Player class assigns a distinct mutable default value for each instance."""
     # assigning a mutable default value to an instance variable can be tricky; see:
@@ -56,6 +106,17 @@ def test_player():
     assert player2.fields == set()
 
 
+def test_load_player():
+    """Test load_player() creates a new engine for each game of a module providing an Engine class."""
+
+    play1, play2 = helper.load_player("bot"), helper.load_player("bot")
+    assert play1.__self__ is not play2.__self__
+    assert play1(None) == play2(None) == (0, 0)
+    assert helper.has_engine("bot")
+    assert not helper.has_engine("rob")
+    assert helper.load_player("rob") is import_module("rob").play
+
+
 def move_player_list():
     """Return a list of arguments and results for test_winning_set"""
 
@@ -65,7 +126,12 @@ def move_player_list():
     player2 = helper.Player(dummy, dummy, dummy, {(-2, 1), (0, 1), (1, 1), (2, 1), (3, 1), (-3, 3), (-2, 2), (0, 0)})
     winning_set = {(-1, 1), (0, 1), (1, 1), (2, 1), (3, 1)}
 
-    return [(None, player1, frozenset()), ((-1, 1), player1, winning_set), ((-1, 1), player2, frozenset())]
+    # the same boards represented as bitboards; use the Bitboard class imported by the helper module
+    player3 = helper.Player(dummy, dummy, dummy, helper.Bitboard(player1.fields))
+    player4 = helper.Player(dummy, dummy, dummy, helper.Bitboard(player2.fields))
+
+    return [(None, player1, frozenset()), ((-1, 1), player1, winning_set), ((-1, 1), player2, frozenset()),
+            ((-1, 1), player3, winning_set), ((-1, 1), player4, frozenset())]
 
 
 @pytest.mark.parametrize('move, player, result', move_player_list())
@@ -118,8 +184,8 @@ env = [
 
 def test_envelope():
     """Test envelope() returns all 20 lines"""
-    # Note: this is not a duplicate test to test_envelope in test_bot:
-    # envelope() implementations in both bot.py and helper.py modules are independent
+    # Note: helper.envelope() is the shared geometry.envelope(), while test_envelope in test_bot checks
+    # the line ids of bot.envelope_ids(); both have to give the same lines
 
-    assert helper.envelope((-1, 1)) == env
+    assert helper.envelope((-1, 1)) == tuple(env)
     assert len(helper.envelope((-1, 1))) == 20
@@ -0,0 +1,101 @@
+"""Tests for pyskvorky.protocol module."""
+import io
+import sys
+import pytest
+from pyskvorky import bot, helper, protocol
+
+# a player process answering OK to any command except TURN, which takes it too long, and exiting on BEGIN
+SLOW = [sys.executable, "-c", "import sys, time\n"
+        "for line in sys.stdin:\n"
+        "    if line.startswith('BEGIN'): break\n"
+        "    time.sleep(line.startswith('TURN') * 10)\n"
+        "    print('OK', flush=True)\n"]
+
+
+def _serve(commands, module_name="bot"):
+    """Return the answers of a player module to the lines of commands."""
+
+    answers = io.StringIO()
+    protocol.serve(module_name, io.StringIO("".join(command + "\n" for command in commands)), answers)
+    return answers.getvalue().splitlines()
+
+
+def test_parse_move():
+    """Test moves and fields are parsed back from their protocol lines."""
+
+    assert protocol.parse_move(protocol.format_move((-3, 12))) == (-3, 12)
+    assert protocol.parse_field("1,-2,1\n") == ((1, -2), True)
+    assert protocol.parse_field("1,-2,2") == ((1, -2), False)
+    for text in "1", "1,x", "1,2,3":
+        with pytest.raises(ValueError):
+            protocol.parse_move(text)
+    with pytest.raises(ValueError):
+        protocol.parse_field("1,2,3")
+
+
+def test_serve():
+    """Test the answers of a player module are the moves of its engine."""
+
+    engine = bot.Engine()
+    engine.setup([((0, 0), False), ((1, 1), True)])
+    answers = _serve(["ABOUT", "START", "BOARD", "0,0,2", "1,1,1", "DONE", "TURN 0,1", "START", "BEGIN", "END",
+                      "BEGIN"])
+    assert answers == ['name="bot"', "OK", "OK", protocol.format_move(engine.play((0, 1))), "OK", "0,0"]
+
+
+def test_serve_errors():
+    """Test failing and unknown commands are answered by an error and the player goes on."""
+
+    answers = _serve(["TURN 0,0", "START", "TURN x", "BOARD", "0,0,3", "DONE", "HELLO", "BEGIN"])
+    assert [answer.split()[0] for answer in answers] == ["ERROR", "OK", "ERROR", "ERROR", "UNKNOWN", "0,0"]
+    assert _serve(["START"], "nosuch")[0].startswith("ERROR ModuleNotFoundError")
+
+
+def test_remote_player():
+    """Test a player module run as a process plays the same moves as the module itself."""
+
+    module = helper.new_player("rob")
+    module.setup([((0, 0), False)])
+    player = protocol.RemotePlayer(protocol.player_command("rob"))
+    try:
+        player.new_game()
+        assert player.play(None) == (0, 0)
+        player.new_game()
+        player.setup([((0, 0), False)])
+        assert player.play((1, 1)) == module.play((1, 1))
+        with pytest.raises(protocol.PlayerError, match="ERROR"):
+            player.request(["TURN 0,0,0"], 5.0)
+        assert player.alive()  # an error answer doesn't stop the process
+    finally:
+        player.close()
+    assert not player.alive()
+
+
+def test_remote_player_failures():
+    """Test a player exceeding the time limit or exiting raises PlayerError and its process is killed."""
+
+    player = protocol.RemotePlayer(SLOW, time_limit=0.2)
+    player.new_game()
+    with pytest.raises(protocol.PlayerError, match="time limit"):
+        player.play((0, 0))
+    assert not player.alive()
+    with pytest.raises(protocol.PlayerError, match="not running"):
+        player.new_game()
+    player.restart()
+    with pytest.raises(protocol.PlayerError, match="exited"):
+        player.play(None)
+    assert not player.alive() and player.restarts == 1
+
+
+def test_player_pool():
+    """Test the pool lends its idle players and restarts the failed ones."""
+
+    with protocol.PlayerPool(SLOW, 2, time_limit=0.2) as pool:
+        with pool.player() as first, pool.player() as second:
+            assert first is not second
+            with pytest.raises(protocol.PlayerError):
+                first.play((0, 0))
+        assert first.alive() and pool.restarts() == 1
+        with pool.player() as third:
+            assert third is second  # the idle players are lent in turn
+    assert not any(player.alive() for player in pool.players)
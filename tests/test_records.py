@@ -0,0 +1,114 @@
+"""Tests for pyskvorky.records module."""
+import pytest
+from pyskvorky import records
+
+
+@pytest.mark.parametrize('number', [0, 1, 127, 128, 300, 2 ** 35 + 3], ids=str)
+def test_varint(number):
+    """Test a varint is decoded to the encoded number and takes 7 bits per byte."""
+
+    encoded = records.encode_varint(number)
+    assert records.decode_varint(b"x" + encoded + b"y", 1) == (number, len(encoded) + 1)
+    assert len(encoded) == max(1, (number.bit_length() + 6) // 7)
+    with pytest.raises(IndexError):
+        records.decode_varint(encoded[:-1], 0)
+
+
+@pytest.mark.parametrize('number', [0, -1, 1, -2, 2, -1000, 1000], ids=str)
+def test_zigzag(number):
+    """Test zigzag encoding of signed numbers."""
+
+    assert records.unzigzag(records.zigzag(number)) == number
+    assert records.zigzag(number) == 2 * abs(number) - (number < 0)
+
+
+def _game(moves=((0, 0), (1, 1), (-1, 2), (300, -5000)), winner="X", x_player="bot", o_player="rob"):
+    """Return a game as a dictionary of the read_games() keys."""
+
+    return {"X": x_player, "O": o_player, "K": 5, "started": 1700000000, "opening": 1, "winner": winner,
+            "moves": list(moves), "think_times": [i / 1000 for i in range(len(moves))]}
+
+
+def test_write_read(tmp_path):
+    """Test games written move by move or at once are read back in order."""
+
+    file = tmp_path / "games.pyskg"
+    games = [_game(), _game(winner=None, o_player="human \\u00e9"), _game(moves=(), winner="O")]
+    with records.RecordWriter(file) as writer:
+        writer.start_game("bot", "rob", 5, 1700000000, 1)
+        for move, think_time in zip(games[0]["moves"], games[0]["think_times"]):
+            writer.add_move(move, think_time)
+        writer.end_game("X")
+        for game in games[1:]:
+            writer.write_game(game)
+    with records.RecordWriter(file) as writer:  # appended to the same file
+        writer.write_game(games[0])
+    assert list(records.read_games(file)) == games + games[:1]
+
+
+def test_compact(tmp_path):
+    """Test a move near the previous one played without thinking takes 3 bytes."""
+
+    file = tmp_path / "games.pyskg"
+    with records.RecordWriter(file) as writer:
+        writer.write_game(dict(_game(moves=[(row, row % 3) for row in range(50)]), think_times=None))
+    size = file.stat().st_size
+    with records.RecordWriter(file) as writer:
+        writer.write_game(dict(_game(moves=[(row, row % 3) for row in range(100)]), think_times=None))
+    assert file.stat().st_size - size - (size - records.HEADER.size) == 50 * 3
+
+
+def test_unfinished_and_incomplete(tmp_path):
+    """Test an unfinished game is recorded without a winner and an incomplete game at the end is skipped."""
+
+    file = tmp_path / "games.pyskg"
+    with records.RecordWriter(file) as writer:
+        writer.start_game("bot", "rob")
+        writer.add_move((0, 0))
+    with records.RecordWriter(file) as writer:
+        writer.write_game(_game())
+    data = file.read_bytes()
+    file.write_bytes(data + data[records.HEADER.size:-3])  # a game cut short by a crash
+    games = list(records.read_games(file))
+    assert [game["winner"] for game in games] == [None, "X", None]
+    assert games[0]["moves"] == [(0, 0)] and games[0]["opening"] == 0
+
+
+def test_chunks(tmp_path, monkeypatch):
+    """Test games crossing the boundaries of the chunks read from the file."""
+
+    monkeypatch.setattr(records, "CHUNK", 7)
+    file = tmp_path / "games.pyskg"
+    games = [_game(moves=[(i, -i) for i in range(n)]) for n in range(1, 30)]
+    with records.RecordWriter(file) as writer:
+        for game in games:
+            writer.write_game(game)
+    assert list(records.read_games(file)) == games
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda game: game[:-1] + b"\x07",  # an invalid result
+    lambda game: b"\x00" + game[1:],  # K = 0
+    lambda game: game[:2] + b"\xff" * 12 + game[14:],  # a varint too long
+], ids=["result", "K", "varint"])
+def test_corrupt_game(tmp_path, corrupt):
+    """Test a malformed game in the middle of the file raises ValueError rather than ending the file silently."""
+
+    file = tmp_path / "games.pyskg"
+    with records.RecordWriter(file) as writer:
+        writer.write_game(_game())
+    game = file.read_bytes()[records.HEADER.size:]
+    file.write_bytes(file.read_bytes() + corrupt(game) + game)
+    games = records.read_games(file)
+    assert next(games) == _game()
+    with pytest.raises(ValueError, match=f"byte {records.HEADER.size + len(game)} "):
+        next(games)
+
+
+def test_invalid_file(tmp_path):
+    """Test reading a file which is not a game records file."""
+
+    file = tmp_path / "games.pyskg"
+    file.write_bytes(b"not a game records file")
+    with pytest.raises(ValueError):
+        list(records.read_games(file))
@@ -0,0 +1,134 @@
+"""Tests for pyskvorky.renderer module."""
+import curses
+import pytest
+from pyskvorky import helper, renderer, viewport
+
+CROSS, WINNER = 1 << 20, 1 << 21  # attributes distinguishable from the players' ones
+
+
+@pytest.fixture(autouse=True)
+def line_characters(monkeypatch):
+    """Define the line drawing characters used by curses.textpad.rectangle(), curses defines them in initscr()."""
+
+    for name in "VLINE", "HLINE", "ULCORNER", "URCORNER", "LRCORNER", "LLCORNER":
+        monkeypatch.setattr(curses, "ACS_" + name, "+", raising=False)
+
+
+class FakeScreen:
+    """A curses screen keeping the characters and attributes drawn and counting the addstr() calls."""
+
+    def __init__(self, rows=40, cols=80):
+        self.rows, self.cols = rows, cols
+        self.contents, self.calls = {}, 0
+
+    def getmaxyx(self):
+        return self.rows, self.cols
+
+    def addstr(self, y, x, text, attr=0):
+        self.calls += 1
+        for i, char in enumerate(text):
+            self.contents[y, x + i] = char, attr
+
+    def addch(self, y, x, char, attr=0):
+        self.contents[y, x] = char, attr
+
+    def hline(self, y, x, char, length):
+        for i in range(length):
+            self.contents[y, x + i] = char, 0
+
+    def vline(self, y, x, char, length):
+        for i in range(length):
+            self.contents[y + i, x] = char, 0
+
+
+def _players(x_fields, o_fields):
+    return helper.Player("X", None, 2, set(x_fields)), helper.Player("O", None, 4, set(o_fields))
+
+
+def _repaint(players, move, winning_fields=frozenset(), size=(40, 80)):
+    """Return the contents of a screen of a given size drawn from scratch."""
+
+    screen = FakeScreen(*size)
+    renderer.Renderer(screen, 5, 5, CROSS, WINNER).draw(players, move, winning_fields)
+    return screen.contents
+
+
+def test_draw_changed_cells():
+    """Test a move inside the playfield redraws only the move and the previous move."""
+
+    screen = FakeScreen()
+    render = renderer.Renderer(screen, 5, 5, CROSS, WINNER)
+    x, o = _players({(0, 0), (1, 1)}, {(0, 1)})
+    render.draw((o, x), (1, 1))
+    assert screen.contents == _repaint((o, x), (1, 1))
+    o.fields.add((1, 0))
+    screen.calls = 0
+    position = render.draw((x, o), (1, 0))
+    assert screen.calls == 2  # the move underlined, the previous move without the underline
+    assert screen.contents == _repaint((x, o), (1, 0))
+    assert position == render.screen_position((1, 0))
+    assert screen.contents[position] == ("O", 4 | curses.A_UNDERLINE)
+    assert screen.contents[render.screen_position((1, 1))] == ("X", 2)
+    screen.calls = 0
+    render.draw((x, o), (1, 0))
+    assert not screen.calls
+
+
+def test_draw_grown_playfield():
+    """Test a move at the edge of the playfield redraws the whole bigger playfield."""
+
+    screen = FakeScreen()
+    render = renderer.Renderer(screen, 5, 5, CROSS, WINNER)
+    x, o = _players({(0, 0)}, set())
+    render.draw((x, o), None)
+    assert render.draw((o, x), None) == render.screen_position((0, 0))
+    playfield = render.window
+    o.fields.add((9, 3))
+    render.draw((o, x), (9, 3))
+    assert render.window != playfield
+    assert screen.contents.items() >= _repaint((o, x), (9, 3)).items()
+
+
+def test_draw_winning_fields():
+    """Test the winning fields are highlighted and the highlight is removed when the game goes on."""
+
+    screen = FakeScreen()
+    render = renderer.Renderer(screen, 5, 5, CROSS, WINNER)
+    x, o = _players({(0, i) for i in range(5)}, {(1, i) for i in range(4)})
+    winning_fields = {(0, i) for i in range(5)}
+    render.draw((x, o), (0, 4), winning_fields)
+    assert screen.contents == _repaint((x, o), (0, 4), winning_fields)
+    assert screen.contents[render.screen_position((0, 0))] == ("X", WINNER)
+    assert screen.contents[render.screen_position((0, 4))] == ("X", WINNER | curses.A_UNDERLINE)
+    o.fields.add((1, 4))
+    render.draw((o, x), (1, 4))
+    assert screen.contents == _repaint((o, x), (1, 4))
+    assert screen.contents[render.screen_position((0, 0))] == ("X", 2)
+
+
+def test_draw_scrolling():
+    """Test a playfield exceeding the screen is shown by a window scrolling to the move."""
+
+    screen = FakeScreen(21, 40)
+    render = renderer.Renderer(screen, 5, 5, CROSS, WINNER)
+    x, o = _players({(0, 0)}, set())
+    render.draw((x, o), (0, 0))
+    assert render.window == (-7, -8, 7, 9)  # the height and width of the window are limited by the screen
+    x.fields.add((-9, -9))
+    y, x_ = render.draw((x, o), (-9, -9))
+    assert render.window == (-13, -13, 1, 4) and screen.contents[y, x_] == ("X", 2 | curses.A_UNDERLINE)
+    assert screen.contents == _repaint((x, o), (-9, -9), size=(21, 40))
+    assert render.show((-12, 2)) == (6, 35)  # a position inside the window doesn't scroll it
+    assert render.window == (-13, -13, 1, 4)
+    assert render.show((5, 5)) == render.screen_position((5, 5))
+    assert render.window == (-4, -7, 10, 10)  # centered around the position as far as the playfield goes
+    assert screen.contents[render.screen_position((0, 0))] == ("X", 2)
+    assert screen.contents[render.screen_position((-3, 0))] == (".", CROSS)
+
+
+def test_draw_too_small():
+    """Test a screen too small for any window raises DisplayError."""
+
+    x, o = _players({(0, 0)}, set())
+    with pytest.raises(viewport.DisplayError):
+        renderer.Renderer(FakeScreen(7, 80), 5, 5, CROSS, WINNER).draw((x, o), (0, 0))
@@ -0,0 +1,161 @@
+"""Tests for pyskvorky.server and pyskvorky.loadgen modules."""
+import asyncio
+import json
+from time import perf_counter
+from pyskvorky import helper, loadgen, server
+
+
+def _run(test, players=("rob", "bot"), jobs=2, **options):
+    """Run a coroutine test(server, port) against a game server listening on a free localhost port."""
+
+    async def main():
+        game_server = server.GameServer(players, jobs, **options)
+        try:
+            async with await game_server.serve(port=0) as asyncio_server:
+                return await test(game_server, asyncio_server.sockets[0].getsockname()[1])
+        finally:
+            game_server.close()
+
+    return asyncio.run(main())
+
+
+async def _session(port, commands):
+    """Return the server's answers to the commands sent on a connection."""
+
+    reader, writer = await loadgen.connect(port=port)
+    try:
+        return [await loadgen.request(reader, writer, command) for command in commands]
+    finally:
+        writer.close()
+
+
+def test_percentiles():
+    """Test the percentiles use the nearest rank."""
+
+    assert server.percentiles(range(1, 101)) == {"p50": 51, "p90": 91, "p99": 100}
+    assert server.percentiles([3.0], (50, 100)) == {"p50": 3.0, "p100": 3.0}
+    assert server.percentiles([]) == {"p50": None, "p90": None, "p99": None}
+
+
+def test_game():
+    """Test a game's moves are answered by the moves of a new player of the module and wrong moves by errors."""
+
+    async def test(_, port):
+        return await _session(port, ["START", "TURN 0,0", "TURN 0,0", "BEGIN", "TURN 1,1", "START nosuch", "FOO",
+                                     "START rob", "BEGIN", "STATS"])
+
+    answers = _run(test)
+    player = helper.new_player("rob")
+    assert answers[0].startswith("OK")
+    assert answers[1:5] == [f"MOVE {loadgen.format_move(player.play((0, 0)))}",
+                            "ERROR ValueError: the field 0,0 is taken", "ERROR ValueError: the game has begun",
+                            f"MOVE {loadgen.format_move(player.play((1, 1)))}"]
+    assert answers[5:7] == ["ERROR ValueError: unknown player 'nosuch'", "UNKNOWN FOO"]
+    assert answers[7].startswith("OK") and answers[8] == "MOVE 0,0"
+    stats = json.loads(answers[9])
+    assert (stats["games"], stats["started"], stats["finished"], stats["moves"]) == (1, 2, 1, 3)
+
+
+def test_game_over():
+    """Test the game is over when the max number of moves is played or when the client wins."""
+
+    async def test(game_server, port):
+        answers = await _session(port, ["START", "BEGIN", "TURN 9,0", "TURN 9,2", "TURN 9,4"])
+        game = await game_server.start_game("rob")
+        for col in range(4):
+            game.client_fields.add((5, col))
+            game.client_lines.add((5, col))
+        return answers, await game_server.countermove(game, (5, 4)), game.over, game_server.metrics.summary()
+
+    answers, result, over, stats = _run(test, ("rob",), max_moves=4)
+    assert answers[1:] == ["MOVE 0,0", answers[2], "DRAW", "ERROR ValueError: no game in progress"]
+    assert answers[2].startswith("MOVE")
+    assert result == "LOSS" and over and stats["games"] == 0
+
+
+def test_timeouts():
+    """Test a player exceeding the time limit loses its game and an idle connection is closed and ends its game."""
+
+    async def test(game_server, port):
+        answers = await _session(port, ["START", "TURN 0,0"])
+        reader, writer = await loadgen.connect(port=port)
+        await loadgen.request(reader, writer, "START")
+        closed = await reader.readline() == b""
+        writer.close()
+        return answers, closed, game_server.metrics.summary()
+
+    answers, closed, stats = _run(test, move_timeout=0, idle_timeout=0.5)
+    assert answers[1] == "TIMEOUT" and closed
+    assert (stats["games"], stats["finished"], stats["timeouts"]) == (0, 2, 1)
+
+
+def test_timeout_shard(tmp_path, monkeypatch):
+    """Test a player exceeding the time limit doesn't delay the games sharing its worker process: the process is
+    replaced by a new one and its other games are aborted, which their clients learn by their next move."""
+
+    (tmp_path / "slow.py").write_text("import time\n\n\ndef play(opponents_move):\n    time.sleep(60)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))  # the worker processes are forked after it
+
+    async def test(game_server, port):
+        reader, writer = await loadgen.connect(port=port)
+        answers = [await loadgen.request(reader, writer, command) for command in ["START rob", "BEGIN"]]
+        answers += await _session(port, ["START slow", "BEGIN"])
+        start = perf_counter()
+        answers += [await loadgen.request(reader, writer, command) for command in ["TURN 1,1", "START rob", "BEGIN"]]
+        writer.close()
+        return answers, perf_counter() - start, game_server.metrics.summary()
+
+    answers, elapsed, stats = _run(test, ("rob", "slow"), 1, move_timeout=1)
+    assert answers[1:] == ["MOVE 0,0", answers[2], "TIMEOUT", "ABORTED", answers[5], "MOVE 0,0"]
+    assert answers[2].startswith("OK") and answers[5].startswith("OK") and elapsed < 30
+    assert (stats["games"], stats["started"], stats["finished"], stats["timeouts"]) == (1, 3, 2, 1)
+
+
+def test_crashed_shard():
+    """Test the games of a crashed worker process are aborted and the process is replaced by a new one."""
+
+    async def test(game_server, port):
+        reader, writer = await loadgen.connect(port=port)
+        answers = [await loadgen.request(reader, writer, command) for command in ["START", "BEGIN"]]
+        game_server.shards.processes[0].process.kill()
+        game_server.shards.processes[0].process.join()
+        answers += [await loadgen.request(reader, writer, command) for command in ["TURN 1,1", "START", "BEGIN"]]
+        writer.close()
+        return answers, game_server.metrics.summary()
+
+    answers, stats = _run(test, ("rob",), 1)
+    assert answers[1:] == ["MOVE 0,0", "ABORTED", answers[3], "MOVE 0,0"] and answers[3].startswith("OK")
+    assert (stats["games"], stats["started"], stats["finished"]) == (1, 2, 1)
+
+
+def test_shutdown():
+    """Test a connection's handler cancelled by the server shutting down ends its game and stays cancelled."""
+
+    class Writer:
+        """Writer of a connection which never sends anything."""
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    async def test(game_server, _):
+        writer = Writer()
+        task = asyncio.create_task(game_server.handle(asyncio.StreamReader(), writer))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return task.cancelled(), writer.closed
+
+    assert _run(test) == (True, True)
+
+
+def test_load():
+    """Test the load generator's concurrent clients finish all their games."""
+
+    async def test(_, port):
+        return await loadgen.run_load(6, 2, "rob", port=port)
+
+    summary = _run(test)
+    assert sum(summary["results"].values()) == 12 and set(summary["results"]) <= {"WIN", "LOSS", "DRAW"}
+    assert 1 < summary["server"]["peak_games"] <= 6 and summary["server"]["finished"] == 12
+    assert summary["moves"] > 0 and summary["latency ms"]["p50"] <= summary["latency ms"]["p99"]
@@ -0,0 +1,121 @@
+"""Tests for pyskvorky.telemetry module."""
+import cProfile
+from random import Random
+from pyskvorky import bot, helper, telemetry
+
+
+def _play(engine, moves, seed=0):
+    """Play a given number of the engine's moves against a seeded random opponent."""
+
+    rnd, move = Random(seed), None
+    for _ in range(moves):
+        engine.play(move)
+        move = rnd.choice(sorted(engine.next_move_candidates))
+
+
+def test_telemetry():
+    """Test the metrics of each move are recorded and passed to the callback."""
+
+    received = []
+    engine = telemetry.Telemetry(received.append).attach(bot.Engine())
+    engine.THREATS, engine.NUMPY = False, False
+    _play(engine, 6)
+    moves = received
+    assert len(moves) == 6
+    first, last = moves[0], moves[-1]
+    assert first["move"] == (0, 0) and first["scored"] == 0
+    assert last["simulated"] == last["scored"] + 2 > 2  # each candidate is simulated once by score(), plus 2 moves
+    assert last["lines"] == last["simulated"] * 4 * bot.K
+    assert last["open_lines"] == len(engine.open_lines)
+    assert last["candidates"] == len(engine.next_move_candidates)
+    assert last["time"] > 0 and not last["book"]
+    assert last["envelope_hits"] + last["envelope_misses"] > 0
+
+
+def test_telemetry_batch_and_search():
+    """Test candidates scored in a batch and by the search are counted."""
+
+    tele = telemetry.Telemetry()
+    engine = tele.attach(bot.Engine())
+    engine.THREATS, engine.NUMPY = False, True
+    _play(engine, 4)
+    assert tele.moves[-1]["scored"] > 0
+    if bot.vectorized is not None:
+        assert tele.moves[-1]["simulated"] == 2  # the batch doesn't simulate any move, just the two moves are made
+    engine.DEPTH = 2
+    _play(engine, 2, seed=1)
+    assert tele.moves[-1]["scored"] > tele.moves[-1]["candidates"] // 2
+    assert tele.moves[-1]["simulated"] > tele.moves[-1]["scored"]
+    summary = tele.summary()
+    assert summary["moves"] == 6
+    assert summary["scored"] == sum(move["scored"] for move in tele.moves)
+    assert summary["max_time"] <= summary["time"]
+
+
+def test_telemetry_threats():
+    """Test nodes of the forced win search are counted."""
+
+    tele = telemetry.Telemetry()
+    engine = tele.attach(bot.Engine())
+    _play(engine, 10)
+    assert sum(move["threat_nodes"] for move in tele.moves) == engine.threats.total_nodes
+
+
+def test_telemetry_disabled():
+    """Test the Engine class is not affected by an instrumented instance."""
+
+    engine = telemetry.Telemetry().attach(bot.Engine())
+    other = bot.Engine()
+    assert "play" in vars(engine)
+    assert other.play.__func__ is bot.Engine.play
+    assert other.make_move.__func__ is bot.Engine.make_move
+    assert "play" not in vars(other)
+
+
+def test_profiler():
+    """Test the profiler runs only during play() and its stats are available."""
+
+    tele = telemetry.Telemetry(profiler=cProfile.Profile())
+    engine = tele.attach(bot.Engine())
+    _play(engine, 3)
+    stats = tele.profile_stats()
+    assert any(function == "make_move" for _, _, function in stats.stats)
+    assert telemetry.Telemetry().profile_stats() is None
+
+
+def test_telemetry_ponder():
+    """Test moves answered from the replies of ponder() are counted as hits."""
+
+    tele = telemetry.Telemetry()
+    engine = tele.attach(bot.Engine())
+    engine.play(None)
+    assert tele.moves[-1]["ponder"] is None
+    engine.play(sorted(engine.ponder(1))[0])
+    reply = next(move for move in sorted(engine.next_move_candidates) if move not in engine.ponder(1))
+    engine.play(reply)
+    assert [move["ponder"] for move in tele.moves] == [None, True, False]
+    summary = tele.summary()
+    assert (summary["ponder_hits"], summary["ponder_misses"], summary["ponder_rate"]) == (1, 1, 0.5)
+    assert telemetry.format_metrics(tele.moves[1]).startswith("ponder, ")
+
+
+def test_format_metrics():
+    """Test the status line description of a move."""
+
+    metrics = {"move": (1, 1), "time": 0.0123, "scored": 10, "simulated": 10, "lines": 200, "envelope_hits": 3,
+               "envelope_misses": 1, "tt_hits": 0, "book": True, "threat_nodes": 5, "ponder": None, "open_lines": 40,
+               "candidates": 12}
+    assert telemetry.format_metrics(metrics) == ("book, 12.3 ms, 10 scored, 200 lines, cache 75%, tt 0, threats 5, "
+                                                 "open 40, candidates 12")
+
+
+def test_load_player_telemetry():
+    """Test load_player() attaches telemetry to a new engine."""
+
+    tele = telemetry.Telemetry()
+    play = helper.load_player("bot", tele)
+    play(None)
+    assert len(tele.moves) == 1 and tele.moves[0]["move"] == (0, 0)
+    helper.new_player("bot", tele).play(None)
+    helper.new_player("rob", tele).play(None)  # a module without an Engine isn't instrumented
+    assert len(tele.moves) == 2
@@ -0,0 +1,104 @@
+"""Tests for pyskvorky.threats module."""
+import pytest
+from pyskvorky import bot, geometry
+from pyskvorky.threats import ThreatSolver
+
+
+def _engine(claimed, lost):
+    """Return an engine with a board of given claimed and lost positions, the engine being to move."""
+
+    engine = bot.Engine()
+    for move in claimed:
+        engine.update_board(move, engine.claimed, engine.lost)
+    for move in lost:
+        engine.update_board(move, engine.lost, engine.claimed)
+    return engine
+
+
+def test_five():
+    """Test the solver completes a four."""
+
+    engine = _engine([(0, 0), (0, 1), (0, 2), (0, 3)], [(0, 4), (5, 5), (6, 6)])
+    assert engine.threats.solve() == [(0, -1)]
+
+
+def test_open_three():
+    """Test the solver turns an open three into an open four."""
+
+    engine = _engine([(0, 0), (0, 1), (0, 2)], [(5, 5), (6, 6)])
+    sequence = engine.threats.solve()
+    assert sequence and sequence[0] in {(0, -2), (0, -1), (0, 3), (0, 4)}
+
+
+def _unstoppable(engine, sequence):
+    """Check the sequence ends with a threat completing a five at more than one position after the attacker's
+    moves (even items) and the defender's answers (odd items) are placed on the engine's board."""
+
+    claimed, lost = engine.claimed | set(sequence[::2]), engine.lost | set(sequence[1::2])
+    fives = {position for move in sequence[::2] for line in geometry.envelope(move)
+             if len(line & claimed) == 4 and not line & lost for position in line - claimed}
+    return len(fives) > 1
+
+
+# a closed three in row 0, closed two in column 3 and closed three in row 1: a four in row 0 at (0, 3) forces the
+# defender to block it at (0, 4) and turns the column into a closed three; (1, 3) then makes two fours at once
+continuous_fours = ([(0, 0), (0, 1), (0, 2), (-1, 3), (-2, 3), (1, 4), (1, 5), (1, 6)], [(0, -1), (-3, 3), (1, 7)])
+
+
+def test_continuous_fours():
+    """Test the solver finds a win by a four forcing the defender's answer followed by a double four."""
+
+    engine = _engine(*continuous_fours)
+    sequence = engine.threats.solve()
+    assert len(sequence) == 3
+    assert _unstoppable(engine, sequence)
+    assert not _unstoppable(engine, sequence[:1])
+
+
+def test_defender_four():
+    """Test the solver gives up when the opponent threatens to win and the engine can't win at once."""
+
+    engine = _engine([(0, 0), (0, 1), (0, 2)], [(5, 0), (5, 1), (5, 2), (5, 3)])
+    assert engine.threats.solve() is None
+    assert engine.threats.proved
+
+
+def test_no_threats():
+    """Test the solver proves there is no forced win with no threats on the board."""
+
+    engine = _engine([(0, 0), (2, 2)], [(1, 1), (5, 5)])
+    assert engine.threats.solve() is None
+    assert engine.threats.proved
+
+
+def test_budget():
+    """Test the solver stops when its node budget is exhausted and keeps the board intact."""
+
+    engine = _engine([(0, 0), (0, 1), (1, 0), (2, 2), (3, 3)], [(-1, -1), (5, 5), (-1, 0), (7, 7)])
+    claimed, lost, open_lines = set(engine.claimed), set(engine.lost), set(engine.open_lines)
+    solver = ThreatSolver(engine, nodes=0)
+    assert solver.solve() is None
+    assert not solver.proved
+    assert solver.nodes == 1
+    assert (engine.claimed, engine.lost, engine.open_lines) == (claimed, lost, open_lines)
+
+
+@pytest.mark.parametrize('claimed, lost', [
+    ([(0, 0), (0, 1), (0, 2)], [(5, 5), (6, 6)]),
+    continuous_fours], ids=str)
+def test_state(claimed, lost):
+    """Test the solver keeps the board and open_lines intact and counts its nodes."""
+
+    engine = _engine(claimed, lost)
+    state = set(engine.claimed), set(engine.lost), set(engine.open_lines), dict(engine.pattern_counts)
+    engine.threats.solve()
+    assert state == (engine.claimed, engine.lost, engine.open_lines, engine.pattern_counts)
+    assert engine.threats.stats()["total_nodes"] == engine.threats.nodes > 0
+
+
+def test_play():
+    """Test play() plays the forced win."""
+
+    claimed, lost = continuous_fours
+    engine = _engine(claimed, lost[:-1])
+    assert engine.play(lost[-1]) == _engine(claimed, lost).threats.solve()[0]
@@ -0,0 +1,65 @@
+"""Tests for pyskvorky.tournament module."""
+import json
+from random import Random
+import pytest
+from pyskvorky import records, tournament
+
+
+def test_random_opening():
+    """Test random_opening() returns distinct positions near the (0, 0) position."""
+
+    opening = tournament.random_opening(Random(0), 4, 1)
+    assert len(set(opening)) == 4
+    assert all(max(abs(row), abs(col)) <= 1 for row, col in opening)
+
+
+@pytest.mark.parametrize('opening', [[], [(0, 0)], [(0, 0), (1, 1)], [(0, 0), (1, 1), (-1, 2)]], ids=str)
+def test_play_game(opening):
+    """Test play_game() continues from the opening and plays a valid game between two player modules."""
+
+    result = tournament.play_game(0, "bot", "rob", opening, 60)
+    moves = [tuple(move) for move in result["moves"]]
+    assert moves[:len(opening)] == opening
+    assert len(set(moves)) == len(moves) == result["length"] <= 60
+    assert len(result["think_times"]) == len(moves) - len(opening)
+    if result["winner"]:
+        assert result["winner"] == "XO"[(len(moves) - 1) % 2]
+        assert result["winner_module"] == {"X": "bot", "O": "rob"}[result["winner"]]
+
+
+@pytest.mark.parametrize('jobs', [1, 2], ids=str)
+def test_run_tournament(tmp_path, jobs):
+    """Test run_tournament() writes a result for each game and players swap their markers after each game."""
+
+    file = tmp_path / "results.jsonl"
+    summary = tournament.run_tournament("bot", "rob", 4, file, jobs, max_moves=30)
+    results = sorted((json.loads(line) for line in file.read_text().splitlines()), key=lambda result: result["game"])
+    assert [result["X"] for result in results] == ["bot", "rob", "bot", "rob"]
+    assert sum(summary["wins"].values()) + summary["draws"] == 4
+
+
+def test_run_tournament_log(tmp_path):
+    """Test run_tournament() appends the games to a game records file."""
+
+    file, log = tmp_path / "results.jsonl", tmp_path / "games.pyskg"
+    tournament.run_tournament("bot", "rob", 2, file, 1, max_moves=20, log=log)
+    results = [json.loads(line) for line in file.read_text().splitlines()]
+    games = list(records.read_games(log))
+    assert [game["moves"] for game in games] == [[tuple(move) for move in result["moves"]] for result in results]
+    assert [(game["X"], game["O"], game["winner"], game["opening"]) for game in games] == \
+        [(result["X"], result["O"], result["winner"], result["opening"]) for result in results]
+    assert all(game["think_times"][:2] == [0.0, 0.0] and len(game["think_times"]) == len(game["moves"])
+               for game in games)
+
+
+def test_run_tournament_external(tmp_path):
+    """Test run_tournament() plays the games by player processes and a player out of time loses its game."""
+
+    file = tmp_path / "results.jsonl"
+    summary = tournament.run_tournament("bot", "rob", 4, file, 2, max_moves=30, external=True)
+    assert sum(summary["wins"].values()) + summary["draws"] == 4 and summary["errors"] == 0
+    summary = tournament.run_tournament("bot", "rob", 2, file, 2, opening=0, external=True, time_limit=1e-6)
+    results = sorted((json.loads(line) for line in file.read_text().splitlines()), key=lambda result: result["game"])
+    assert summary["errors"] == 2
+    for result in results:  # the player to move after the last move failed, it's X after an even number of moves
+        assert "time limit" in result["error"] and result["winner"] == "OX"[result["length"] % 2]
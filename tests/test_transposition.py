@@ -0,0 +1,76 @@
+"""Tests for pyskvorky.transposition module."""
+import pytest
+from pyskvorky import transposition
+from pyskvorky.transposition import TranspositionTable, zobrist_key, DEPTH_PREFERRED, LRU, EXACT, LOWER
+
+
+def test_zobrist_key():
+    """Test zobrist_key() returns distinct 64-bit keys for positions and players, the same for repeated calls."""
+
+    positions = [(row, col) for row in range(-10, 11) for col in range(-10, 11)]
+    keys = {zobrist_key(position, own) for position in positions for own in (True, False)}
+    assert len(keys) == 2 * len(positions)
+    assert all(0 <= key < 1 << 64 for key in keys)
+    assert zobrist_key((-3, 7), True) == zobrist_key((-3, 7), True)
+
+
+def test_zobrist_hash():
+    """Test xor-ing the keys hashes a board regardless of the order of the moves."""
+
+    moves = [((0, 0), True), ((1, 1), False), ((0, 1), True), ((-1, 1), False)]
+    forward, backward = 0, 0
+    for move in moves:
+        forward ^= zobrist_key(*move)
+    for move in reversed(moves):
+        backward ^= zobrist_key(*move)
+    assert forward == backward != 0
+
+
+@pytest.mark.parametrize('policy', [DEPTH_PREFERRED, LRU])
+def test_get_put(policy):
+    """Test the table returns stored entries and counts hits and misses."""
+
+    table = TranspositionTable(16, policy)
+    assert table.get(5) is None
+    table.put(5, 2, 10, EXACT, (0, 1))
+    assert table.get(5) == (2, 10, EXACT, (0, 1))
+    assert table.stats() == {"hits": 1, "misses": 1, "collisions": 0, "size": 1, "hit_rate": 0.5}
+    table.clear()
+    assert len(table) == 0 and table.hits == table.misses == 0
+
+
+def test_depth_preferred():
+    """Test a slot keeps the deeper searched entry and a colliding lookup is counted as a collision."""
+
+    table = TranspositionTable(16, DEPTH_PREFERRED)
+    table.put(3, 3, 10, EXACT, (0, 1))
+    table.put(19, 2, 20, LOWER, (1, 1))  # same slot, shallower search; rejected
+    assert table.get(19) is None
+    assert table.collisions == 1
+    table.put(19, 3, 20, LOWER, (1, 1))  # same slot, as deep search; replaces the entry
+    assert table.get(19) == (3, 20, LOWER, (1, 1))
+    assert table.get(3) is None
+    table.put(19, 1, 30, EXACT, (2, 1))  # same position is always replaced
+    assert table.get(19) == (1, 30, EXACT, (2, 1))
+    assert len(table) == 1
+
+
+def test_lru():
+    """Test the LRU table drops the least recently used entry when it's full."""
+
+    table = TranspositionTable(2, LRU)
+    table.put(1, 1, 10, EXACT, (0, 1))
+    table.put(2, 1, 20, EXACT, (0, 2))
+    table.get(1)
+    table.put(3, 1, 30, EXACT, (0, 3))
+    assert len(table) == 2
+    assert table.get(2) is None
+    assert table.get(1) is not None and table.get(3) is not None
+
+
+def test_policy():
+    """Test an unknown replacement policy is rejected."""
+
+    with pytest.raises(ValueError):
+        TranspositionTable(16, "random")
+    assert transposition.SIZE > 0
@@ -0,0 +1,56 @@
+"""Tests for pyskvorky.tuner module."""
+import json
+from pyskvorky import tuner
+
+
+def test_params():
+    """Test the tables are restored from their parameters and the zero values stay zero."""
+
+    assert tuner.from_params(tuner.to_params(tuner.FIBONACCI), tuner.FIBONACCI) == tuner.FIBONACCI
+    assert tuner.from_params(tuner.to_params(tuner.TRIBONACCI), tuner.TRIBONACCI) == tuner.TRIBONACCI
+    doubled = tuner.from_params([param + 0.7 for param in tuner.to_params(tuner.FIBONACCI)], tuner.FIBONACCI)
+    assert doubled["value_table_opponent"][:4] == [0, 2, 2, 4] and doubled["value_table_player"][:4] == [0, 0, 0, 2]
+
+
+def test_play_pair():
+    """Test a pair of games between two tables is played with the markers swapped."""
+
+    wins, draws, losses = tuner.play_pair((tuner.FIBONACCI, tuner.TRIBONACCI, 0, 2, 20))
+    assert wins + draws + losses == 2
+
+
+def test_spsa():
+    """Test SPSA moves the tables towards the perturbation winning the match."""
+
+    def mapper(_, tasks):
+        return [(2, 0, 0)] * len(tasks)  # the tables perturbed by +delta always win
+
+    steps = list(tuner.spsa(mapper, tuner.FIBONACCI, 3, 2, perturbation=0.5, step=1.0))
+    assert [stats["score"] for _, stats in steps] == [1.0, 1.0, 1.0]
+    assert steps[-1][0] != tuner.FIBONACCI
+    assert all(value == 0 for name in tuner.TABLES for value, base in zip(steps[-1][0][name], tuner.FIBONACCI[name])
+               if not base)
+
+
+def test_race():
+    """Test a candidate clearly losing the race is dropped early and the others play all rounds."""
+
+    losing, even = tuner.TRIBONACCI, dict(tuner.FIBONACCI)
+
+    def mapper(_, tasks):
+        return [(0, 0, 2) if task[0] is losing else (1, 0, 1) if task[2] % 2 else (2, 0, 0) for task in tasks]
+
+    stats = tuner.race(mapper, {"losing": losing, "even": even}, tuner.FIBONACCI, 5, 2)
+    assert stats["losing"] == {"wins": 0, "draws": 0, "losses": 4, "score": -1.0, "dropped": True}
+    assert stats["even"] == {"wins": 15, "draws": 0, "losses": 5, "score": 0.5, "dropped": False}
+
+
+def test_run_tuning(tmp_path):
+    """Test a tuning run writes the report of the iterations and the race."""
+
+    file = tmp_path / "tuning.json"
+    report = tuner.run_tuning(file, 1, 1, 1, 1, jobs=1, max_moves=12)
+    assert json.loads(file.read_text()) == report
+    assert set(report["tables"]) == {"fibonacci", "tribonacci", "spsa"} and len(report["iterations"]) == 1
+    assert set(report["race"]) == {"tribonacci", "spsa"} and report["games"] == 6
+    assert report["best"] in report["tables"]
@@ -0,0 +1,100 @@
+"""Tests for pyskvorky.vectorized module."""
+from random import Random
+import pytest
+from pyskvorky import bot
+
+np = pytest.importorskip("numpy")
+from pyskvorky import vectorized  # pylint: disable=wrong-import-position
+
+
+def _engine(seed, moves):
+    """Return an engine which played a given number of moves against a seeded random opponent."""
+
+    rnd = Random(seed)
+    engine, move = bot.Engine(), None
+    for _ in range(moves):
+        engine.play(move)
+        move = rnd.choice(sorted(engine.next_move_candidates))
+    engine.update_board(move, engine.lost, engine.claimed)
+    return engine
+
+
+def test_dense_board():
+    """Test the dense board covers all positions padded by K-1 empty positions."""
+
+    board, (top, left) = vectorized.dense_board({(0, 0), (1, 2)}, {(-1, 1)}, [(2, 2)], 5)
+    assert board.shape == (3 + 8 + 1, 2 + 8 + 1)
+    assert (top, left) == (-5, -4)
+    assert board[0 - top, 0 - left] == 1 and board[1 - top, 2 - left] == 1 and board[-1 - top, 1 - left] == -1
+    assert np.abs(board).sum() == 3
+
+
+@pytest.mark.parametrize('direction', vectorized.DIRECTIONS, ids=str)
+def test_line_view(direction):
+    """Test the strided view returns the positions of the lines in a given direction."""
+
+    board = np.arange(10 * 12).reshape(10, 12)
+    lines, first_row = vectorized.line_view(board, direction, 5)
+    dy, dx = direction
+    assert lines.shape == (10 - 4 * abs(dy), 12 - 4 * dx, 5)
+    row, col = 3, 2
+    assert lines[row, col].tolist() == [board[first_row + row + i * dy, col + i * dx] for i in range(5)]
+
+
+@pytest.mark.parametrize('seed, moves', [(0, 1), (1, 3), (2, 8), (3, 15), (4, 30)], ids=str)
+def test_batch_scores(seed, moves):
+    """Test the batch scores are the same as the scores of Engine.score()."""
+
+    engine = _engine(seed, moves)
+    candidates = list(engine.next_move_candidates)
+    scores = vectorized.batch_scores(engine.claimed, engine.lost, candidates,
+                                     engine.value_table_player, engine.value_table_opponent)
+    assert scores.tolist() == [engine.score(move) for move in candidates]
+
+
+def _long_patterns():
+    """Return an engine with fours and threes of both players on the board, the engine being to move."""
+
+    engine = bot.Engine()
+    for claimed, lost in [((0, 0), (3, 0)), ((0, 1), (3, 1)), ((0, 2), (3, 2)), ((0, 3), (5, 5)), ((2, 0), (4, 1)),
+                          ((2, 2), (3, 4))]:
+        engine.update_board(claimed, engine.claimed, engine.lost)
+        engine.update_board(lost, engine.lost, engine.claimed)
+    return engine
+
+
+def test_batch_scores_long_patterns():
+    """Test the batch scores equal the scores of Engine.score() with fours and fives on the board and that both
+    fail alike when a pattern's index is out of its table."""
+
+    engine = _long_patterns()
+    candidates = sorted(engine.next_move_candidates | {(0, -1), (0, 4), (3, -1), (3, 3)})
+    scores = vectorized.batch_scores(engine.claimed, engine.lost, candidates,
+                                     engine.value_table_player, engine.value_table_opponent)
+    assert scores.tolist() == [engine.score(move) for move in candidates]
+    assert candidates[scores.argmax()] in [(0, -1), (0, 4)]  # a five
+    engine.value_table_player = engine.value_table_player[:14]  # no value of a five or of a four in two lines
+    with pytest.raises(IndexError):
+        engine.score((0, 4))
+    with pytest.raises(IndexError):
+        vectorized.batch_scores(engine.claimed, engine.lost, [(0, 4)], engine.value_table_player,
+                                engine.value_table_opponent)
+
+
+@pytest.mark.parametrize('seed, moves', [(5, 2), (6, 10), (7, 25)], ids=str)
+def test_best_move(seed, moves):
+    """Test the best move is the same as the one selected by max(), including the order of equal scores."""
+
+    engine = _engine(seed, moves)
+    for candidates in list(engine.next_move_candidates), sorted(engine.next_move_candidates, reverse=True):
+        assert vectorized.best_move(engine.claimed, engine.lost, candidates, engine.value_table_player,
+                                    engine.value_table_opponent) == max(candidates, key=engine.score)
+
+
+def test_engine_best_move():
+    """Test Engine.best_move() is independent of numpy."""
+
+    engine = _engine(8, 12)
+    move = engine.best_move()
+    engine.NUMPY = False
+    assert engine.best_move() == move
@@ -0,0 +1,47 @@
+"""Tests for pyskvorky.viewport module."""
+from random import Random
+import pytest
+from pyskvorky import helper, viewport
+
+
+def test_bounds():
+    """Test the playfield of the bounds updated move by move is the one of visible_playfield()."""
+
+    rnd = Random(0)
+    fields = []
+    bounds = viewport.Bounds()
+    assert bounds.playfield() == helper.visible_playfield(set())
+    for _ in range(200):
+        move = rnd.randint(-30, 30), rnd.randint(-30, 30)
+        fields.append(move)
+        bounds.add(move)
+        assert bounds.playfield() == helper.visible_playfield(set(fields))
+    assert viewport.Bounds(fields).playfield() == bounds.playfield()
+
+
+@pytest.mark.parametrize("low, high, span, start, focus, result", [
+    (-10, 10, 30, None, 5, -10),  # the whole playfield fits
+    (-10, 30, 20, None, 5, -5),  # centered around the focus
+    (-10, 30, 20, -8, 5, -8),  # the focus is inside the window
+    (-10, 30, 20, -5, 15, 5),  # the focus is on the frame
+    (-10, 30, 20, None, -9, -10),  # as far as the playfield goes
+    (-10, 30, 20, None, 29, 10),
+])
+def test_scroll(low, high, span, start, focus, result):
+    """Test the first row of a window showing the focus."""
+
+    assert viewport.scroll(low, high, span, start, focus) == result
+
+
+def test_viewport_follow():
+    """Test the window is the playfield if it fits and scrolls only when the focus leaves it."""
+
+    view = viewport.Viewport({(0, 0)})
+    assert view.follow((0, 0), 40, 40) == (-10, -10, 10, 10)
+    assert view.follow((0, 0), 10, 12) == (-5, -10, 5, 2)  # the columns still show the focus
+    view.add((20, 0))
+    assert view.follow((0, 0), 10, 12) == (-5, -10, 5, 2)  # the focus is still inside
+    assert view.follow((20, 3), 10, 12) == (14, -3, 24, 9)
+    assert view.follow((19, 4), 10, 12) == (14, -3, 24, 9)
+    with pytest.raises(viewport.DisplayError):
+        view.follow((0, 0), 1, 12)
@@ -0,0 +1,76 @@
+"""Tests for pyskvorky.worker module."""
+import threading
+import pytest
+from pyskvorky import bot, worker
+
+
+def test_worker_result():
+    """Test the countermove computed on the worker thread is returned."""
+
+    thinker = worker.Worker(lambda opponents_move: (opponents_move[0] + 1, opponents_move[1]))
+    thinker.start((1, 2))
+    assert thinker.result() == (2, 2)
+    assert thinker.done() and thinker.elapsed() > 0
+    assert thinker.cancel()
+
+
+def test_worker_error():
+    """Test an error raised by play() is raised again by result()."""
+
+    def play(opponents_move):
+        raise ValueError(opponents_move)
+
+    thinker = worker.Worker(play)
+    thinker.start(None)
+    with pytest.raises(ValueError):
+        thinker.result()
+
+
+def test_worker_cancel():
+    """Test a cancelled engine's search returns a legal move soon and the engine can go on playing."""
+
+    class DeepEngine(bot.Engine):
+        """Engine searching far too deep to finish."""
+        DEPTH, WIDTH, THREATS = 9, 30, False
+
+    engine = DeepEngine()
+    engine.setup([((0, 0), True), ((1, 1), False), ((0, 1), True)])
+    thinker = worker.Worker(engine.play, engine.cancel)
+    thinker.start((-1, 1))
+    assert not thinker.done(0.1)
+    assert thinker.cancel(timeout=10)
+    countermove = thinker.result()
+    assert countermove in engine.claimed and (len(engine.claimed), len(engine.lost)) == (3, 2)
+    assert engine.ponder() == {} and engine.cancelled  # a cancel() stops the pondering even before it starts
+    engine.DEPTH = 1
+    assert engine.play((-1, 2)) in engine.claimed and not engine.cancelled  # the next move is computed as usual
+
+
+def test_worker_cancel_unsupported():
+    """Test a player without a cancel function is left running."""
+
+    proceed = threading.Event()
+    thinker = worker.Worker(lambda opponents_move: proceed.wait() and (0, 0))
+    thinker.start(None)
+    assert not thinker.cancel(timeout=0.01)
+    assert not thinker.done()
+    proceed.set()
+    assert thinker.result() == (0, 0)
+
+
+def test_worker_ponder():
+    """Test an engine ponders after its move until the opponent's move comes."""
+
+    engine = bot.Engine()
+    engine.setup([((0, 0), False), ((1, 1), True)])
+    thinker = worker.Worker(engine.play, engine.cancel, engine.ponder)
+    thinker.start((0, 1))
+    countermove = thinker.result()
+    thinker.thread.join(10)  # let the pondering finish
+    assert engine.replies and engine.replies_hash == engine.hash
+    reply, expected = next(iter(engine.replies.items()))
+    thinker.start(reply)
+    assert thinker.result() == expected and countermove in engine.claimed
+    assert engine.ponder_hits == 1
+    thinker.start(sorted(engine.next_move_candidates)[0])  # the pondering is cancelled
+    assert thinker.result() in engine.claimed